@@ -0,0 +1,69 @@
+"""Compare per-row message creation against MessageDAO.bulk_create.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_bulk_insert.py [--rows 10000] [--url sqlite+aiosqlite:///bench.db]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.infrastructure.messages.dao import MessageDAO
+
+
+async def _reset(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def bench_single(sessions: async_sessionmaker[AsyncSession], contents: list[str]) -> float:
+    async with sessions() as session:
+        dao = MessageDAO(session)
+        start: float = time.perf_counter()
+        for content in contents:
+            await dao.create("bench", content)
+        return time.perf_counter() - start
+
+
+async def bench_bulk(sessions: async_sessionmaker[AsyncSession], contents: list[str]) -> float:
+    async with sessions() as session:
+        dao = MessageDAO(session)
+        start: float = time.perf_counter()
+        ids: list[int] = await dao.bulk_create("bench", contents)
+        elapsed: float = time.perf_counter() - start
+        assert len(ids) == len(contents)
+        return elapsed
+
+
+async def main(rows: int, url: str | None) -> None:
+    with TemporaryDirectory() as tmp:
+        engine: AsyncEngine = create_async_engine(url or f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        contents: list[str] = [f"benchmark message {i}" for i in range(rows)]
+        try:
+            await _reset(engine)
+            single: float = await bench_single(sessions, contents)
+            await _reset(engine)
+            bulk: float = await bench_bulk(sessions, contents)
+        finally:
+            await engine.dispose()
+
+    print(f"rows:       {rows}")
+    print(f"single-row: {single:8.3f}s  ({rows / single:10.0f} rows/s)")
+    print(f"bulk:       {bulk:8.3f}s  ({rows / bulk:10.0f} rows/s)")
+    print(f"speedup:    {single / bulk:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--url", default=None, help="Database URL (defaults to a temporary SQLite file)")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.url))
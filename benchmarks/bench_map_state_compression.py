@@ -0,0 +1,101 @@
+"""Compare storage size and read/write latency of map state codecs.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_map_state_compression.py [--states 200] [--layers 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.compression import StateCodec, train_dictionary
+from app.db.entities.map_state_payload import MapStatePayload
+from app.infrastructure.map_states.dao import MapStateDAO
+from app.infrastructure.map_states.repository import SqlAlchemyMapStateRepository
+
+
+def make_state(rng: random.Random, layers: int) -> str:
+    return json.dumps(
+        {
+            "viewport": {"center": [rng.uniform(-180, 180), rng.uniform(-90, 90)], "zoom": rng.randint(1, 18)},
+            "layers": [
+                {
+                    "id": f"layer-{i}",
+                    "type": rng.choice(["fill", "line", "symbol", "raster"]),
+                    "visible": rng.random() > 0.2,
+                    "opacity": round(rng.random(), 2),
+                    "source": {"type": "vector", "url": f"https://tiles.example.com/{rng.randint(1, 50)}.json"},
+                    "paint": {"color": f"#{rng.randint(0, 0xFFFFFF):06x}", "width": rng.randint(1, 8)},
+                }
+                for i in range(layers)
+            ],
+        }
+    )
+
+
+async def run(codec: StateCodec, states: list[str], url: str) -> tuple[int, float, float]:
+    engine: AsyncEngine = create_async_engine(url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with sessions() as session:
+            repo = SqlAlchemyMapStateRepository(MapStateDAO(session, codec))
+            start: float = time.perf_counter()
+            ids: list[int] = [(await repo.create("bench", f"map {i}", s)).id for i, s in enumerate(states)]
+            write: float = (time.perf_counter() - start) / len(states)
+
+        async with sessions() as session:
+            repo = SqlAlchemyMapStateRepository(MapStateDAO(session, codec))
+            start = time.perf_counter()
+            for id in ids:
+                assert await repo.get(id) is not None
+                session.expunge_all()
+            read: float = (time.perf_counter() - start) / len(ids)
+
+            size_stmt = select(
+                func.sum(func.coalesce(func.length(MapStatePayload.state), 0) + func.coalesce(func.length(MapStatePayload.state_blob), 0))
+            )
+            stored: int = int((await session.execute(size_stmt)).scalar_one())
+        return stored, write, read
+    finally:
+        await engine.dispose()
+
+
+async def main(count: int, layers: int) -> None:
+    rng = random.Random(42)
+    states: list[str] = [make_state(rng, layers) for _ in range(count)]
+    raw: int = sum(len(s.encode()) for s in states)
+    dictionary: bytes = train_dictionary([make_state(rng, layers // 10) for _ in range(200)])
+
+    codecs: dict[str, StateCodec] = {
+        "identity": StateCodec(),
+        "zstd-3": StateCodec(threshold=0, level=3),
+        "zstd-9": StateCodec(threshold=0, level=9),
+        "zstd-3+dict": StateCodec(threshold=0, level=3, dictionary=dictionary),
+    }
+    print(f"{count} states, {raw / count / 1024:.0f} KiB average, {raw / 1024 / 1024:.1f} MiB total")
+    print(f"{'codec':<12} {'stored MiB':>10} {'ratio':>7} {'write ms':>9} {'read ms':>8}")
+    with TemporaryDirectory() as tmp:
+        for name, codec in codecs.items():
+            stored, write, read = await run(codec, states, f"sqlite+aiosqlite:///{Path(tmp) / (name + '.db')}")
+            print(f"{name:<12} {stored / 1024 / 1024:>10.2f} {raw / stored:>7.1f} {write * 1000:>9.2f} {read * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--states", type=int, default=200)
+    parser.add_argument("--layers", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.states, args.layers))
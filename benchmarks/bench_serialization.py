@@ -0,0 +1,115 @@
+"""Compare the per-item cost of serializing list responses.
+
+"response_model" is the previous path: each item validated into MessageRead by the
+route, validated again and dumped to Python by FastAPI's response_model handling,
+then encoded with json.dumps by JSONResponse. "json_list" validates once through a
+cached TypeAdapter and dumps JSON bytes directly. "envelope" is json_list's opt-in
+envelope format, which carries the user once instead of in every item.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_serialization.py [--rows 10000] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.api.envelope import ENVELOPE_MEDIA_TYPE
+from app.api.serialization import json_envelope, json_list, list_adapter
+from app.auth.oidc_user import OIDCUser
+from app.domain.messages.models import MessageDomain
+from app.schemas.messages import MessageListItem, MessageRead
+
+
+def make_messages(rows: int) -> list[MessageDomain]:
+    user = OIDCUser(
+        sub="bench-user",
+        preferred_username="bench",
+        email="bench@example.com",
+        name="Bench User",
+        roles=["user", "offline_access", "uma_authorization"],
+        groups=["/staff", "/staff/maps"],
+        extra={"tenant": "bench", "scope": "openid profile email"},
+    )
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        MessageDomain(
+            id=i,
+            user_id="bench-user",
+            content=f"message {i} " + "lorem ipsum " * 8,
+            user=user,
+            created_at=start + timedelta(seconds=i),
+            updated_at=start + timedelta(seconds=i),
+        )
+        for i in range(rows)
+    ]
+
+
+def response_model_path(items: list[MessageDomain]) -> bytes:
+    # FastAPI builds its response field once per route, too.
+    adapter: TypeAdapter[list[Any]] = list_adapter(MessageRead)
+    validated: list[MessageRead] = [MessageRead.model_validate(m) for m in items]
+    revalidated: list[MessageRead] = adapter.validate_python(validated, from_attributes=True)
+    content: Any = adapter.dump_python(revalidated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def orjson_response_path(items: list[MessageDomain]) -> bytes:
+    # The previous route code with ORJSONResponse as the default response class only.
+    adapter: TypeAdapter[list[Any]] = list_adapter(MessageRead)
+    validated: list[MessageRead] = [MessageRead.model_validate(m) for m in items]
+    return orjson.dumps(adapter.dump_python(adapter.validate_python(validated, from_attributes=True), mode="json"))
+
+
+def json_list_path(items: list[MessageDomain]) -> bytes:
+    return bytes(json_list(MessageRead, items).body)
+
+
+def envelope_path(items: list[MessageDomain]) -> bytes:
+    users: dict[str, OIDCUser] = {m.user_id: m.user for m in items[:1] if m.user is not None}
+    return bytes(json_envelope(MessageListItem, items, users, ENVELOPE_MEDIA_TYPE).body)
+
+
+def measure(path: Callable[[list[MessageDomain]], bytes], items: list[MessageDomain], repeat: int) -> float:
+    path(items)  # warm up (and build cached adapters)
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        path(items)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(rows: int, repeat: int) -> None:
+    items: list[MessageDomain] = make_messages(rows)
+    assert json.loads(response_model_path(items)) == json.loads(json_list_path(items))
+
+    baseline: float | None = None
+    print(f"{'path':<16} {'total ms':>10} {'µs/item':>10} {'speedup':>8} {'bytes/item':>10}")
+    for name, path in (
+        ("response_model", response_model_path),
+        ("orjson_response", orjson_response_path),
+        ("json_list", json_list_path),
+        ("envelope", envelope_path),
+    ):
+        seconds: float = measure(path, items, repeat)
+        size: int = len(path(items))
+        baseline = baseline or seconds
+        print(
+            f"{name:<16} {seconds * 1000:>10.1f} {seconds / rows * 1e6:>10.2f} {baseline / seconds:>7.1f}x"
+            f" {size / rows:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
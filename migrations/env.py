@@ -48,7 +48,9 @@ def do_run_migrations(connection: Connection) -> None:
 async def run_migrations_online() -> None:
     """Create async DB engine and run migrations."""
     engine: AsyncEngine = create_async_engine(db_url, poolclass=pool.NullPool)
-    async with engine.begin() as connection:
+    # connect() rather than begin(): Alembic manages the transaction itself so
+    # migrations can use autocommit blocks (e.g. CREATE INDEX CONCURRENTLY).
+    async with engine.connect() as connection:
         await connection.run_sync(do_run_migrations)
     await engine.dispose()
 
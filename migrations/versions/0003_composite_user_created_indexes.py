@@ -0,0 +1,50 @@
+"""Replace single-column indexes with composite (user_id, created_at DESC, id DESC) indexes
+
+Revision ID: 0003_composite_user_created_indexes
+Revises: 0002_create_map_state_table
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic.
+revision = "0003_composite_user_created_indexes"
+down_revision = "0002_create_map_state_table"
+branch_labels = None
+depends_on = None
+
+TABLES: tuple[str, ...] = ("messages", "map_states")
+
+
+def _concurrently() -> dict[str, bool]:
+    """Build indexes without locking writes on PostgreSQL."""
+    return {"postgresql_concurrently": True} if op.get_context().dialect.name == "postgresql" else {}
+
+
+def upgrade() -> None:
+    """Create composite listing indexes and drop the redundant id/user_id indexes."""
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f"ix_{table}_user_id_created_at_id",
+                table,
+                ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+                if_not_exists=True,
+                **_concurrently(),
+            )
+            # The primary key already indexes id; the composite index leads with user_id.
+            op.drop_index(f"ix_{table}_id", table_name=table, if_exists=True, **_concurrently())
+            op.drop_index(f"ix_{table}_user_id", table_name=table, if_exists=True, **_concurrently())
+
+
+def downgrade() -> None:
+    """Restore the single-column indexes and drop the composite ones."""
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(f"ix_{table}_id", table, ["id"], if_not_exists=True, **_concurrently())
+            op.create_index(f"ix_{table}_user_id", table, ["user_id"], if_not_exists=True, **_concurrently())
+            op.drop_index(
+                f"ix_{table}_user_id_created_at_id", table_name=table, if_exists=True, **_concurrently()
+            )
@@ -0,0 +1,74 @@
+"""Add full-text search over messages.content
+
+PostgreSQL gets a generated tsvector column with a GIN index; SQLite gets an
+external-content FTS5 table kept in sync by triggers.
+
+Revision ID: 0004_message_full_text_search
+Revises: 0003_composite_user_created_indexes
+Create Date: 2026-10-17 12:10:00.000000
+"""
+
+from alembic import op
+
+# Revision identifiers, used by Alembic.
+revision = "0004_message_full_text_search"
+down_revision = "0003_composite_user_created_indexes"
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE: tuple[str, ...] = (
+    "CREATE VIRTUAL TABLE messages_fts USING fts5(content, content='messages', content_rowid='id')",
+    "CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    # Index rows that existed before the table was created.
+    "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DOWNGRADE: tuple[str, ...] = (
+    "DROP TRIGGER IF EXISTS messages_fts_update",
+    "DROP TRIGGER IF EXISTS messages_fts_delete",
+    "DROP TRIGGER IF EXISTS messages_fts_insert",
+    "DROP TABLE IF EXISTS messages_fts",
+)
+
+
+def upgrade() -> None:
+    """Create the search column/index (PostgreSQL) or FTS5 table (SQLite)."""
+    if op.get_context().dialect.name != "postgresql":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+        return
+
+    # Adding a stored generated column rewrites the table once.
+    op.execute(
+        "ALTER TABLE messages ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english'::regconfig, content)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_search_vector",
+            "messages",
+            ["search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the search column/index (PostgreSQL) or FTS5 table (SQLite)."""
+    if op.get_context().dialect.name != "postgresql":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_messages_search_vector", table_name="messages", postgresql_concurrently=True, if_exists=True
+        )
+    op.drop_column("messages", "search_vector")
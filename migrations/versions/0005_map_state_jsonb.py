@@ -0,0 +1,46 @@
+"""Store map_states.state as JSONB on PostgreSQL
+
+SQLite keeps the Text column; its JSON functions operate on text directly.
+
+Revision ID: 0005_map_state_jsonb
+Revises: 0004_message_full_text_search
+Create Date: 2026-10-17 12:20:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# Revision identifiers, used by Alembic.
+revision = "0005_map_state_jsonb"
+down_revision = "0004_message_full_text_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Convert state to JSONB; fails if any existing row is not valid JSON."""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.alter_column(
+        "map_states",
+        "state",
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        existing_nullable=False,
+        postgresql_using="state::jsonb",
+    )
+
+
+def downgrade() -> None:
+    """Convert state back to Text."""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.alter_column(
+        "map_states",
+        "state",
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using="state::text",
+    )
@@ -0,0 +1,28 @@
+"""Add a version counter to map_states
+
+Revision ID: 0006_map_state_version
+Revises: 0005_map_state_jsonb
+Create Date: 2026-10-17 12:30:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic.
+revision = "0006_map_state_version"
+down_revision = "0005_map_state_jsonb"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add map_states.version, starting existing rows at 1."""
+    op.add_column(
+        "map_states",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Drop map_states.version."""
+    op.drop_column("map_states", "version")
@@ -0,0 +1,54 @@
+"""Allow map states to be stored zstd-compressed
+
+Adds a codec tag and a binary payload column. Compressed rows keep state NULL.
+
+Revision ID: 0007_map_state_compression
+Revises: 0006_map_state_version
+Create Date: 2026-10-17 12:40:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# Revision identifiers, used by Alembic.
+revision = "0007_map_state_compression"
+down_revision = "0006_map_state_version"
+branch_labels = None
+depends_on = None
+
+
+def _state_type() -> sa.types.TypeEngine:
+    return postgresql.JSONB() if op.get_context().dialect.name == "postgresql" else sa.Text()
+
+
+def _restore_listing_index() -> None:
+    """SQLite batch mode rebuilds the table from reflection, which loses DESC index columns."""
+    if op.get_context().dialect.name != "sqlite":
+        return
+    op.drop_index("ix_map_states_user_id_created_at_id", table_name="map_states")
+    op.create_index(
+        "ix_map_states_user_id_created_at_id",
+        "map_states",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+
+
+def upgrade() -> None:
+    """Add state_codec/state_blob and make state nullable."""
+    with op.batch_alter_table("map_states") as batch:
+        batch.add_column(sa.Column("state_codec", sa.String(32), server_default="identity", nullable=False))
+        batch.add_column(sa.Column("state_blob", sa.LargeBinary(), nullable=True))
+        batch.alter_column("state", existing_type=_state_type(), nullable=True)
+        batch.create_check_constraint("ck_map_states_state_present", "state IS NOT NULL OR state_blob IS NOT NULL")
+    _restore_listing_index()
+
+
+def downgrade() -> None:
+    """Drop the compression columns; run `python -m app.db.recompress --decompress` first."""
+    with op.batch_alter_table("map_states") as batch:
+        batch.drop_constraint("ck_map_states_state_present", type_="check")
+        batch.alter_column("state", existing_type=_state_type(), nullable=False)
+        batch.drop_column("state_blob")
+        batch.drop_column("state_codec")
+    _restore_listing_index()
@@ -0,0 +1,193 @@
+"""Move map state documents into a content-addressed payload table
+
+Each distinct document is stored once in map_state_payloads, keyed by the SHA-256 of
+its canonical JSON text and reference counted; map_states rows point at it via state_hash.
+Hashes are computed in Python (compressed rows must be decoded first), so this
+revision needs a database connection and cannot be rendered with --sql.
+
+Revision ID: 0008_map_state_payloads
+Revises: 0007_map_state_compression
+Create Date: 2026-10-17 13:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.core.settings import get_settings
+from app.db.compression import codec_from_settings, decode_state
+from app.db.entities.map_state_payload import content_hash
+
+# Revision identifiers, used by Alembic.
+revision = "0008_map_state_payloads"
+down_revision = "0007_map_state_compression"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE: int = 1000
+
+
+def _state_type() -> sa.types.TypeEngine:
+    return postgresql.JSONB() if op.get_context().dialect.name == "postgresql" else sa.Text()
+
+
+def _restore_listing_index() -> None:
+    """SQLite batch mode rebuilds the table from reflection, which loses DESC index columns."""
+    if op.get_context().dialect.name != "sqlite":
+        return
+    op.drop_index("ix_map_states_user_id_created_at_id", table_name="map_states")
+    op.create_index(
+        "ix_map_states_user_id_created_at_id",
+        "map_states",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+
+
+def _copy_payloads() -> None:
+    """Store each distinct document once and point map_states rows at it."""
+    if op.get_context().as_sql:
+        raise RuntimeError("0008_map_state_payloads hashes existing states in Python; run it online")
+    # Registers the configured compression dictionary so dictionary-compressed rows decode.
+    codec_from_settings(get_settings().storage)
+
+    bind = op.get_bind()
+    map_states = sa.table(
+        "map_states",
+        sa.column("id", sa.Integer()),
+        sa.column("state", _state_type()),
+        sa.column("state_codec", sa.String()),
+        sa.column("state_blob", sa.LargeBinary()),
+        sa.column("state_hash", sa.String()),
+    )
+    payloads = sa.table(
+        "map_state_payloads",
+        sa.column("hash", sa.String()),
+        sa.column("state", _state_type()),
+        sa.column("state_codec", sa.String()),
+        sa.column("state_blob", sa.LargeBinary()),
+        sa.column("size_bytes", sa.Integer()),
+        sa.column("ref_count", sa.Integer()),
+    )
+
+    stored: set[str] = set()
+    after_id: int = 0
+    while True:
+        rows = bind.execute(
+            sa.select(
+                map_states.c.id,
+                sa.cast(map_states.c.state, sa.Text()).label("state"),
+                map_states.c.state_codec,
+                map_states.c.state_blob,
+            )
+            .where(map_states.c.id > after_id)
+            .order_by(map_states.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        new_payloads: list[dict] = []
+        links: list[dict] = []
+        for row in rows:
+            document: str = decode_state(row.state, row.state_codec, row.state_blob)
+            digest: str = content_hash(document)
+            links.append({"b_id": row.id, "b_hash": digest})
+            if digest not in stored:
+                stored.add(digest)
+                new_payloads.append(
+                    {
+                        "hash": digest,
+                        # Keep the stored encoding; only the hash needs the decoded text.
+                        "state": row.state,
+                        "state_codec": row.state_codec,
+                        "state_blob": row.state_blob,
+                        "size_bytes": len(document.encode()),
+                        "ref_count": 0,
+                    }
+                )
+
+        if new_payloads:
+            bind.execute(sa.insert(payloads), new_payloads)
+        bind.execute(
+            sa.update(map_states)
+            .where(map_states.c.id == sa.bindparam("b_id"))
+            .values(state_hash=sa.bindparam("b_hash")),
+            links,
+        )
+        after_id = rows[-1].id
+
+    references = (
+        sa.select(sa.func.count())
+        .select_from(map_states)
+        .where(map_states.c.state_hash == payloads.c.hash)
+        .scalar_subquery()
+    )
+    bind.execute(sa.update(payloads).values(ref_count=references))
+
+
+def upgrade() -> None:
+    """Create map_state_payloads, move states into it and replace the state columns with state_hash."""
+    op.create_table(
+        "map_state_payloads",
+        sa.Column("hash", sa.String(64), primary_key=True),
+        sa.Column("state", _state_type(), nullable=True),
+        sa.Column("state_codec", sa.String(32), server_default="identity", nullable=False),
+        sa.Column("state_blob", sa.LargeBinary(), nullable=True),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), server_default="1", nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.CheckConstraint("state IS NOT NULL OR state_blob IS NOT NULL", name="ck_map_state_payloads_state_present"),
+    )
+    op.add_column("map_states", sa.Column("state_hash", sa.String(64), nullable=True))
+
+    _copy_payloads()
+
+    with op.batch_alter_table("map_states") as batch:
+        batch.alter_column("state_hash", existing_type=sa.String(64), nullable=False)
+        batch.create_foreign_key("fk_map_states_state_hash", "map_state_payloads", ["state_hash"], ["hash"])
+        batch.create_index("ix_map_states_state_hash", ["state_hash"])
+        batch.drop_constraint("ck_map_states_state_present", type_="check")
+        batch.drop_column("state_blob")
+        batch.drop_column("state_codec")
+        batch.drop_column("state")
+    _restore_listing_index()
+
+
+def downgrade() -> None:
+    """Copy each row's payload back into map_states and drop map_state_payloads."""
+    with op.batch_alter_table("map_states") as batch:
+        batch.add_column(sa.Column("state", _state_type(), nullable=True))
+        batch.add_column(sa.Column("state_codec", sa.String(32), server_default="identity", nullable=False))
+        batch.add_column(sa.Column("state_blob", sa.LargeBinary(), nullable=True))
+
+    map_states = sa.table(
+        "map_states",
+        sa.column("state", _state_type()),
+        sa.column("state_codec", sa.String()),
+        sa.column("state_blob", sa.LargeBinary()),
+        sa.column("state_hash", sa.String()),
+    )
+    payloads = sa.table(
+        "map_state_payloads",
+        sa.column("hash", sa.String()),
+        sa.column("state", _state_type()),
+        sa.column("state_codec", sa.String()),
+        sa.column("state_blob", sa.LargeBinary()),
+    )
+
+    def _payload(column: str) -> sa.ScalarSelect:
+        return sa.select(payloads.c[column]).where(payloads.c.hash == map_states.c.state_hash).scalar_subquery()
+
+    op.execute(
+        sa.update(map_states).values(
+            state=_payload("state"), state_codec=_payload("state_codec"), state_blob=_payload("state_blob")
+        )
+    )
+
+    with op.batch_alter_table("map_states") as batch:
+        batch.drop_constraint("fk_map_states_state_hash", type_="foreignkey")
+        batch.drop_index("ix_map_states_state_hash")
+        batch.drop_column("state_hash")
+        batch.create_check_constraint("ck_map_states_state_present", "state IS NOT NULL OR state_blob IS NOT NULL")
+    _restore_listing_index()
+    op.drop_table("map_state_payloads")
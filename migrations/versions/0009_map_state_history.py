@@ -0,0 +1,87 @@
+"""Add map state version history
+
+Each version is a row in map_state_history: a snapshot referencing a payload, or a
+JSON Patch delta from the previous version. Existing map states start their history
+with a snapshot of their current version.
+
+Revision ID: 0009_map_state_history
+Revises: 0008_map_state_payloads
+Create Date: 2026-10-17 13:20:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic.
+revision = "0009_map_state_history"
+down_revision = "0008_map_state_payloads"
+branch_labels = None
+depends_on = None
+
+map_states = sa.table(
+    "map_states",
+    sa.column("id", sa.Integer()),
+    sa.column("name", sa.String()),
+    sa.column("state_hash", sa.String()),
+    sa.column("version", sa.Integer()),
+    sa.column("updated_at", sa.DateTime(timezone=True)),
+)
+history = sa.table(
+    "map_state_history",
+    sa.column("map_state_id", sa.Integer()),
+    sa.column("version", sa.Integer()),
+    sa.column("name", sa.String()),
+    sa.column("state_hash", sa.String()),
+    sa.column("created_at", sa.DateTime(timezone=True)),
+)
+payloads = sa.table(
+    "map_state_payloads",
+    sa.column("hash", sa.String()),
+    sa.column("ref_count", sa.Integer()),
+)
+
+
+def _snapshot_refs() -> sa.ScalarSelect:
+    return (
+        sa.select(sa.func.count())
+        .select_from(history)
+        .where(history.c.state_hash == payloads.c.hash)
+        .scalar_subquery()
+    )
+
+
+def upgrade() -> None:
+    """Create map_state_history and snapshot every map state's current version."""
+    op.create_table(
+        "map_state_history",
+        sa.Column("map_state_id", sa.Integer(), sa.ForeignKey("map_states.id"), primary_key=True),
+        sa.Column("version", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("state_hash", sa.String(64), sa.ForeignKey("map_state_payloads.hash"), nullable=True),
+        sa.Column("delta", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.CheckConstraint(
+            "(state_hash IS NULL) <> (delta IS NULL)", name="ck_map_state_history_snapshot_or_delta"
+        ),
+    )
+    op.execute(
+        sa.insert(history).from_select(
+            ["map_state_id", "version", "name", "state_hash", "created_at"],
+            sa.select(
+                map_states.c.id,
+                map_states.c.version,
+                map_states.c.name,
+                map_states.c.state_hash,
+                map_states.c.updated_at,
+            ),
+        )
+    )
+    op.execute(sa.update(payloads).values(ref_count=payloads.c.ref_count + _snapshot_refs()))
+
+
+def downgrade() -> None:
+    """Release the snapshot references and drop map_state_history."""
+    op.execute(sa.update(payloads).values(ref_count=payloads.c.ref_count - _snapshot_refs()))
+    # Payloads referenced only by history are no longer needed.
+    op.execute(sa.delete(payloads).where(payloads.c.ref_count <= 0))
+    op.drop_table("map_state_history")
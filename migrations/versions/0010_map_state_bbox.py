@@ -0,0 +1,159 @@
+"""Add spatial bounding boxes to map states
+
+Each payload stores the bounding box of the GeoJSON geometries in its document.
+PostgreSQL derives a PostGIS envelope from it with a GiST index; SQLite gets an R-tree
+keyed by map state id, kept in sync by triggers. Existing documents are parsed in
+Python (compressed ones must be decoded first), so this revision needs a database
+connection and cannot be rendered with --sql.
+
+Revision ID: 0010_map_state_bbox
+Revises: 0009_map_state_history
+Create Date: 2026-10-17 14:00:00.000000
+"""
+
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.settings import get_settings
+from app.db.compression import codec_from_settings, decode_state
+from app.domain.map_states.geometry import BoundingBox, bounding_box
+
+# Revision identifiers, used by Alembic.
+revision = "0010_map_state_bbox"
+down_revision = "0009_map_state_history"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE: int = 1000
+BBOX_COLUMNS: tuple[str, ...] = ("bbox_min_x", "bbox_min_y", "bbox_max_x", "bbox_max_y")
+
+RTREE_INSERT: str = (
+    "INSERT INTO map_states_rtree(id, min_x, max_x, min_y, max_y) "
+    "SELECT new.id, bbox_min_x, bbox_max_x, bbox_min_y, bbox_max_y FROM map_state_payloads "
+    "WHERE hash = new.state_hash AND bbox_min_x IS NOT NULL;"
+)
+
+SQLITE_UPGRADE: tuple[str, ...] = (
+    "CREATE VIRTUAL TABLE map_states_rtree USING rtree(id, min_x, max_x, min_y, max_y)",
+    f"CREATE TRIGGER map_states_rtree_insert AFTER INSERT ON map_states BEGIN {RTREE_INSERT} END",
+    "CREATE TRIGGER map_states_rtree_update AFTER UPDATE OF state_hash ON map_states BEGIN "
+    f"DELETE FROM map_states_rtree WHERE id = old.id; {RTREE_INSERT} END",
+    "CREATE TRIGGER map_states_rtree_delete AFTER DELETE ON map_states BEGIN "
+    "DELETE FROM map_states_rtree WHERE id = old.id; END",
+    # Index rows that existed before the table was created.
+    "INSERT INTO map_states_rtree(id, min_x, max_x, min_y, max_y) "
+    "SELECT map_states.id, bbox_min_x, bbox_max_x, bbox_min_y, bbox_max_y FROM map_states "
+    "JOIN map_state_payloads ON map_state_payloads.hash = map_states.state_hash WHERE bbox_min_x IS NOT NULL",
+)
+
+SQLITE_DOWNGRADE: tuple[str, ...] = (
+    "DROP TRIGGER IF EXISTS map_states_rtree_delete",
+    "DROP TRIGGER IF EXISTS map_states_rtree_update",
+    "DROP TRIGGER IF EXISTS map_states_rtree_insert",
+    "DROP TABLE IF EXISTS map_states_rtree",
+)
+
+
+def _fill_bboxes() -> None:
+    """Derive the bounding box of every stored document."""
+    if op.get_context().as_sql:
+        raise RuntimeError("0010_map_state_bbox parses existing states in Python; run it online")
+    # Registers the configured compression dictionary so dictionary-compressed rows decode.
+    codec_from_settings(get_settings().storage)
+
+    bind = op.get_bind()
+    payloads = sa.table(
+        "map_state_payloads",
+        sa.column("hash", sa.String()),
+        sa.column("state", sa.Text()),
+        sa.column("state_codec", sa.String()),
+        sa.column("state_blob", sa.LargeBinary()),
+        *(sa.column(name, sa.Float()) for name in BBOX_COLUMNS),
+    )
+    after_hash: str = ""
+    while True:
+        rows = bind.execute(
+            sa.select(
+                payloads.c.hash,
+                sa.cast(payloads.c.state, sa.Text()).label("state"),
+                payloads.c.state_codec,
+                payloads.c.state_blob,
+            )
+            .where(payloads.c.hash > after_hash)
+            .order_by(payloads.c.hash)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        boxes: list[dict] = []
+        for row in rows:
+            bbox: BoundingBox | None = bounding_box(json.loads(decode_state(row.state, row.state_codec, row.state_blob)))
+            if bbox is not None:
+                boxes.append(
+                    {
+                        "b_hash": row.hash,
+                        "bbox_min_x": bbox.min_x,
+                        "bbox_min_y": bbox.min_y,
+                        "bbox_max_x": bbox.max_x,
+                        "bbox_max_y": bbox.max_y,
+                    }
+                )
+        if boxes:
+            bind.execute(
+                sa.update(payloads)
+                .where(payloads.c.hash == sa.bindparam("b_hash"))
+                .values({name: sa.bindparam(name) for name in BBOX_COLUMNS}),
+                boxes,
+            )
+        after_hash = rows[-1].hash
+
+
+def upgrade() -> None:
+    """Add and fill the bounding box columns, then index them (GiST on PostgreSQL, R-tree on SQLite)."""
+    for name in BBOX_COLUMNS:
+        op.add_column("map_state_payloads", sa.Column(name, sa.Float(), nullable=True))
+
+    _fill_bboxes()
+
+    if op.get_context().dialect.name != "postgresql":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+    op.execute(
+        "ALTER TABLE map_state_payloads ADD COLUMN bbox geometry(Polygon, 4326) GENERATED ALWAYS AS "
+        "(ST_MakeEnvelope(bbox_min_x, bbox_min_y, bbox_max_x, bbox_max_y, 4326)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_map_state_payloads_bbox",
+            "map_state_payloads",
+            ["bbox"],
+            postgresql_using="gist",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the spatial index and the bounding box columns."""
+    if op.get_context().dialect.name != "postgresql":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    else:
+        with op.get_context().autocommit_block():
+            op.drop_index(
+                "ix_map_state_payloads_bbox",
+                table_name="map_state_payloads",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+        op.drop_column("map_state_payloads", "bbox")
+
+    with op.batch_alter_table("map_state_payloads") as batch:
+        for name in reversed(BBOX_COLUMNS):
+            batch.drop_column(name)
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from fastapi import HTTPException, Query
+
+from app.domain.pagination import MAX_PAGE_SIZE
+
+# Most IDs one batched lookup may ask for.
+MAX_BATCH_IDS: int = MAX_PAGE_SIZE
+
+
+def batch_ids(
+    ids: str | None = Query(
+        None, description=f"Comma-separated IDs to fetch in one request (at most {MAX_BATCH_IDS})"
+    ),
+) -> list[int] | None:
+    """Dependency parsing the `ids` query parameter; duplicates are dropped, order is kept."""
+    if ids is None:
+        return None
+    try:
+        parsed: list[int] = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    unique: list[int] = list(dict.fromkeys(parsed))
+    if not unique:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    if len(unique) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids may be requested at once")
+    return unique
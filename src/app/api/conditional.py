@@ -0,0 +1,72 @@
+"""HTTP conditional request helpers (RFC 9110, section 13) for single-item routes."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+
+def strong_etag(*parts: object) -> str:
+    """Build a strong entity tag from the parts that identify a representation."""
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite returns naive timestamps; they are stored in UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def timestamp_tag(value: datetime) -> int:
+    """A timestamp as integer microseconds, for use as an ETag part."""
+    delta = _utc(value) - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def etag_matches(header: str | None, etag: str, *, weak: bool) -> bool:
+    """Whether an If-Match / If-None-Match header lists etag (or "*").
+
+    Weak comparison ignores W/ prefixes; strong comparison never matches weak tags.
+    """
+    if header is None:
+        return False
+    tags: list[str] = [tag.strip() for tag in header.split(",")]
+    if "*" in tags:
+        return True
+    if weak:
+        tags = [tag.removeprefix("W/") for tag in tags]
+    return etag in tags
+
+
+def has_preconditions(request: Request) -> bool:
+    """Whether a GET carries validators, making a cheap metadata check worthwhile."""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when no If-None-Match is sent."""
+    if_none_match: str | None = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag, weak=True)
+    if_modified_since: str | None = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since: datetime = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one-second resolution.
+    return _utc(last_modified).replace(microsecond=0) <= _utc(since)
+
+
+def set_validators(response: Response, etag: str, last_modified: datetime) -> None:
+    """Send ETag and Last-Modified for a representation."""
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = format_datetime(_utc(last_modified), usegmt=True)
+
+
+def not_modified_response(etag: str, last_modified: datetime) -> Response:
+    """A bodiless 304 carrying the current validators."""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,60 @@
+"""Opt-in list envelopes: the owning users once per response instead of once per item."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Mapping, Sequence
+
+from fastapi import Depends, Request, Response
+from pydantic import BaseModel
+
+from app.api.serialization import json_envelope, json_list
+from app.auth.oidc_user import OIDCUser, map_oidc_user
+from app.auth.users import UserResolver, get_user_resolver
+
+# Accepting this media type selects the envelope: {"users": {user_id: user}, "items": [...]}.
+ENVELOPE_MEDIA_TYPE: str = "application/vnd.app.envelope+json"
+
+
+def accepts_envelope(request: Request) -> bool:
+    """Whether the client listed the envelope media type in its Accept header."""
+    accept: str = request.headers.get("accept", "")
+    return any(part.split(";")[0].strip() == ENVELOPE_MEDIA_TYPE for part in accept.split(","))
+
+
+@dataclass(frozen=True)
+class ListRenderer:
+    """Renders a list response for the requesting user, as a plain list or an envelope."""
+    user: OIDCUser
+    envelope: bool
+    resolver: UserResolver
+
+    async def render(
+        self: ListRenderer,
+        model: type[BaseModel],
+        item_model: type[BaseModel],
+        items: Sequence[Any],
+        response: Response,
+    ) -> Response:
+        """Serialize items as a list of model, or as an envelope of item_model when one was asked for.
+
+        The plain list embeds the requesting user in every item, as it always has. The
+        envelope holds each owner once, as resolved in one call by the UserResolver;
+        owners it does not know are left for clients to look up by user_id.
+        """
+        response.headers["Vary"] = "Accept"
+        if not self.envelope:
+            for item in items:
+                item.user = self.user
+            return json_list(model, items, response)
+        owner_ids: set[str] = {item.user_id for item in items}
+        users: Mapping[str, OIDCUser] = await self.resolver.resolve(owner_ids) if owner_ids else {}
+        return json_envelope(item_model, items, users, ENVELOPE_MEDIA_TYPE, response)
+
+
+def list_renderer(
+    request: Request,
+    user: OIDCUser = Depends(map_oidc_user),
+    resolver: UserResolver = Depends(get_user_resolver),
+) -> ListRenderer:
+    """Dependency providing the ListRenderer negotiated from the request's Accept header."""
+    return ListRenderer(user=user, envelope=accepts_envelope(request), resolver=resolver)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from enum import StrEnum
+from typing import Any, AsyncIterator, Sequence
+
+from fastapi.responses import StreamingResponse
+
+EXPORT_CHUNK_SIZE: int = 1000
+
+
+class ExportFormat(StrEnum):
+    """Supported bulk export formats."""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self: ExportFormat) -> str:
+        return "application/x-ndjson" if self is ExportFormat.NDJSON else "text/csv"
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def _ndjson_chunks(chunks: AsyncIterator[Sequence[Any]], fields: Sequence[str]) -> AsyncIterator[str]:
+    async for items in chunks:
+        yield "".join(
+            json.dumps({f: _plain(getattr(item, f)) for f in fields}, ensure_ascii=False) + "\n"
+            for item in items
+        )
+
+
+async def _csv_chunks(chunks: AsyncIterator[Sequence[Any]], fields: Sequence[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue()
+    async for items in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(getattr(item, f)) for f in fields] for item in items)
+        yield buffer.getvalue()
+
+
+def export_response(
+    chunks: AsyncIterator[Sequence[Any]],
+    fields: Sequence[str],
+    format: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    """Stream chunks of items as NDJSON or CSV, writing one HTTP chunk per database chunk."""
+    body: AsyncIterator[str] = (
+        _ndjson_chunks(chunks, fields) if format is ExportFormat.NDJSON else _csv_chunks(chunks, fields)
+    )
+    return StreamingResponse(
+        body,
+        media_type=format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format.value}"'},
+    )
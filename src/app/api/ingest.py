@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, TypeVar
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+# Longest NDJSON line accepted, so a body without newlines cannot grow the buffer unbounded.
+MAX_NDJSON_LINE_BYTES: int = 1024 * 1024
+
+
+async def read_ndjson(
+    request: Request,
+    model: type[M],
+    max_records: int,
+    max_line_bytes: int = MAX_NDJSON_LINE_BYTES,
+) -> AsyncIterator[M]:
+    """Parse a newline-delimited JSON request body incrementally into models.
+
+    Lines are validated as they arrive so large uploads never sit in memory; blank
+    lines are skipped and the first invalid line aborts with a 422. A body with more
+    than max_records records, or a line longer than max_line_bytes, aborts with a 413.
+    """
+    buffer: bytes = b""
+    line_no: int = 0
+    records: int = 0
+
+    def too_long() -> HTTPException:
+        return HTTPException(status_code=413, detail=f"NDJSON line {line_no} is longer than {max_line_bytes} bytes")
+
+    def parse(line: bytes) -> M:
+        nonlocal records
+        if len(line) > max_line_bytes:
+            raise too_long()
+        records += 1
+        if records > max_records:
+            raise HTTPException(status_code=413, detail=f"At most {max_records} NDJSON records may be sent at once")
+        try:
+            return model.model_validate_json(line)
+        except ValidationError as exc:
+            raise HTTPException(
+                status_code=422, detail=f"Invalid NDJSON record on line {line_no}: {exc.errors()}"
+            ) from exc
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield parse(line)
+        if len(buffer) > max_line_bytes:
+            line_no += 1
+            raise too_long()
+
+    if buffer.strip():
+        line_no += 1
+        yield parse(buffer)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import HTTPException, Query, Response
+
+from app.domain.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, KeysetCursor, Page, RankCursor
+
+NEXT_CURSOR_HEADER: str = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class PageParams:
+    """Validated keyset pagination parameters from the query string."""
+    limit: int
+    after: KeysetCursor | None
+
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of items to return"),
+    cursor: str | None = Query(None, description=f"Opaque cursor from a previous {NEXT_CURSOR_HEADER} header"),
+) -> PageParams:
+    """Dependency parsing `limit` and `cursor` query parameters."""
+    try:
+        after: KeysetCursor | None = KeysetCursor.decode(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return PageParams(limit=limit, after=after)
+
+
+@dataclass(frozen=True)
+class RankPageParams:
+    """Validated pagination parameters for relevance-ranked results."""
+    limit: int
+    after: RankCursor | None
+
+
+def rank_page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of items to return"),
+    cursor: str | None = Query(None, description=f"Opaque cursor from a previous {NEXT_CURSOR_HEADER} header"),
+) -> RankPageParams:
+    """Dependency parsing `limit` and `cursor` query parameters for ranked results."""
+    try:
+        after: RankCursor | None = RankCursor.decode(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return RankPageParams(limit=limit, after=after)
+
+
+def set_next_cursor(response: Response, page: Page[Any]) -> None:
+    """Expose the cursor for the following page, if there is one."""
+    if page.next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor.encode()
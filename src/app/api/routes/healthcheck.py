@@ -1,13 +1,23 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from structlog import BoundLogger
 
 from app.core.logging import get_logger
 from app.schemas.health.response import HealthCheckResponse
-from app.db.session import get_async_session
+from app.db.session import get_async_session, get_pool_status
 from app.services.health_service import HealthCheckService
 from app.infrastructure.health.repository import DefaultHealthCheckRepository
 from app.infrastructure.health.dao import HealthDAO
+from app.auth.token_cache import get_token_cache
+from app.infrastructure.cache import cache_status
+from app.infrastructure.map_states.cached_repository import get_map_state_cache, get_shared_map_state_cache
+from app.infrastructure.messages.cached_repository import get_message_cache, get_shared_message_cache
+from app.infrastructure.shared_cache import SharedEntityCache, shared_cache_status
+from app.api.routes.map_states import get_map_state_flights
+from app.api.routes.messages import get_message_flights
+from app.services.single_flight import single_flight_status
 from app.domain.health.models import HealthCheck
 
 log: BoundLogger = get_logger()
@@ -28,3 +38,29 @@ async def healthcheck(
     result: HealthCheck = await service.run()
     log.info("Health check result", result=result)
     return result.to_response()
+
+@router.get("/health/cache")
+async def cache_health() -> dict[str, Any]:
+    """Report read-through and verified-token cache counters and how many concurrent reads were coalesced."""
+    shared_messages: SharedEntityCache[Any] | None = get_shared_message_cache()
+    shared_map_states: SharedEntityCache[Any] | None = get_shared_map_state_cache()
+    return {
+        "messages": cache_status(get_message_cache()),
+        "map_states": cache_status(get_map_state_cache()),
+        "tokens": cache_status(get_token_cache()),
+        "shared": {
+            "messages": shared_cache_status(shared_messages.cache if shared_messages is not None else None),
+            "map_states": shared_cache_status(shared_map_states.cache if shared_map_states is not None else None),
+        },
+        "single_flight": {
+            "messages": single_flight_status(get_message_flights()),
+            "map_states": single_flight_status(get_map_state_flights()),
+        },
+    }
+
+@router.get("/health/pool")
+async def pool_health(
+    status: dict[str, Any] = Depends(get_pool_status),
+) -> dict[str, Any]:
+    """Report database connection pool usage and checkout wait times."""
+    return status
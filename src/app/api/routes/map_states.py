@@ -1,16 +1,72 @@
 from __future__ import annotations
 
-from typing import Sequence
+from enum import Enum
+from functools import lru_cache
+from typing import AsyncIterator, Sequence
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic_core import from_json
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from structlog import BoundLogger
 
+from app.api.batch import batch_ids
+from app.api.conditional import (
+    etag_matches,
+    has_preconditions,
+    not_modified,
+    not_modified_response,
+    set_validators,
+    strong_etag,
+)
+from app.api.envelope import ListRenderer, list_renderer
+from app.api.export import EXPORT_CHUNK_SIZE, ExportFormat, export_response
+from app.api.pagination import PageParams, page_params, set_next_cursor
+from app.api.serialization import json_item, json_list
 from app.auth.oidc_user import OIDCUser, map_oidc_user
-from app.db.session import get_async_session
-from app.domain.map_states.models import MapStateDomain
-from app.schemas.map_states import MapStateCreate, MapStateRead, MapStateUpdate
+from app.core.settings import Settings, get_settings
+from app.db.compression import StateCodec, get_state_codec
+from app.db.session import get_async_session, get_session_factory
+from app.domain.map_states.geometry import BoundingBox, parse_bbox
+from app.domain.map_states.interfaces import MapStateRepository
+from app.domain.map_states.models import (
+    MapStateDomain,
+    MapStateHistoryEntry,
+    MapStateMetadata,
+    MapStateSummary,
+    MapStateVersionInfo,
+)
+from app.domain.map_states.patch import (
+    JSON_PATCH_MEDIA_TYPE,
+    MERGE_PATCH_MEDIA_TYPE,
+    JsonPatch,
+    MergePatch,
+    PatchConflict,
+    StatePatch,
+)
+from app.domain.map_states.paths import parse_fields, parse_path
+from app.domain.map_states.simplify import MAX_ZOOM, SimplificationCache, tolerance_for_zoom
+from app.domain.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Page
+from app.schemas.map_states import (
+    MapStateCreate,
+    MapStateHistoryRead,
+    MapStateListItem,
+    MapStateRead,
+    MapStateSummaryListItem,
+    MapStateSummaryRead,
+    MapStateUpdate,
+    MapStateVersion,
+)
 from app.services.map_state_service import MapStateService
+from app.services.single_flight import SingleFlight
+from app.infrastructure.cache import LRUCache
+from app.infrastructure.map_states.cached_repository import (
+    CachingMapStateRepository,
+    SharedCacheMapStateRepository,
+    get_map_state_cache,
+    get_shared_map_state_cache,
+)
+from app.infrastructure.shared_cache import SharedEntityCache
 from app.infrastructure.map_states.dao import MapStateDAO
 from app.infrastructure.map_states.repository import SqlAlchemyMapStateRepository
 from app.core.logging import get_logger
@@ -19,13 +75,44 @@
 
 router = APIRouter(prefix="/api/map-states", tags=["MapStates"])
 
+MAP_STATE_EXPORT_FIELDS: tuple[str, ...] = (
+    "id",
+    "user_id",
+    "name",
+    "state",
+    "created_at",
+    "updated_at",
+)
+
+
+@lru_cache
+def get_simplification_cache() -> SimplificationCache:
+    """The process-wide cache of simplified map states, sized from settings."""
+    return SimplificationCache(get_settings().geometry.simplify_cache_size)
+
+
+@lru_cache
+def get_map_state_flights() -> SingleFlight:
+    """The process-wide group coalescing identical concurrent map state reads."""
+    return SingleFlight()
+
 
 def get_map_state_service(
     session: AsyncSession = Depends(get_async_session),
+    codec: StateCodec = Depends(get_state_codec),
+    simplified: SimplificationCache = Depends(get_simplification_cache),
+    cache: LRUCache[int, MapStateDomain] | None = Depends(get_map_state_cache),
+    shared: SharedEntityCache[MapStateDomain] | None = Depends(get_shared_map_state_cache),
+    flights: SingleFlight = Depends(get_map_state_flights),
+    settings: Settings = Depends(get_settings),
 ) -> MapStateService:
-    dao = MapStateDAO(session)
-    repo = SqlAlchemyMapStateRepository(dao)
-    return MapStateService(repo)
+    dao = MapStateDAO(session, codec, settings.storage.history_snapshot_interval)
+    repo: MapStateRepository = SqlAlchemyMapStateRepository(dao)
+    if shared is not None:
+        repo = SharedCacheMapStateRepository(repo, shared)
+    if cache is not None:
+        repo = CachingMapStateRepository(repo, cache)
+    return MapStateService(repo, simplified, flights)
 
 
 @router.post("/", response_model=MapStateRead, status_code=status.HTTP_201_CREATED)
@@ -33,60 +120,223 @@ async def create_map_state(
     payload: MapStateCreate,
     user: OIDCUser = Depends(map_oidc_user),
     service: MapStateService = Depends(get_map_state_service),
-) -> MapStateRead:
+) -> Response:
     created: MapStateDomain = await service.create(user_id=user.sub, payload=payload)
     created.user = user
     log.info("Created map state", map_state_id=created.id, user_id=user.sub)
-    return MapStateRead.model_validate(created)
+    return json_item(MapStateRead, created, status_code=status.HTTP_201_CREATED)
+
+
+class MapStateView(str, Enum):
+    """How much of each map state a listing returns."""
+
+    SUMMARY = "summary"
+    FULL = "full"
+
+
+MapStateListing = list[MapStateSummaryRead] | list[MapStateRead]
+
+
+async def _list_page(
+    service: MapStateService,
+    response: Response,
+    paging: PageParams,
+    view: MapStateView,
+    renderer: ListRenderer,
+    user_id: str | None,
+) -> Response:
+    if view is MapStateView.SUMMARY:
+        # Summaries are projected in SQL, so state documents are never read.
+        summaries: Page[MapStateSummary] = await service.list_summaries_page(user_id, paging.limit, paging.after)
+        set_next_cursor(response, summaries)
+        return await renderer.render(MapStateSummaryRead, MapStateSummaryListItem, summaries.items, response)
+
+    if user_id is None:
+        page: Page[MapStateDomain] = await service.list_page(paging.limit, paging.after)
+    else:
+        page = await service.list_by_user_page(user_id, paging.limit, paging.after)
+    set_next_cursor(response, page)
+    return await renderer.render(MapStateRead, MapStateListItem, page.items, response)
 
 
-@router.get("/", response_model=list[MapStateRead])
+@router.get("/", response_model=MapStateListing)
 async def list_all_map_states(
+    response: Response,
+    paging: PageParams = Depends(page_params),
+    view: MapStateView = Query(MapStateView.SUMMARY, description="summary omits state; full includes it"),
+    ids: list[int] | None = Depends(batch_ids),
     user: OIDCUser = Depends(map_oidc_user),
     service: MapStateService = Depends(get_map_state_service),
-) -> list[MapStateRead]:
+    renderer: ListRenderer = Depends(list_renderer),
+) -> Response:
+    """List all map states (admin only), or with `ids` fetch those map states in one query.
+
+    Batched fetches return full map states in the order given, like GET /{map_state_id}
+    would, so `view` does not apply. Ownership is checked per map state; IDs that do not
+    exist or may not be read are left out.
+    """
+    if ids is not None:
+        found: list[MapStateDomain] = await service.get_many(ids)
+        readable: list[MapStateDomain] = [ms for ms in found if _may_read(ms.user_id, user)]
+        log.info("Fetched map states by id", requested=len(ids), returned=len(readable), user_id=user.sub)
+        return await renderer.render(MapStateRead, MapStateListItem, readable, response)
+
     if "admin" not in (user.roles or []):
         raise HTTPException(status_code=403, detail="Admin privileges required")
 
-    map_states: Sequence[MapStateDomain] = await service.list()
-    for m in map_states:
-        m.user = user
-    return [MapStateRead.model_validate(m) for m in map_states]
+    return await _list_page(service, response, paging, view, renderer, None)
 
 
-@router.get("/me", response_model=list[MapStateRead])
+@router.get("/me", response_model=MapStateListing)
 async def list_my_map_states(
+    response: Response,
+    paging: PageParams = Depends(page_params),
+    view: MapStateView = Query(MapStateView.SUMMARY, description="summary omits state; full includes it"),
     user: OIDCUser = Depends(map_oidc_user),
     service: MapStateService = Depends(get_map_state_service),
-) -> list[MapStateRead]:
-    map_states: Sequence[MapStateDomain] = await service.list_by_user(user.sub)
-    for m in map_states:
-        m.user = user
-    return [MapStateRead.model_validate(m) for m in map_states]
+    renderer: ListRenderer = Depends(list_renderer),
+) -> Response:
+    return await _list_page(service, response, paging, view, renderer, user.sub)
 
 
-@router.get("/by/{user_id}", response_model=list[MapStateRead])
+@router.get("/by/{user_id}", response_model=MapStateListing)
 async def list_map_states_by_user_id(
     user_id: str,
+    response: Response,
+    paging: PageParams = Depends(page_params),
+    view: MapStateView = Query(MapStateView.SUMMARY, description="summary omits state; full includes it"),
     user: OIDCUser = Depends(map_oidc_user),
     service: MapStateService = Depends(get_map_state_service),
-) -> list[MapStateRead]:
+    renderer: ListRenderer = Depends(list_renderer),
+) -> Response:
     if "admin" not in (user.roles or []):
         raise HTTPException(status_code=403, detail="Admin privileges required")
 
-    map_states: Sequence[MapStateDomain] = await service.list_by_user(user_id)
-    for m in map_states:
-        m.user = user
-    return [MapStateRead.model_validate(m) for m in map_states]
+    return await _list_page(service, response, paging, view, renderer, user_id)
+
+
+@router.get("/within", response_model=list[MapStateSummaryRead])
+async def list_map_states_within(
+    response: Response,
+    bbox: str = Query(..., description="Viewport as min_lon,min_lat,max_lon,max_lat (EPSG:4326)"),
+    user_id: str | None = Query(None, description="Query another user's map states — admin only"),
+    paging: PageParams = Depends(page_params),
+    user: OIDCUser = Depends(map_oidc_user),
+    service: MapStateService = Depends(get_map_state_service),
+    renderer: ListRenderer = Depends(list_renderer),
+) -> Response:
+    """List map states whose GeoJSON geometries intersect the viewport, newest first."""
+    if user_id is not None and user_id != user.sub and "admin" not in (user.roles or []):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    try:
+        viewport: BoundingBox = parse_bbox(bbox)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    page: Page[MapStateSummary] = await service.list_within_page(
+        viewport, user_id or user.sub, paging.limit, paging.after
+    )
+    set_next_cursor(response, page)
+    return await renderer.render(MapStateSummaryRead, MapStateSummaryListItem, page.items, response)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_map_states(
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    user_id: str | None = Query(None),
+    user: OIDCUser = Depends(map_oidc_user),
+    sessions: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+    codec: StateCodec = Depends(get_state_codec),
+) -> StreamingResponse:
+    if "admin" not in (user.roles or []):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    log.info("Exporting map states", format=format, query_user_id=user_id, requester=user.sub)
+    chunks = _export_chunks(sessions, codec, user_id)
+    return export_response(chunks, MAP_STATE_EXPORT_FIELDS, format, filename="map-states")
+
+
+async def _export_chunks(
+    sessions: async_sessionmaker[AsyncSession], codec: StateCodec, user_id: str | None
+) -> AsyncIterator[Sequence[MapStateDomain]]:
+    # The body is sent after the request's session may have closed, so the export
+    # reads through a session of its own, returned to the pool once streaming ends.
+    async with sessions() as session:
+        async for chunk in SqlAlchemyMapStateRepository(MapStateDAO(session, codec)).stream(user_id, EXPORT_CHUNK_SIZE):
+            yield chunk
+
+
+def map_state_etag(map_state_id: int, version: int, *variant: object) -> str:
+    """Strong ETag of a map state representation; ?path, ?fields and ?zoom / ?tolerance select a variant."""
+    return strong_etag(map_state_id, version, *variant)
+
 
+def _may_read(owner_id: str, user: OIDCUser) -> bool:
+    return owner_id == user.sub or "admin" in (user.roles or [])
 
-@router.get("/{map_state_id}", response_model=MapStateRead)
+
+async def _authorize(map_state_id: int, user: OIDCUser, service: MapStateService) -> MapStateMetadata:
+    meta: MapStateMetadata | None = await service.get_metadata(map_state_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Map state not found")
+    if not _may_read(meta.user_id, user):
+        raise HTTPException(
+            status_code=403, detail="Not authorized to access this map state"
+        )
+    return meta
+
+
+@router.get(
+    "/{map_state_id}",
+    response_model=MapStateRead,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "The map state has not changed"}},
+)
 async def get_map_state(
     map_state_id: int,
+    request: Request,
+    response: Response,
+    path: str | None = Query(
+        None, description="Return only the sub-tree at this dot-separated path, e.g. viewport.center"
+    ),
+    fields: str | None = Query(
+        None, description="Return state pruned to these comma-separated paths, e.g. layers,viewport.zoom"
+    ),
+    zoom: int | None = Query(
+        None, ge=0, le=MAX_ZOOM, description="Simplify GeoJSON geometries to one pixel at this map zoom level"
+    ),
+    tolerance: float | None = Query(
+        None, gt=0, description="Simplify GeoJSON geometries to this tolerance, in degrees"
+    ),
     user: OIDCUser = Depends(map_oidc_user),
     service: MapStateService = Depends(get_map_state_service),
-) -> MapStateRead:
-    ms: MapStateDomain | None = await service.get(map_state_id)
+) -> Response:
+    selections: list[tuple[str, object]] = [
+        (name, value)
+        for name, value in (("path", path), ("fields", fields), ("zoom", zoom), ("tolerance", tolerance))
+        if value is not None
+    ]
+    if len(selections) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of path, fields, zoom or tolerance")
+    variant: tuple[object, ...] = selections[0] if selections else ()
+    if has_preconditions(request):
+        # Revalidation reads only the row's metadata; the state is loaded only when it changed.
+        meta: MapStateMetadata = await _authorize(map_state_id, user, service)
+        etag: str = map_state_etag(meta.id, meta.version, *variant)
+        if not_modified(request, etag, meta.updated_at):
+            return not_modified_response(etag, meta.updated_at)
+    try:
+        if path is not None:
+            ms: MapStateDomain | None = await service.get_subtree(map_state_id, parse_path(path))
+        elif fields is not None:
+            ms = await service.get_partial(map_state_id, parse_fields(fields))
+        elif zoom is not None:
+            ms = await service.get_simplified(map_state_id, tolerance_for_zoom(zoom))
+        elif tolerance is not None:
+            ms = await service.get_simplified(map_state_id, tolerance)
+        else:
+            ms = await service.get(map_state_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     if ms is None:
         raise HTTPException(status_code=404, detail="Map state not found")
 
@@ -95,30 +345,126 @@ async def get_map_state(
             status_code=403, detail="Not authorized to access this map state"
         )
 
+    set_validators(response, map_state_etag(ms.id, ms.version, *variant), ms.updated_at)
     ms.user = user
-    return MapStateRead.model_validate(ms)
+    return json_item(MapStateRead, ms, response)
 
 
-@router.put("/{map_state_id}", response_model=MapStateRead)
+@router.get("/{map_state_id}/versions", response_model=list[MapStateHistoryRead])
+async def list_map_state_versions(
+    map_state_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of versions to return"),
+    before: int | None = Query(None, ge=1, description="Only versions older than this one"),
+    user: OIDCUser = Depends(map_oidc_user),
+    service: MapStateService = Depends(get_map_state_service),
+) -> Response:
+    """List the recorded versions of a map state, newest first."""
+    await _authorize(map_state_id, user, service)
+    versions: Sequence[MapStateHistoryEntry] = await service.list_versions(map_state_id, limit, before)
+    return json_list(MapStateHistoryRead, versions)
+
+
+@router.get("/{map_state_id}/versions/{version}", response_model=MapStateRead)
+async def get_map_state_version(
+    map_state_id: int,
+    version: int,
+    user: OIDCUser = Depends(map_oidc_user),
+    service: MapStateService = Depends(get_map_state_service),
+) -> Response:
+    """Return the map state as it was at the given version."""
+    await _authorize(map_state_id, user, service)
+    ms: MapStateDomain | None = await service.get_version(map_state_id, version)
+    if ms is None:
+        raise HTTPException(status_code=404, detail="Map state version not found")
+    ms.user = user
+    return json_item(MapStateRead, ms)
+
+
+@router.put(
+    "/{map_state_id}",
+    response_model=MapStateRead,
+    responses={status.HTTP_412_PRECONDITION_FAILED: {"description": "If-Match does not match the current ETag"}},
+)
 async def update_map_state(
     map_state_id: int,
     payload: MapStateUpdate,
+    request: Request,
+    response: Response,
     user: OIDCUser = Depends(map_oidc_user),
     service: MapStateService = Depends(get_map_state_service),
-) -> MapStateRead:
-    ms: MapStateDomain | None = await service.get(map_state_id)
-    if ms is None:
+) -> Response:
+    owner_id: str | None = None if "admin" in (user.roles or []) else user.sub
+    expected_version: int | None = None
+    if_match: str | None = request.headers.get("if-match")
+    if if_match is not None:
+        meta: MapStateMetadata = await _authorize(map_state_id, user, service)
+        if not etag_matches(if_match, map_state_etag(meta.id, meta.version), weak=False):
+            raise HTTPException(status_code=412, detail="Map state has been modified")
+        expected_version = meta.version
+    updated: MapStateDomain | None = await service.update_owned(
+        map_state_id, payload, owner_id, expected_version
+    )
+    if updated is None:
+        if expected_version is not None:
+            # Changed between the If-Match check and the row lock.
+            raise HTTPException(status_code=412, detail="Map state has been modified")
+        if await service.exists(map_state_id):
+            raise HTTPException(
+                status_code=403, detail="Not authorized to update this map state"
+            )
         raise HTTPException(status_code=404, detail="Map state not found")
 
-    if ms.user_id != user.sub and "admin" not in (user.roles or []):
+    set_validators(response, map_state_etag(updated.id, updated.version), updated.updated_at)
+    updated.user = user
+    return json_item(MapStateRead, updated, response)
+
+
+@router.patch(
+    "/{map_state_id}",
+    response_model=MapStateVersion,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                JSON_PATCH_MEDIA_TYPE: {"schema": {"type": "array", "items": {"type": "object"}}},
+                MERGE_PATCH_MEDIA_TYPE: {"schema": {"type": "object"}},
+            },
+        }
+    },
+)
+async def patch_map_state(
+    map_state_id: int,
+    request: Request,
+    user: OIDCUser = Depends(map_oidc_user),
+    service: MapStateService = Depends(get_map_state_service),
+) -> Response:
+    """Apply a JSON Patch or JSON Merge Patch to the state and return the new version metadata."""
+    media_type: str = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type not in (JSON_PATCH_MEDIA_TYPE, MERGE_PATCH_MEDIA_TYPE):
         raise HTTPException(
-            status_code=403, detail="Not authorized to update this map state"
+            status_code=415,
+            detail=f"Use {JSON_PATCH_MEDIA_TYPE} or {MERGE_PATCH_MEDIA_TYPE}",
         )
+    try:
+        body = from_json(await request.body())
+        patch: StatePatch = JsonPatch.parse(body) if media_type == JSON_PATCH_MEDIA_TYPE else MergePatch(body)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid patch document: {exc}")
+
+    owner_id: str | None = None if "admin" in (user.roles or []) else user.sub
+    try:
+        patched: MapStateVersionInfo | None = await service.patch(map_state_id, patch, owner_id)
+    except PatchConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if patched is None:
+        if await service.exists(map_state_id):
+            raise HTTPException(
+                status_code=403, detail="Not authorized to update this map state"
+            )
+        raise HTTPException(status_code=404, detail="Map state not found")
 
-    updated: MapStateDomain | None = await service.update(map_state_id, payload)
-    if updated is not None:
-        updated.user = user
-    return MapStateRead.model_validate(updated)
+    log.info("Patched map state", map_state_id=map_state_id, version=patched.version, user_id=user.sub)
+    return json_item(MapStateVersion, patched)
 
 
 @router.delete(
@@ -128,16 +474,15 @@ async def delete_map_state(
     map_state_id: int,
     user: OIDCUser = Depends(map_oidc_user),
     service: MapStateService = Depends(get_map_state_service),
-) -> MapStateRead:
-    ms: MapStateDomain | None = await service.get(map_state_id)
-    if ms is None:
+) -> Response:
+    owner_id: str | None = None if "admin" in (user.roles or []) else user.sub
+    deleted: MapStateDomain | None = await service.delete_owned(map_state_id, owner_id)
+    if deleted is None:
+        if await service.exists(map_state_id):
+            raise HTTPException(
+                status_code=403, detail="Not authorized to delete this map state"
+            )
         raise HTTPException(status_code=404, detail="Map state not found")
 
-    if ms.user_id != user.sub and "admin" not in (user.roles or []):
-        raise HTTPException(
-            status_code=403, detail="Not authorized to delete this map state"
-        )
-
-    ms.user = user
-    await service.delete(map_state_id)
-    return MapStateRead.model_validate(ms)
+    deleted.user = user
+    return json_item(MapStateRead, deleted)
@@ -1,16 +1,45 @@
 from __future__ import annotations
 
-from typing import Sequence
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, Sequence
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from structlog import BoundLogger
 
+from app.api.batch import batch_ids
+from app.api.conditional import (
+    etag_matches,
+    has_preconditions,
+    not_modified,
+    not_modified_response,
+    set_validators,
+    strong_etag,
+    timestamp_tag,
+)
+from app.api.envelope import ListRenderer, list_renderer
+from app.api.export import EXPORT_CHUNK_SIZE, ExportFormat, export_response
+from app.api.ingest import read_ndjson
+from app.api.pagination import PageParams, RankPageParams, page_params, rank_page_params, set_next_cursor
+from app.api.serialization import json_item
 from app.auth.oidc_user import OIDCUser, map_oidc_user
-from app.db.session import get_async_session
-from app.domain.messages.models import MessageDomain
-from app.schemas.messages import MessageCreate, MessageRead, MessageUpdate
+from app.db.session import get_async_session, get_session_factory
+from app.domain.messages.interfaces import MessageRepository
+from app.domain.messages.models import MessageDomain, MessageMetadata
+from app.domain.pagination import Page
+from app.schemas.messages import MessageBulkCreated, MessageCreate, MessageListItem, MessageRead, MessageUpdate
 from app.services.message_service import MessageService
+from app.services.single_flight import SingleFlight
+from app.infrastructure.cache import LRUCache
+from app.infrastructure.messages.cached_repository import (
+    CachingMessageRepository,
+    SharedCacheMessageRepository,
+    get_message_cache,
+    get_shared_message_cache,
+)
+from app.infrastructure.shared_cache import SharedEntityCache
 from app.infrastructure.messages.dao import MessageDAO
 from app.infrastructure.messages.repository import SqlAlchemyMessageRepository
 from app.core.logging import get_logger
@@ -19,12 +48,34 @@
 
 router = APIRouter(prefix="/api/messages", tags=["Messages"])
 
+MAX_BULK_MESSAGES: int = 10_000
+MAX_SEARCH_QUERY_LENGTH: int = 256
+MESSAGE_EXPORT_FIELDS: tuple[str, ...] = ("id", "user_id", "content", "created_at", "updated_at")
 
-def get_message_service(session: AsyncSession = Depends(get_async_session)) -> MessageService:
-    """Construct the MessageService with SQLAlchemy-backed repository."""
+
+@lru_cache
+def get_message_flights() -> SingleFlight:
+    """The process-wide group coalescing identical concurrent message reads."""
+    return SingleFlight()
+
+
+def get_message_service(
+    session: AsyncSession = Depends(get_async_session),
+    cache: LRUCache[int, MessageDomain] | None = Depends(get_message_cache),
+    shared: SharedEntityCache[MessageDomain] | None = Depends(get_shared_message_cache),
+    flights: SingleFlight = Depends(get_message_flights),
+) -> MessageService:
+    """Construct the MessageService with SQLAlchemy-backed repository, cached when enabled.
+
+    The in-process cache, when enabled, sits in front of the shared one.
+    """
     dao = MessageDAO(session)
-    repo = SqlAlchemyMessageRepository(dao)
-    return MessageService(repo)
+    repo: MessageRepository = SqlAlchemyMessageRepository(dao)
+    if shared is not None:
+        repo = SharedCacheMessageRepository(repo, shared)
+    if cache is not None:
+        repo = CachingMessageRepository(repo, cache)
+    return MessageService(repo, flights)
 
 
 @router.post("/", response_model=MessageRead, status_code=status.HTTP_201_CREATED)
@@ -32,67 +83,200 @@ async def create_message(
     payload: MessageCreate,
     user: OIDCUser = Depends(map_oidc_user),
     service: MessageService = Depends(get_message_service),
-) -> MessageRead:
+) -> Response:
     """Create a new message."""
     created: MessageDomain = await service.create(user_id=user.sub, payload=payload)
     created.user = user
     log.info("Created message", message_id=created.id, user_id=user.sub)
-    return MessageRead.model_validate(created)
+    return json_item(MessageRead, created, status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/bulk", response_model=MessageBulkCreated, status_code=status.HTTP_201_CREATED)
+async def bulk_create_messages(
+    payloads: list[MessageCreate] = Body(..., max_length=MAX_BULK_MESSAGES),
+    user: OIDCUser = Depends(map_oidc_user),
+    service: MessageService = Depends(get_message_service),
+) -> MessageBulkCreated:
+    """Create many messages in one transaction using batched inserts."""
+    ids: list[int] = await service.bulk_create(user_id=user.sub, payloads=payloads)
+    log.info("Bulk created messages", count=len(ids), user_id=user.sub)
+    return MessageBulkCreated(count=len(ids), ids=ids)
+
+
+@router.post(
+    "/bulk/ndjson",
+    response_model=MessageBulkCreated,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def bulk_create_messages_ndjson(
+    request: Request,
+    user: OIDCUser = Depends(map_oidc_user),
+    service: MessageService = Depends(get_message_service),
+) -> MessageBulkCreated:
+    """Create messages from a streamed NDJSON body (one MessageCreate per line) in one transaction.
+
+    Like the JSON variant, at most MAX_BULK_MESSAGES messages may be sent at once.
+    """
+    ids: list[int] = await service.bulk_create_stream(
+        user_id=user.sub, payloads=read_ndjson(request, MessageCreate, MAX_BULK_MESSAGES)
+    )
+    log.info("Bulk created messages from NDJSON", count=len(ids), user_id=user.sub)
+    return MessageBulkCreated(count=len(ids), ids=ids)
 
 
 @router.get("/", response_model=list[MessageRead])
 async def list_all_messages(
+    response: Response,
+    paging: PageParams = Depends(page_params),
+    ids: list[int] | None = Depends(batch_ids),
     user: OIDCUser = Depends(map_oidc_user),
     service: MessageService = Depends(get_message_service),
-) -> list[MessageRead]:
-    """List all messages — reserved for admin users."""
+    renderer: ListRenderer = Depends(list_renderer),
+) -> Response:
+    """List all messages, one page at a time — reserved for admin users.
+
+    With `ids`, instead fetch those messages in one query, in the order given. Like
+    GET /{message_id} this is open to the owner or an admin, checked per message; IDs
+    that do not exist or may not be read are left out.
+    """
+    if ids is not None:
+        messages: list[MessageDomain] = await service.get_many(ids)
+        readable: list[MessageDomain] = [m for m in messages if _may_read(m.user_id, user)]
+        log.info("Fetched messages by id", requested=len(ids), returned=len(readable), user_id=user.sub)
+        return await renderer.render(MessageRead, MessageListItem, readable, response)
+
     if "admin" not in (user.roles or []):
         raise HTTPException(status_code=403, detail="Admin privileges required")
 
-    messages: Sequence[MessageDomain] = await service.list()
-    log.info("Fetched all messages", count=len(messages), user_id=user.sub)
-    for m in messages:
-        m.user = user
-    return [MessageRead.model_validate(m) for m in messages]
+    page: Page[MessageDomain] = await service.list_page(paging.limit, paging.after)
+    log.info("Fetched all messages", count=len(page.items), user_id=user.sub)
+    set_next_cursor(response, page)
+    return await renderer.render(MessageRead, MessageListItem, page.items, response)
 
 
 @router.get("/me", response_model=list[MessageRead])
 async def list_my_messages(
+    response: Response,
+    paging: PageParams = Depends(page_params),
     user: OIDCUser = Depends(map_oidc_user),
     service: MessageService = Depends(get_message_service),
-) -> list[MessageRead]:
-    """List messages created by the current user."""
-    messages: Sequence[MessageDomain] = await service.list_by_user(user.sub)
-    log.info("Fetched user's own messages", count=len(messages), user_id=user.sub)
-    for m in messages:
-        m.user = user
-    return [MessageRead.model_validate(m) for m in messages]
+    renderer: ListRenderer = Depends(list_renderer),
+) -> Response:
+    """List messages created by the current user, one page at a time."""
+    page: Page[MessageDomain] = await service.list_by_user_page(user.sub, paging.limit, paging.after)
+    log.info("Fetched user's own messages", count=len(page.items), user_id=user.sub)
+    set_next_cursor(response, page)
+    return await renderer.render(MessageRead, MessageListItem, page.items, response)
 
 
 @router.get("/by/{user_id}", response_model=list[MessageRead])
 async def list_messages_by_user_id(
     user_id: str,
+    response: Response,
+    paging: PageParams = Depends(page_params),
     user: OIDCUser = Depends(map_oidc_user),
     service: MessageService = Depends(get_message_service),
-) -> list[MessageRead]:
-    """List messages by a specific user — admin only."""
+    renderer: ListRenderer = Depends(list_renderer),
+) -> Response:
+    """List messages by a specific user, one page at a time — admin only."""
     if "admin" not in (user.roles or []):
         raise HTTPException(status_code=403, detail="Admin privileges required")
 
-    messages: Sequence[MessageDomain] = await service.list_by_user(user_id)
+    page: Page[MessageDomain] = await service.list_by_user_page(user_id, paging.limit, paging.after)
     log.info("Fetched messages for user", query_user_id=user_id, requester=user.sub)
-    for m in messages:
-        m.user = user
-    return [MessageRead.model_validate(m) for m in messages]
+    set_next_cursor(response, page)
+    return await renderer.render(MessageRead, MessageListItem, page.items, response)
+
+
+@router.get("/search", response_model=list[MessageRead])
+async def search_messages(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=MAX_SEARCH_QUERY_LENGTH, description="Search terms"),
+    user_id: str | None = Query(None, description="Search another user's messages — admin only"),
+    paging: RankPageParams = Depends(rank_page_params),
+    user: OIDCUser = Depends(map_oidc_user),
+    service: MessageService = Depends(get_message_service),
+    renderer: ListRenderer = Depends(list_renderer),
+) -> Response:
+    """Full-text search over the current user's messages, best matches first, one page at a time."""
+    if user_id is not None and user_id != user.sub and "admin" not in (user.roles or []):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    page: Page[MessageDomain] = await service.search_page(q, user_id or user.sub, paging.limit, paging.after)
+    log.info("Searched messages", count=len(page.items), query_user_id=user_id, requester=user.sub)
+    set_next_cursor(response, page)
+    return await renderer.render(MessageRead, MessageListItem, page.items, response)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_messages(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="Output format"),
+    user_id: str | None = Query(None, description="Only export messages by this user"),
+    user: OIDCUser = Depends(map_oidc_user),
+    sessions: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+) -> StreamingResponse:
+    """Stream messages as NDJSON or CSV without buffering the dataset — admin only."""
+    if "admin" not in (user.roles or []):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    log.info("Exporting messages", format=format, query_user_id=user_id, requester=user.sub)
+    chunks = _export_chunks(sessions, user_id)
+    return export_response(chunks, MESSAGE_EXPORT_FIELDS, format, filename="messages")
+
+
+async def _export_chunks(
+    sessions: async_sessionmaker[AsyncSession], user_id: str | None
+) -> AsyncIterator[Sequence[MessageDomain]]:
+    # The body is sent after the request's session may have closed, so the export
+    # reads through a session of its own, returned to the pool once streaming ends.
+    async with sessions() as session:
+        async for chunk in SqlAlchemyMessageRepository(MessageDAO(session)).stream(user_id, EXPORT_CHUNK_SIZE):
+            yield chunk
+
+
+def message_etag(message_id: int, updated_at: datetime) -> str:
+    """Strong ETag of a message: its id and modification time in microseconds."""
+    return strong_etag(message_id, timestamp_tag(updated_at))
+
+
+def _may_read(owner_id: str, user: OIDCUser) -> bool:
+    return owner_id == user.sub or "admin" in (user.roles or [])
+
+
+async def _authorize(message_id: int, user: OIDCUser, service: MessageService) -> MessageMetadata:
+    meta: MessageMetadata | None = await service.get_metadata(message_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    if not _may_read(meta.user_id, user):
+        raise HTTPException(status_code=403, detail="Not authorized to access this message")
+    return meta
 
 
-@router.get("/{message_id}", response_model=MessageRead)
+@router.get(
+    "/{message_id}",
+    response_model=MessageRead,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "The message has not changed"}},
+)
 async def get_message(
     message_id: int,
+    request: Request,
+    response: Response,
     user: OIDCUser = Depends(map_oidc_user),
     service: MessageService = Depends(get_message_service),
-) -> MessageRead:
-    """Retrieve a single message — only owner or admin."""
+) -> Response:
+    """Retrieve a single message — only owner or admin. Honours If-None-Match and If-Modified-Since."""
+    if has_preconditions(request):
+        meta: MessageMetadata = await _authorize(message_id, user, service)
+        etag: str = message_etag(meta.id, meta.updated_at)
+        if not_modified(request, etag, meta.updated_at):
+            return not_modified_response(etag, meta.updated_at)
+
     msg: MessageDomain | None = await service.get(message_id)
     if msg is None:
         raise HTTPException(status_code=404, detail="Message not found")
@@ -100,29 +284,44 @@ async def get_message(
     if msg.user_id != user.sub and "admin" not in (user.roles or []):
         raise HTTPException(status_code=403, detail="Not authorized to access this message")
 
+    set_validators(response, message_etag(msg.id, msg.updated_at), msg.updated_at)
     msg.user = user
-    return MessageRead.model_validate(msg)
+    return json_item(MessageRead, msg, response)
 
 
-@router.put("/{message_id}", response_model=MessageRead)
+@router.put(
+    "/{message_id}",
+    response_model=MessageRead,
+    responses={status.HTTP_412_PRECONDITION_FAILED: {"description": "If-Match does not match the current ETag"}},
+)
 async def update_message(
     message_id: int,
     payload: MessageUpdate,
+    request: Request,
+    response: Response,
     user: OIDCUser = Depends(map_oidc_user),
     service: MessageService = Depends(get_message_service),
-) -> MessageRead:
-    """Update a message — only owner or admin."""
-    msg: MessageDomain | None = await service.get(message_id)
-    if msg is None:
+) -> Response:
+    """Update a message — only owner or admin. With If-Match, only if the message is unchanged."""
+    owner_id: str | None = None if "admin" in (user.roles or []) else user.sub
+    expected_updated_at: datetime | None = None
+    if_match: str | None = request.headers.get("if-match")
+    if if_match is not None:
+        meta: MessageMetadata = await _authorize(message_id, user, service)
+        if not etag_matches(if_match, message_etag(meta.id, meta.updated_at), weak=False):
+            raise HTTPException(status_code=412, detail="Message has been modified")
+        expected_updated_at = meta.updated_at
+    updated: MessageDomain | None = await service.update_owned(message_id, payload, owner_id, expected_updated_at)
+    if updated is None:
+        if expected_updated_at is not None:
+            raise HTTPException(status_code=412, detail="Message has been modified")
+        if await service.exists(message_id):
+            raise HTTPException(status_code=403, detail="Not authorized to update this message")
         raise HTTPException(status_code=404, detail="Message not found")
 
-    if msg.user_id != user.sub and "admin" not in (user.roles or []):
-        raise HTTPException(status_code=403, detail="Not authorized to update this message")
-
-    updated: MessageDomain | None = await service.update(message_id, payload)
-    if updated is not None:
-        updated.user = user
-    return MessageRead.model_validate(updated)
+    set_validators(response, message_etag(updated.id, updated.updated_at), updated.updated_at)
+    updated.user = user
+    return json_item(MessageRead, updated, response)
 
 
 @router.delete("/{message_id}", response_model=MessageRead, status_code=status.HTTP_200_OK)
@@ -130,21 +329,17 @@ async def delete_message(
     message_id: int,
     user: OIDCUser = Depends(map_oidc_user),
     service: MessageService = Depends(get_message_service),
-) -> MessageRead:
+) -> Response:
     """Delete a message and return it — only owner or admin."""
-    msg: MessageDomain | None = await service.get(message_id)
-    if msg is None:
+    owner_id: str | None = None if "admin" in (user.roles or []) else user.sub
+    deleted: MessageDomain | None = await service.delete_owned(message_id, owner_id)
+    if deleted is None:
+        if await service.exists(message_id):
+            raise HTTPException(status_code=403, detail="Not authorized to delete this message")
         raise HTTPException(status_code=404, detail="Message not found")
 
-    if msg.user_id != user.sub and "admin" not in (user.roles or []):
-        raise HTTPException(status_code=403, detail="Not authorized to delete this message")
-
-    # Inject user object for response schema
-    msg.user = user
-
-    # Delete the message
-    await service.delete(message_id)
     log.info("Deleted message", message_id=message_id, user_id=user.sub)
 
-    # Return the deleted object
-    return MessageRead.model_validate(msg)
+    # Inject user object for response schema and return the deleted object
+    deleted.user = user
+    return json_item(MessageRead, deleted)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Iterable, Mapping
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+from app.auth.oidc_user import OIDCUser
+from app.schemas.envelope import ListEnvelope
+
+JSON_MEDIA_TYPE: str = "application/json"
+
+
+@lru_cache
+def item_adapter(model: type[BaseModel]) -> TypeAdapter[Any]:
+    """The TypeAdapter for single items of model, built once."""
+    return TypeAdapter(model)
+
+
+@lru_cache
+def list_adapter(model: type[BaseModel]) -> TypeAdapter[list[Any]]:
+    """The TypeAdapter for lists of model; building one compiles a schema, so each is built once."""
+    return TypeAdapter(list[model])  # type: ignore[valid-type]
+
+
+@lru_cache
+def envelope_adapter(model: type[BaseModel]) -> TypeAdapter[ListEnvelope[Any]]:
+    """The TypeAdapter for list envelopes of model, built once."""
+    return TypeAdapter(ListEnvelope[model])  # type: ignore[valid-type]
+
+
+def _json_response(body: bytes, response: Response | None, media_type: str, status_code: int = 200) -> Response:
+    result = Response(content=body, status_code=status_code, media_type=media_type)
+    if response is not None:
+        result.headers.update(response.headers)
+    return result
+
+
+def json_list(model: type[BaseModel], items: Iterable[Any], response: Response | None = None) -> Response:
+    """Validate items as a list of model, reading their attributes, and serialize it straight to JSON.
+
+    Returning a Response skips FastAPI's response_model handling, which would validate
+    and serialize every item again; the route's response_model then only documents it.
+    Headers already set on response (e.g. the next-page cursor) are kept.
+    """
+    adapter: TypeAdapter[list[Any]] = list_adapter(model)
+    body: bytes = adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+    return _json_response(body, response, JSON_MEDIA_TYPE)
+
+
+def json_item(
+    model: type[BaseModel], item: Any, response: Response | None = None, status_code: int = 200
+) -> Response:
+    """Like json_list, for a single item: validated from its attributes and serialized once."""
+    adapter: TypeAdapter[Any] = item_adapter(model)
+    body: bytes = adapter.dump_json(adapter.validate_python(item, from_attributes=True))
+    return _json_response(body, response, JSON_MEDIA_TYPE, status_code)
+
+
+def json_envelope(
+    model: type[BaseModel],
+    items: Iterable[Any],
+    users: Mapping[str, OIDCUser],
+    media_type: str,
+    response: Response | None = None,
+) -> Response:
+    """Like json_list, but wrapped in a ListEnvelope of model with users listed once beside the items."""
+    adapter: TypeAdapter[ListEnvelope[Any]] = envelope_adapter(model)
+    envelope: ListEnvelope[Any] = adapter.validate_python(
+        {"users": users, "items": items}, from_attributes=True
+    )
+    return _json_response(adapter.dump_json(envelope), response, media_type)
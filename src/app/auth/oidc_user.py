@@ -22,12 +22,14 @@ def __str__(self) -> str:
         return self.preferred_username or self.email or self.sub
 
 
-def get_user(request: Request) -> Dict[str, Any]:
+def get_user(request: Request) -> Dict[str, Any] | OIDCUser:
     """
-    Raw access to OIDC claims from Keycloak middleware.
+    Raw access to OIDC claims from Keycloak middleware, or the OIDCUser it already mapped them to.
     Falls back to request.scope if middleware is not bound properly.
     """
     raw_user: Any | None = getattr(request.state, "user", None) or request.scope.get("user")
+    if isinstance(raw_user, OIDCUser):
+        return raw_user
     if not isinstance(raw_user, dict):
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="User not authenticated")
 
@@ -35,9 +37,15 @@ def get_user(request: Request) -> Dict[str, Any]:
     return user_claims
 
 
-async def map_oidc_user(userinfo: Dict[str, Any] = Depends(get_user)) -> OIDCUser:
+async def map_oidc_user(userinfo: Dict[str, Any] | OIDCUser = Depends(get_user)) -> OIDCUser:
     """
     Converts raw OIDC claims dictionary into a strongly typed OIDCUser model.
     Use this as a dependency in routes/services: `user: OIDCUser = Depends(map_oidc_user)`
+
+    The middleware also uses this as its user mapper, so the user it stored (possibly
+    reused from the token cache) is returned as is, without validating the claims again.
+    It is shared between requests and must not be modified.
     """
+    if isinstance(userinfo, OIDCUser):
+        return userinfo
     return OIDCUser.model_validate(userinfo)
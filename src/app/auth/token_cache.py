@@ -0,0 +1,97 @@
+"""Reuse of verified access tokens, so a client's repeated calls are verified once per token."""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import time
+from functools import lru_cache
+from typing import Any, Callable
+
+from fastapi_keycloak_middleware import KeycloakMiddleware
+from fastapi_keycloak_middleware.keycloak_backend import KeycloakBackend
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp
+
+from app.core.settings import TokenCacheSettings, get_settings
+from app.infrastructure.cache import LRUCache
+
+# What the backend's authenticate() returns: the authorization scopes and the mapped user.
+Authentication = tuple[Any, Any]
+
+
+@lru_cache
+def get_token_cache() -> LRUCache[bytes, Authentication] | None:
+    """The process-wide verified-token cache, or None when disabled in settings."""
+    config: TokenCacheSettings = get_settings().cache.tokens
+    if not config.enabled:
+        return None
+    return LRUCache(config.max_entries, config.max_ttl_seconds)
+
+
+def token_expiry(token: str) -> float | None:
+    """The `exp` claim of a JWT as a Unix time, read without verifying the token."""
+    try:
+        payload: str = token.split(".")[1]
+        claims: Any = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        exp: Any = claims.get("exp")
+    except (IndexError, ValueError, AttributeError):
+        return None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+class CachingKeycloakBackend:
+    """Wraps a KeycloakBackend, reusing its result for a token until the token expires.
+
+    Entries are keyed by a SHA-256 digest of the credential, so raw tokens are never
+    kept, and live until the token's `exp` (capped by the cache's ttl). Only successful
+    authentications are cached; tokens without `exp` are verified every time. With the
+    introspection endpoint, which can report revoked tokens, nothing is cached.
+    """
+
+    def __init__(
+        self: CachingKeycloakBackend,
+        inner: KeycloakBackend,
+        cache: LRUCache[bytes, Authentication],
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.inner: KeycloakBackend = inner
+        self.cache: LRUCache[bytes, Authentication] = cache
+        self.clock: Callable[[], float] = clock
+
+    def credential(self: CachingKeycloakBackend, conn: HTTPConnection) -> str | None:
+        """The credential the inner backend will read: the websocket cookie or the Authorization header."""
+        config = self.inner.keycloak_configuration
+        if config.enable_websocket_support and conn.headers.get("upgrade") == "websocket":
+            return conn.cookies.get(config.websocket_cookie_name)
+        return conn.headers.get("Authorization")
+
+    async def authenticate(self: CachingKeycloakBackend, conn: HTTPConnection) -> Authentication:
+        credential: str | None = self.credential(conn)
+        if not credential or self.inner.keycloak_configuration.use_introspection_endpoint:
+            return await self.inner.authenticate(conn)
+
+        key: bytes = hashlib.sha256(credential.encode()).digest()
+        cached: Authentication | None = self.cache.get(key)
+        if cached is not None:
+            return cached
+        result: Authentication = await self.inner.authenticate(conn)
+        # Verified above, so the unverified read of its expiry is safe.
+        expires_at: float | None = token_expiry(credential.rsplit(" ", 1)[-1])
+        if expires_at is not None and expires_at > self.clock():
+            self.cache.put(key, result, ttl=min(expires_at - self.clock(), self.cache.ttl))
+        return result
+
+
+class CachingKeycloakMiddleware(KeycloakMiddleware):
+    """KeycloakMiddleware whose backend reuses verified tokens from token_cache, when given one."""
+
+    def __init__(
+        self: CachingKeycloakMiddleware,
+        app: ASGIApp,
+        token_cache: LRUCache[bytes, Authentication] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(app, **kwargs)
+        if token_cache is not None:
+            self.backend = CachingKeycloakBackend(self.backend, token_cache)  # type: ignore[assignment]
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Collection, Mapping
+
+from fastapi import Depends
+
+from app.auth.oidc_user import OIDCUser, map_oidc_user
+
+
+class UserResolver(ABC):
+    """Looks up the users owning the items of a listing, all in one call."""
+
+    @abstractmethod
+    async def resolve(self: UserResolver, user_ids: Collection[str]) -> Mapping[str, OIDCUser]:
+        """The users known for user_ids, keyed by user_id; unknown IDs are left out."""
+
+
+class RequesterResolver(UserResolver):
+    """Resolves only the requesting user, whose claims are already at hand."""
+
+    def __init__(self: RequesterResolver, user: OIDCUser) -> None:
+        self.user: OIDCUser = user
+
+    async def resolve(self: RequesterResolver, user_ids: Collection[str]) -> Mapping[str, OIDCUser]:
+        return {self.user.sub: self.user} if self.user.sub in user_ids else {}
+
+
+def get_user_resolver(user: OIDCUser = Depends(map_oidc_user)) -> UserResolver:
+    """Dependency providing the UserResolver for list envelopes.
+
+    Override it (e.g. with a resolver backed by the identity provider's admin API) to
+    include the owners of other users' items in admin listings.
+    """
+    return RequesterResolver(user)
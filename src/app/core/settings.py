@@ -8,7 +8,7 @@
 from structlog import BoundLogger
 from tzlocal import get_localzone_name
 from functools import lru_cache
-from typing import Any
+from typing import Any, Literal
 from pydantic import BaseModel, Field, SecretStr, PostgresDsn, model_validator
 from pydantic_settings import (
     BaseSettings,
@@ -91,6 +91,41 @@ class DatabaseSettings(BaseModel):
         default="universal",
         description="Database name, e.g., 'universal'"
     )
+    pool_enabled: bool = Field(
+        default=True,
+        description="Use a persistent connection pool (ignored for SQLite, which always uses NullPool)"
+    )
+    pool_size: int = Field(
+        default=10,
+        ge=1,
+        description="Number of connections kept open in the pool"
+    )
+    pool_max_overflow: int = Field(
+        default=10,
+        ge=0,
+        description="Extra connections allowed beyond pool_size under burst load"
+    )
+    pool_timeout: float = Field(
+        default=30.0,
+        gt=0,
+        description="Seconds to wait for a free connection before failing"
+    )
+    pool_recycle: int = Field(
+        default=1800,
+        description="Seconds after which a pooled connection is replaced (-1 disables)"
+    )
+    pool_pre_ping: bool = Field(
+        default=True,
+        description="Test connections for liveness on checkout"
+    )
+
+    @property
+    def is_sqlite(self: DatabaseSettings) -> bool:
+        return self.backend.startswith("sqlite")
+
+    @property
+    def use_pool(self: DatabaseSettings) -> bool:
+        return self.pool_enabled and not self.is_sqlite
 
     @model_validator(mode="before")
     @classmethod
@@ -117,6 +152,66 @@ def build_url_from_components(cls: type[DatabaseSettings], values: dict[str, Any
 
             return values
 
+class StorageSettings(BaseModel):
+    compression: Literal["none", "zstd"] = Field(
+        default="none",
+        description="Codec for large map states at rest ('none' stores plain text)"
+    )
+    compression_threshold: int = Field(
+        default=64 * 1024,
+        ge=0,
+        description="Map states of at least this many bytes are compressed"
+    )
+    compression_level: int = Field(
+        default=3,
+        ge=1,
+        le=22,
+        description="zstd compression level"
+    )
+    compression_dictionary: Path | None = Field(
+        default=None,
+        description="Trained zstd dictionary file; also needed to read rows written with it"
+    )
+    history_snapshot_interval: int = Field(
+        default=20,
+        ge=1,
+        description="Map state history stores a full snapshot every this many versions, deltas in between"
+    )
+
+class GeometrySettings(BaseModel):
+    simplify_cache_size: int = Field(
+        default=256,
+        ge=0,
+        description="Number of simplified (?zoom / ?tolerance) map states kept in memory"
+    )
+
+class EntityCacheSettings(BaseModel):
+    enabled: bool = Field(default=False, description="Cache get-by-id reads in process")
+    ttl_seconds: float = Field(default=30.0, gt=0, description="How long a cached item may be served")
+    max_entries: int = Field(default=10_000, ge=1, description="Most items kept")
+    max_bytes: int = Field(default=64 * 1024 * 1024, ge=1, description="Approximate memory bound for cached items")
+    shared: bool = Field(default=False, description="Also cache reads in the shared cache (needs CACHE_REDIS_URL)")
+
+class TokenCacheSettings(BaseModel):
+    enabled: bool = Field(default=True, description="Reuse verified access tokens instead of verifying them again")
+    max_entries: int = Field(default=10_000, ge=1, description="Most verified tokens kept")
+    max_ttl_seconds: float = Field(
+        default=300.0, gt=0, description="Longest a verified token is reused, even if it expires later"
+    )
+
+class CacheSettings(BaseModel):
+    """Per-entity read-through caches, e.g. CACHE_MESSAGES='{"enabled": true}'."""
+    redis_url: str | None = Field(default=None, description="Redis-protocol server shared by all workers")
+    key_prefix: str = Field(default="app", description="Namespace for keys in the shared cache")
+    lock_timeout_seconds: float = Field(
+        default=5.0, gt=0, description="How long other workers wait for one worker to load a missing entry"
+    )
+    messages: EntityCacheSettings = Field(default_factory=EntityCacheSettings)
+    map_states: EntityCacheSettings = Field(
+        default_factory=lambda: EntityCacheSettings(max_entries=1_000, max_bytes=256 * 1024 * 1024)
+    )
+    tokens: TokenCacheSettings = Field(default_factory=TokenCacheSettings)
+
 class SystemSettings(BaseModel):
     project_root: Path = Field(default_factory=lambda: Path(__file__).resolve().parents[3])
     shell: str = Field(default_factory=lambda: Path(os.environ.get("SHELL", "unknown")).name)
@@ -141,6 +236,9 @@ class Settings(BaseSettings):
 
     database: DatabaseSettings
     keycloak: KeycloakSettings
+    storage: StorageSettings = Field(default_factory=StorageSettings)
+    geometry: GeometrySettings = Field(default_factory=GeometrySettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
     system: SystemSettings = Field(default_factory=SystemSettings)
 
     model_config = SettingsConfigDict(
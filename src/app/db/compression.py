@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable
+
+from app.core.settings import StorageSettings, get_settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None  # type: ignore[assignment]
+
+# Codec tags stored in map_state_payloads.state_codec.
+IDENTITY: str = "identity"
+ZSTD: str = "zstd"
+_DICT_PREFIX: str = "zstd:d"
+
+# Dictionaries known to this process, by zstd dictionary id, for decoding tagged rows.
+_dictionaries: dict[int, Any] = {}
+
+
+def _require_zstandard() -> Any:
+    if zstandard is None:
+        raise RuntimeError("zstd compression requires the 'zstandard' package")
+    return zstandard
+
+
+@dataclass(frozen=True)
+class EncodedState:
+    """Column values for a stored state: plain text, or a codec tag plus compressed bytes."""
+    state: str | None
+    state_codec: str
+    state_blob: bytes | None
+
+    def columns(self: EncodedState) -> dict[str, Any]:
+        return {"state": self.state, "state_codec": self.state_codec, "state_blob": self.state_blob}
+
+
+class StateCodec:
+    """Compresses states larger than a threshold with zstd, optionally using a trained dictionary.
+
+    With no threshold the codec stores every state as plain text.
+    """
+
+    def __init__(
+        self: StateCodec,
+        threshold: int | None = None,
+        level: int = 3,
+        dictionary: bytes | None = None,
+    ) -> None:
+        self.threshold: int | None = threshold
+        self.level: int = level
+        self.tag: str = IDENTITY
+        self._compressor: Any = None
+        if threshold is None:
+            return
+
+        zstd: Any = _require_zstandard()
+        if dictionary is None:
+            self.tag = ZSTD
+            self._compressor = zstd.ZstdCompressor(level=level)
+        else:
+            compression_dict: Any = register_dictionary(dictionary)
+            self.tag = f"{_DICT_PREFIX}{compression_dict.dict_id()}"
+            self._compressor = zstd.ZstdCompressor(level=level, dict_data=compression_dict)
+
+    def encode(self: StateCodec, state: str) -> EncodedState:
+        """Encode a state for storage, compressing it when it exceeds the threshold."""
+        raw: bytes = state.encode()
+        if self._compressor is None or self.threshold is None or len(raw) < self.threshold:
+            return EncodedState(state=state, state_codec=IDENTITY, state_blob=None)
+        return EncodedState(state=None, state_codec=self.tag, state_blob=self._compressor.compress(raw))
+
+
+def decode_state(state: str | None, codec: str, blob: bytes | None) -> str:
+    """Return the JSON text of a stored state, decompressing it if needed."""
+    if codec == IDENTITY:
+        if state is None:
+            raise ValueError("Uncompressed map state has no text")
+        return state
+    if blob is None:
+        raise ValueError(f"Map state tagged {codec!r} has no payload")
+    return _decompressor(codec).decompress(blob).decode()
+
+
+@lru_cache(maxsize=16)
+def _decompressor(codec: str) -> Any:
+    zstd: Any = _require_zstandard()
+    if codec == ZSTD:
+        return zstd.ZstdDecompressor()
+    if codec.startswith(_DICT_PREFIX):
+        dict_id: int = int(codec[len(_DICT_PREFIX):])
+        if dict_id not in _dictionaries:
+            raise ValueError(f"Compression dictionary {dict_id} is not loaded")
+        return zstd.ZstdDecompressor(dict_data=_dictionaries[dict_id])
+    raise ValueError(f"Unknown map state codec: {codec!r}")
+
+
+def register_dictionary(data: bytes) -> Any:
+    """Make a trained dictionary available for decoding rows tagged with its id."""
+    compression_dict: Any = _require_zstandard().ZstdCompressionDict(data)
+    _dictionaries[compression_dict.dict_id()] = compression_dict
+    return compression_dict
+
+
+def train_dictionary(samples: Iterable[str], size: int = 112_640) -> bytes:
+    """Train a zstd dictionary from sample states (zstd's default dictionary size)."""
+    return _require_zstandard().train_dictionary(size, [s.encode() for s in samples]).as_bytes()
+
+
+def codec_from_settings(storage: StorageSettings) -> StateCodec:
+    """Build the codec described by storage settings, registering its dictionary for reads."""
+    dictionary: bytes | None = None
+    if storage.compression_dictionary is not None:
+        dictionary = storage.compression_dictionary.read_bytes()
+        register_dictionary(dictionary)
+    if storage.compression == "none":
+        return StateCodec()
+    return StateCodec(
+        threshold=storage.compression_threshold, level=storage.compression_level, dictionary=dictionary
+    )
+
+
+@lru_cache
+def get_state_codec() -> StateCodec:
+    """Dependency returning the process-wide map state codec."""
+    return codec_from_settings(get_settings().storage)
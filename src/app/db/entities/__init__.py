@@ -1,4 +1,6 @@
 from .message import Message
+from .map_state_payload import MapStatePayload
 from .map_state import MapState
+from .map_state_history import MapStateHistory
 
-__all__ = ["Message", "MapState"]
+__all__ = ["Message", "MapState", "MapStateHistory", "MapStatePayload"]
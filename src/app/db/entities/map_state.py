@@ -1,8 +1,13 @@
 from datetime import datetime
-from sqlalchemy import Text, DateTime, func
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DDL, ForeignKey, Index, String, event, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.db.entities.map_state_payload import HASH_LENGTH, MapStatePayload
+from app.db.types import Timestamp
+
+# SQLite R-tree over each map state's bounding box (rowid = map_states.id).
+SPATIAL_RTREE_TABLE: str = "map_states_rtree"
 
 
 class MapState(Base):
@@ -10,17 +15,67 @@ class MapState(Base):
 
     __tablename__: str = "map_states"
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
-    user_id: Mapped[str] = mapped_column(nullable=False, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[str] = mapped_column(nullable=False)
     name: Mapped[str] = mapped_column(nullable=False)
-    state: Mapped[str] = mapped_column(Text, nullable=False)
+    # Content address of the state document in map_state_payloads.
+    state_hash: Mapped[str] = mapped_column(
+        String(HASH_LENGTH), ForeignKey("map_state_payloads.hash"), nullable=False, index=True
+    )
+    # Incremented on every change to name or state.
+    version: Mapped[int] = mapped_column(nullable=False, server_default="1")
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        Timestamp, server_default=func.now(), nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        Timestamp,
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False,
     )
+
+    # Loaded in the same query as the row. Read-only: the DAO maintains state_hash and ref counts.
+    payload: Mapped[MapStatePayload] = relationship(lazy="joined", innerjoin=True, viewonly=True)
+
+    __table_args__ = (
+        # Serves per-user listings ordered by (created_at DESC, id DESC) as a pure index scan.
+        Index("ix_map_states_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+    )
+
+    @property
+    def document(self: "MapState") -> str:
+        """The state as JSON text, decompressed on access."""
+        return self.payload.document
+
+
+# The R-tree follows each row's payload: rows are (re)indexed when state_hash changes and
+# states without geometries are left out.
+_RTREE_INSERT: str = (
+    f"INSERT INTO {SPATIAL_RTREE_TABLE}(id, min_x, max_x, min_y, max_y) "
+    "SELECT new.id, bbox_min_x, bbox_max_x, bbox_min_y, bbox_max_y FROM map_state_payloads "
+    "WHERE hash = new.state_hash AND bbox_min_x IS NOT NULL;"
+)
+for _ddl in (
+    DDL(f"CREATE VIRTUAL TABLE {SPATIAL_RTREE_TABLE} USING rtree(id, min_x, max_x, min_y, max_y)").execute_if(
+        dialect="sqlite"
+    ),
+    DDL(f"CREATE TRIGGER map_states_rtree_insert AFTER INSERT ON map_states BEGIN {_RTREE_INSERT} END").execute_if(
+        dialect="sqlite"
+    ),
+    DDL(
+        "CREATE TRIGGER map_states_rtree_update AFTER UPDATE OF state_hash ON map_states BEGIN "
+        f"DELETE FROM {SPATIAL_RTREE_TABLE} WHERE id = old.id; {_RTREE_INSERT} END"
+    ).execute_if(dialect="sqlite"),
+    DDL(
+        "CREATE TRIGGER map_states_rtree_delete AFTER DELETE ON map_states BEGIN "
+        f"DELETE FROM {SPATIAL_RTREE_TABLE} WHERE id = old.id; END"
+    ).execute_if(dialect="sqlite"),
+):
+    event.listen(MapState.__table__, "after_create", _ddl)
+
+event.listen(
+    MapState.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {SPATIAL_RTREE_TABLE}").execute_if(dialect="sqlite"),
+)
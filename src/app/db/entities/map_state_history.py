@@ -0,0 +1,37 @@
+from datetime import datetime
+from sqlalchemy import CheckConstraint, ForeignKey, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.db.entities.map_state_payload import HASH_LENGTH
+from app.db.types import Timestamp
+
+
+class MapStateHistory(Base):
+    """SQLAlchemy model for the map_state_history table.
+
+    One row per map state version: either a snapshot referencing the full document in
+    map_state_payloads, or a JSON Patch delta from the previous version.
+    """
+
+    __tablename__: str = "map_state_history"
+
+    map_state_id: Mapped[int] = mapped_column(ForeignKey("map_states.id"), primary_key=True)
+    version: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(nullable=False)
+    # Set for snapshots; the reference is counted in map_state_payloads.ref_count.
+    state_hash: Mapped[str | None] = mapped_column(
+        String(HASH_LENGTH), ForeignKey("map_state_payloads.hash"), nullable=True
+    )
+    # Set for deltas: compact RFC 6902 JSON Patch text turning the previous version into this one.
+    delta: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        Timestamp, server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        CheckConstraint(
+            "(state_hash IS NULL) <> (delta IS NULL)", name="ck_map_state_history_snapshot_or_delta"
+        ),
+    )
@@ -0,0 +1,79 @@
+import hashlib
+import json
+from datetime import datetime
+from sqlalchemy import DDL, CheckConstraint, Float, LargeBinary, String, event, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.db.compression import IDENTITY, decode_state
+from app.db.types import JSONDocument, Timestamp
+
+# Length of a hex-encoded SHA-256 digest.
+HASH_LENGTH: int = 64
+
+
+def canonical_json(state: str) -> str:
+    """The JSON text of state with sorted keys and no insignificant whitespace."""
+    return json.dumps(json.loads(state), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def content_hash(state: str) -> str:
+    """The content address of a state: the SHA-256 of its canonical JSON text.
+
+    Hashing the canonical form keeps the address stable however the document was
+    formatted, including the normalized text PostgreSQL returns for JSONB.
+    """
+    return hashlib.sha256(canonical_json(state).encode()).hexdigest()
+
+
+class MapStatePayload(Base):
+    """SQLAlchemy model for the map_state_payloads table.
+
+    Each distinct state document is stored once, keyed by its content hash, and
+    shared by every map state that references it.
+    """
+
+    __tablename__: str = "map_state_payloads"
+
+    hash: Mapped[str] = mapped_column(String(HASH_LENGTH), primary_key=True)
+    # Plain JSON text, or NULL when the state is compressed into state_blob (see state_codec).
+    state: Mapped[str | None] = mapped_column(JSONDocument, nullable=True)
+    state_codec: Mapped[str] = mapped_column(String(32), nullable=False, server_default=IDENTITY)
+    state_blob: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    # Size of the uncompressed JSON text in bytes.
+    size_bytes: Mapped[int] = mapped_column(nullable=False)
+    # Bounding box (EPSG:4326) of the GeoJSON geometries in the state, NULL if it has none.
+    bbox_min_x: Mapped[float | None] = mapped_column(Float, nullable=True)
+    bbox_min_y: Mapped[float | None] = mapped_column(Float, nullable=True)
+    bbox_max_x: Mapped[float | None] = mapped_column(Float, nullable=True)
+    bbox_max_y: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # Number of map_states rows referencing this payload; the payload is deleted at zero.
+    ref_count: Mapped[int] = mapped_column(nullable=False, server_default="1")
+
+    created_at: Mapped[datetime] = mapped_column(
+        Timestamp, server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        CheckConstraint("state IS NOT NULL OR state_blob IS NOT NULL", name="ck_map_state_payloads_state_present"),
+    )
+
+    @property
+    def document(self: "MapStatePayload") -> str:
+        """The state as JSON text, decompressed on access."""
+        return decode_state(self.state, self.state_codec, self.state_blob)
+
+
+# Viewport queries: a generated PostGIS envelope with a GiST index on PostgreSQL. SQLite
+# uses an R-tree keyed by map state id instead (see MapState and migration 0010).
+for _ddl in (
+    DDL("CREATE EXTENSION IF NOT EXISTS postgis").execute_if(dialect="postgresql"),
+    DDL(
+        "ALTER TABLE map_state_payloads ADD COLUMN bbox geometry(Polygon, 4326) GENERATED ALWAYS AS "
+        "(ST_MakeEnvelope(bbox_min_x, bbox_min_y, bbox_max_x, bbox_max_y, 4326)) STORED"
+    ).execute_if(dialect="postgresql"),
+    DDL("CREATE INDEX ix_map_state_payloads_bbox ON map_state_payloads USING GIST (bbox)").execute_if(
+        dialect="postgresql"
+    ),
+):
+    event.listen(MapStatePayload.__table__, "after_create", _ddl)
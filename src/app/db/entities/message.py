@@ -1,26 +1,72 @@
 from datetime import datetime
-from sqlalchemy import Text, DateTime, func
+from sqlalchemy import DDL, Index, Text, event, func
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
+from app.db.types import Timestamp
+
+# Text search configuration used for the PostgreSQL tsvector column and queries.
+SEARCH_CONFIG: str = "english"
+# SQLite FTS5 table mirroring messages.content (rowid = messages.id).
+SEARCH_FTS_TABLE: str = "messages_fts"
 
 class Message(Base):
     """SQLAlchemy model for the messages table."""
     __tablename__: str = "messages"
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
-    user_id: Mapped[str] = mapped_column(nullable=False, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[str] = mapped_column(nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        Timestamp,
         server_default=func.now(),
         nullable=False,
     )
 
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        Timestamp,
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False,
     )
 
+    __table_args__ = (
+        # Serves per-user listings ordered by (created_at DESC, id DESC) as a pure index scan.
+        Index("ix_messages_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+    )
+
+
+# Full-text search: a generated tsvector column with a GIN index on PostgreSQL, and an
+# external-content FTS5 table kept in sync by triggers on SQLite (see migration 0004).
+for _ddl in (
+    DDL(
+        "ALTER TABLE messages ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}'::regconfig, content)) STORED"
+    ).execute_if(dialect="postgresql"),
+    DDL("CREATE INDEX ix_messages_search_vector ON messages USING GIN (search_vector)").execute_if(
+        dialect="postgresql"
+    ),
+    DDL(
+        f"CREATE VIRTUAL TABLE {SEARCH_FTS_TABLE} USING fts5(content, content='messages', content_rowid='id')"
+    ).execute_if(dialect="sqlite"),
+    DDL(
+        "CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN "
+        f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END"
+    ).execute_if(dialect="sqlite"),
+    DDL(
+        "CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN "
+        f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); END"
+    ).execute_if(dialect="sqlite"),
+    DDL(
+        "CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages BEGIN "
+        f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); "
+        f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END"
+    ).execute_if(dialect="sqlite"),
+):
+    event.listen(Message.__table__, "after_create", _ddl)
+
+event.listen(
+    Message.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {SEARCH_FTS_TABLE}").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, Pool
+
+
+@dataclass
+class PoolMetrics:
+    """Running counters for connection checkouts from a pool."""
+    checkouts: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    wait_last: float = 0.0
+    peak_in_use: int = 0
+    timeouts: int = 0
+
+    def record(self: PoolMetrics, waited: float, in_use: int) -> None:
+        """Record a successful checkout and how long it waited for a connection."""
+        self.checkouts += 1
+        self.wait_total += waited
+        self.wait_last = waited
+        self.wait_max = max(self.wait_max, waited)
+        self.peak_in_use = max(self.peak_in_use, in_use)
+
+    @property
+    def wait_avg(self: PoolMetrics) -> float:
+        """Average checkout wait in seconds."""
+        return self.wait_total / self.checkouts if self.checkouts else 0.0
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waits for a connection."""
+
+    def __init__(self: InstrumentedAsyncQueuePool, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics: PoolMetrics = PoolMetrics()
+
+    def _do_get(self: InstrumentedAsyncQueuePool) -> ConnectionPoolEntry:
+        start: float = perf_counter()
+        try:
+            entry: ConnectionPoolEntry = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record(perf_counter() - start, self.checkedout())
+        return entry
+
+
+def pool_status(pool: Pool) -> dict[str, Any]:
+    """Summarize pool sizing and checkout metrics for diagnostics."""
+    if not isinstance(pool, InstrumentedAsyncQueuePool):
+        return {"pool": type(pool).__name__, "pooled": False}
+
+    metrics: PoolMetrics = pool.metrics
+    return {
+        "pool": type(pool).__name__,
+        "pooled": True,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "peak_in_use": metrics.peak_in_use,
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "wait_avg_ms": round(metrics.wait_avg * 1000, 3),
+        "wait_max_ms": round(metrics.wait_max * 1000, 3),
+        "wait_last_ms": round(metrics.wait_last * 1000, 3),
+    }
@@ -0,0 +1,65 @@
+"""Re-encode stored map state payloads with the configured storage codec.
+
+Usage:
+    python -m app.db.recompress [--batch-size 500] [--decompress]
+    python -m app.db.recompress --train-dictionary states.dict [--samples 1000]
+
+Payloads are processed in hash order, one committed batch at a time, so the tool can
+be stopped and resumed with --after-hash.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from app.core.settings import get_settings
+from app.db.compression import StateCodec, codec_from_settings, train_dictionary
+from app.db.session import async_session, engine
+from app.infrastructure.map_states.dao import MapStateDAO
+
+
+async def recompress(codec: StateCodec, batch_size: int, after_hash: str = "") -> tuple[int, int]:
+    """Re-encode every map state payload; returns (batches processed, payloads rewritten)."""
+    batches: int = 0
+    rewritten: int = 0
+    async with async_session() as session:
+        dao = MapStateDAO(session, codec)
+        while True:
+            last_hash, changed = await dao.recompress(after_hash, batch_size)
+            if last_hash is None:
+                return batches, rewritten
+            batches += 1
+            rewritten += changed
+            after_hash = last_hash
+            print(f"batch {batches}: up to hash {last_hash}, rewrote {changed}")
+
+
+async def train(output: Path, samples: int) -> None:
+    """Train a dictionary from recent states and write it to output."""
+    async with async_session() as session:
+        states: list[str] = await MapStateDAO(session).sample_states(samples)
+    output.write_bytes(train_dictionary(states))
+    print(f"trained dictionary from {len(states)} states -> {output}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        if args.train_dictionary is not None:
+            await train(args.train_dictionary, args.samples)
+            return
+        codec: StateCodec = StateCodec() if args.decompress else codec_from_settings(get_settings().storage)
+        batches, rewritten = await recompress(codec, args.batch_size, args.after_hash)
+        print(f"done: {batches} batches, {rewritten} payloads rewritten with codec {codec.tag!r}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--after-hash", default="", help="Resume after this payload hash")
+    parser.add_argument("--decompress", action="store_true", help="Store every state as plain text")
+    parser.add_argument("--train-dictionary", type=Path, default=None, help="Write a trained dictionary here")
+    parser.add_argument("--samples", type=int, default=1000, help="States to sample for training")
+    asyncio.run(main(parser.parse_args()))
@@ -1,17 +1,33 @@
 from collections.abc import AsyncGenerator
+from typing import Any
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.pool import NullPool
-from app.core.settings import Settings, get_settings
+from app.core.settings import DatabaseSettings, Settings, get_settings
+from app.db.pool import InstrumentedAsyncQueuePool, pool_status
 
 # Project settings for database configuration
 settings: Settings = get_settings()
 
+def engine_options(database: DatabaseSettings) -> dict[str, Any]:
+    """Build pool-related keyword arguments for create_async_engine."""
+    if not database.use_pool:
+        return {"poolclass": NullPool}  # safer for SQLite / testing
+
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": database.pool_size,
+        "max_overflow": database.pool_max_overflow,
+        "pool_timeout": database.pool_timeout,
+        "pool_recycle": database.pool_recycle,
+        "pool_pre_ping": database.pool_pre_ping,
+    }
+
 # Create an asynchronous database engine
 engine: AsyncEngine = create_async_engine(
     str(settings.database.url),
     future=True,
     echo=settings.debug,
-    poolclass=NullPool,  # safer for SQLite / testing
+    **engine_options(settings.database),
 )
 
 # Create an asynchronous session maker
@@ -25,3 +41,11 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """Dependency to get a database session."""
     async with async_session() as session:
         yield session
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Dependency for work that must own its sessions, such as a body streamed after the request's session closes."""
+    return async_session
+
+def get_pool_status() -> dict[str, Any]:
+    """Report connection pool usage for the global engine."""
+    return pool_status(engine.pool)
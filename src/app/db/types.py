@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import ColumnElement, DateTime, Text, cast
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Dialect
+from sqlalchemy.types import TypeDecorator, TypeEngine
+
+# Timezone-aware timestamp. SQLite binds are written without microseconds so they
+# compare equal to CURRENT_TIMESTAMP server defaults, which keyset cursors rely on.
+Timestamp: TypeEngine[datetime] = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(truncate_microseconds=True), "sqlite"
+)
+
+
+class JSONDocument(TypeDecorator[str]):
+    """A JSON document exchanged as serialized text.
+
+    Stored as JSONB on PostgreSQL so it can be queried and indexed server-side, and as
+    Text elsewhere. Values are passed through as strings in both directions, so large
+    documents are never parsed in Python just to be written or returned.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self: "JSONDocument", dialect: Dialect) -> TypeEngine[Any]:
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.JSONB())
+        return dialect.type_descriptor(Text())
+
+    def bind_processor(self: "JSONDocument", dialect: Dialect) -> None:
+        # The asyncpg JSONB codec accepts the serialized text as is.
+        return None
+
+    def result_processor(self: "JSONDocument", dialect: Dialect, coltype: object) -> None:
+        return None
+
+    def column_expression(self: "JSONDocument", colexpr: ColumnElement[Any]) -> ColumnElement[str]:
+        # Select as text so drivers with a JSONB codec do not decode the document.
+        return cast(colexpr, Text)
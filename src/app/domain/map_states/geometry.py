@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+# GeoJSON geometry types whose "coordinates" hold positions (RFC 7946, section 3.1).
+GEOMETRY_TYPES: frozenset[str] = frozenset(
+    {"Point", "MultiPoint", "LineString", "MultiLineString", "Polygon", "MultiPolygon"}
+)
+
+
+@dataclass(frozen=True)
+class BoundingBox:
+    """An axis-aligned box in longitude/latitude (EPSG:4326)."""
+
+    min_x: float
+    min_y: float
+    max_x: float
+    max_y: float
+
+    def intersects(self: BoundingBox, other: BoundingBox) -> bool:
+        return (
+            self.min_x <= other.max_x
+            and other.min_x <= self.max_x
+            and self.min_y <= other.max_y
+            and other.min_y <= self.max_y
+        )
+
+
+def parse_bbox(raw: str) -> BoundingBox:
+    """Parse "min_x,min_y,max_x,max_y"; raises ValueError if malformed."""
+    parts: list[str] = raw.split(",")
+    if len(parts) != 4:
+        raise ValueError("bbox must be min_x,min_y,max_x,max_y")
+    values: list[float] = [float(part) for part in parts]
+    if not all(math.isfinite(value) for value in values):
+        raise ValueError("bbox values must be finite numbers")
+    bbox = BoundingBox(*values)
+    if bbox.min_x > bbox.max_x or bbox.min_y > bbox.max_y:
+        raise ValueError("bbox minimums must not exceed maximums")
+    return bbox
+
+
+def _positions(coordinates: Any) -> Iterator[tuple[float, float]]:
+    if isinstance(coordinates, list):
+        if len(coordinates) >= 2 and all(isinstance(c, (int, float)) for c in coordinates[:2]):
+            yield float(coordinates[0]), float(coordinates[1])
+        else:
+            for child in coordinates:
+                yield from _positions(child)
+
+
+def _geometries(node: Any) -> Iterator[Any]:
+    """Coordinates of every GeoJSON geometry anywhere in a document.
+
+    Features, FeatureCollections and GeometryCollections are found by walking the whole
+    tree, so geometries nested inside layers or other application objects count too.
+    """
+    stack: list[Any] = [node]
+    while stack:
+        current: Any = stack.pop()
+        if isinstance(current, dict):
+            if current.get("type") in GEOMETRY_TYPES and "coordinates" in current:
+                yield current["coordinates"]
+            else:
+                stack.extend(current.values())
+        elif isinstance(current, list):
+            stack.extend(current)
+
+
+def bounding_box(document: Any) -> BoundingBox | None:
+    """The bounding box of all GeoJSON geometries in a parsed document, or None if it has none."""
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    for coordinates in _geometries(document):
+        for x, y in _positions(coordinates):
+            if not (math.isfinite(x) and math.isfinite(y)):
+                continue
+            min_x, max_x = min(min_x, x), max(max_x, x)
+            min_y, max_y = min(min_y, y), max(max_y, y)
+    if min_x > max_x:
+        return None
+    return BoundingBox(min_x, min_y, max_x, max_y)
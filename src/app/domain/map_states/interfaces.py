@@ -1,9 +1,19 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Sequence
+from typing import AsyncIterator, Sequence
 
-from .models import MapStateDomain
+from app.domain.pagination import KeysetCursor
+from .geometry import BoundingBox
+from .models import (
+    MapStateDomain,
+    MapStateHistoryEntry,
+    MapStateMetadata,
+    MapStateSummary,
+    MapStateVersionInfo,
+)
+from .patch import StatePatch
+from .paths import JsonPath
 
 
 class MapStateRepository(ABC):
@@ -18,7 +28,14 @@ async def create(
     async def get(self: MapStateRepository, id: int) -> MapStateDomain | None: ...
 
     @abstractmethod
-    async def list(self: MapStateRepository) -> Sequence[MapStateDomain]: ...
+    async def get_many(self: MapStateRepository, ids: Sequence[int]) -> Sequence[MapStateDomain]: ...
+
+    @abstractmethod
+    async def list(
+        self: MapStateRepository,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapStateDomain]: ...
 
     @abstractmethod
     async def update(
@@ -30,5 +47,79 @@ async def delete(self: MapStateRepository, id: int) -> bool: ...
 
     @abstractmethod
     async def list_by_user(
-        self: MapStateRepository, user_id: str
+        self: MapStateRepository,
+        user_id: str,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
     ) -> Sequence[MapStateDomain]: ...
+
+    @abstractmethod
+    async def update_owned(
+        self: MapStateRepository,
+        id: int,
+        name: str,
+        state: str,
+        owner_id: str | None,
+        expected_version: int | None = None,
+    ) -> MapStateDomain | None: ...
+
+    @abstractmethod
+    async def delete_owned(
+        self: MapStateRepository, id: int, owner_id: str | None
+    ) -> MapStateDomain | None: ...
+
+    @abstractmethod
+    async def exists(self: MapStateRepository, id: int) -> bool: ...
+
+    @abstractmethod
+    def stream(
+        self: MapStateRepository, user_id: str | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[MapStateDomain]]: ...
+
+    @abstractmethod
+    async def get_partial(
+        self: MapStateRepository, id: int, paths: Sequence[JsonPath]
+    ) -> MapStateDomain | None: ...
+
+    @abstractmethod
+    async def get_subtree(
+        self: MapStateRepository, id: int, path: JsonPath
+    ) -> MapStateDomain | None: ...
+
+    @abstractmethod
+    async def patch(
+        self: MapStateRepository, id: int, patch: StatePatch, owner_id: str | None
+    ) -> MapStateVersionInfo | None: ...
+
+    @abstractmethod
+    async def get_metadata(self: MapStateRepository, id: int) -> MapStateMetadata | None: ...
+
+    @abstractmethod
+    async def list_versions(
+        self: MapStateRepository, id: int, limit: int, before: int | None = None
+    ) -> Sequence[MapStateHistoryEntry]: ...
+
+    @abstractmethod
+    async def get_version(
+        self: MapStateRepository, id: int, version: int
+    ) -> MapStateDomain | None: ...
+
+    @abstractmethod
+    async def list_summaries(
+        self: MapStateRepository,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapStateSummary]: ...
+
+    @abstractmethod
+    async def get_summary(self: MapStateRepository, id: int) -> MapStateSummary | None: ...
+
+    @abstractmethod
+    async def list_within(
+        self: MapStateRepository,
+        bbox: BoundingBox,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapStateSummary]: ...
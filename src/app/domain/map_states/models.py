@@ -1,21 +1,28 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
 from pydantic import BaseModel
+from sqlalchemy import Row
 
 from app.auth.oidc_user import OIDCUser
 from app.db.entities.map_state import MapState
 
 
-class MapStateDomain(BaseModel):
-    """Domain model for a MapState."""
+@dataclass(slots=True, kw_only=True)
+class MapStateDomain:
+    """Domain model for a MapState.
+
+    A slotted dataclass built without validation; see MessageDomain.
+    """
 
     id: int
     user_id: str
     name: str
     state: str
+    version: int = 1
     user: Optional[OIDCUser] = None
     created_at: datetime
     updated_at: datetime
@@ -27,8 +34,64 @@ def from_entity(cls: type[MapStateDomain], db_obj: MapState) -> MapStateDomain:
             id=db_obj.id,
             user_id=db_obj.user_id,
             name=db_obj.name,
-            state=db_obj.state,
+            state=db_obj.document,
+            version=db_obj.version,
             user=None,
             created_at=db_obj.created_at,
             updated_at=db_obj.updated_at,
         )
+
+    @classmethod
+    def from_row(cls: type[MapStateDomain], row: Row[Any], state: str) -> MapStateDomain:
+        """Create a MapStateDomain from a row of selected metadata columns and the state to use."""
+        return cls(
+            id=row.id,
+            user_id=row.user_id,
+            name=row.name,
+            state=state,
+            version=row.version,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
+
+
+class MapStateVersionInfo(BaseModel):
+    """Version metadata of a map state after a change."""
+
+    id: int
+    version: int
+    updated_at: datetime
+
+
+class MapStateMetadata(BaseModel):
+    """Ownership and change metadata of a map state, read without its state."""
+
+    id: int
+    user_id: str
+    version: int
+    updated_at: datetime
+
+
+class MapStateHistoryEntry(BaseModel):
+    """One version in a map state's history."""
+
+    version: int
+    name: str
+    # True when the version is stored as a full snapshot rather than a delta.
+    snapshot: bool
+    created_at: datetime
+
+
+class MapStateSummary(BaseModel):
+    """A map state without its state document, for listings."""
+
+    id: int
+    user_id: str
+    name: str
+    version: int
+    # Size of the state's JSON text in bytes, and its SHA-256 content hash.
+    size_bytes: int
+    content_hash: str
+    user: Optional[OIDCUser] = None
+    created_at: datetime
+    updated_at: datetime
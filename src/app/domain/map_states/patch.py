@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import copy
+from abc import ABC, abstractmethod
+from typing import Any
+
+from .paths import JsonPath
+
+JSON_PATCH_MEDIA_TYPE: str = "application/json-patch+json"
+MERGE_PATCH_MEDIA_TYPE: str = "application/merge-patch+json"
+
+_MISSING: Any = object()
+
+
+class PatchError(ValueError):
+    """The patch document itself is malformed."""
+
+
+class PatchConflict(ValueError):
+    """The patch is well formed but cannot be applied to the current state."""
+
+
+def parse_pointer(pointer: str) -> JsonPath:
+    """Parse an RFC 6901 JSON Pointer such as "/layers/0/name"."""
+    if pointer == "":
+        return ()
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON Pointer: {pointer!r}")
+    return tuple(token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/"))
+
+
+class StatePatch(ABC):
+    """A change to a map state document."""
+
+    @abstractmethod
+    def apply(self: StatePatch, document: Any) -> Any:
+        """Return the patched document; raises PatchConflict if it cannot be applied."""
+
+
+class JsonPatch(StatePatch):
+    """An RFC 6902 JSON Patch document."""
+
+    def __init__(self: JsonPatch, operations: list[dict[str, Any]]) -> None:
+        self.operations: list[dict[str, Any]] = operations
+
+    @classmethod
+    def parse(cls: type[JsonPatch], body: Any) -> JsonPatch:
+        """Validate the structure of a JSON Patch document; raises PatchError."""
+        if not isinstance(body, list):
+            raise PatchError("A JSON Patch document must be an array of operations")
+        operations: list[dict[str, Any]] = []
+        for index, raw in enumerate(body):
+            if not isinstance(raw, dict) or not isinstance(raw.get("path"), str):
+                raise PatchError(f"Operation {index} must be an object with a string 'path'")
+            op: Any = raw.get("op")
+            if op not in ("add", "remove", "replace", "move", "copy", "test"):
+                raise PatchError(f"Operation {index} has unknown op {op!r}")
+            if op in ("add", "replace", "test") and "value" not in raw:
+                raise PatchError(f"Operation {index} ({op}) requires 'value'")
+            if op in ("move", "copy") and not isinstance(raw.get("from"), str):
+                raise PatchError(f"Operation {index} ({op}) requires 'from'")
+            operations.append(
+                {
+                    "op": op,
+                    "path": parse_pointer(raw["path"]),
+                    "value": raw.get("value"),
+                    "from": parse_pointer(raw["from"]) if op in ("move", "copy") else None,
+                }
+            )
+        return cls(operations)
+
+    def apply(self: JsonPatch, document: Any) -> Any:
+        for operation in self.operations:
+            op: str = operation["op"]
+            path: JsonPath = operation["path"]
+            if op == "add":
+                document = _add(document, path, copy.deepcopy(operation["value"]))
+            elif op == "remove":
+                document, _ = _remove(document, path)
+            elif op == "replace":
+                document, _ = _remove(document, path)
+                document = _add(document, path, copy.deepcopy(operation["value"]))
+            elif op == "move":
+                source: JsonPath = operation["from"]
+                if path[: len(source)] == source and path != source:
+                    raise PatchConflict("Cannot move a value into one of its own children")
+                document, value = _remove(document, source)
+                document = _add(document, path, value)
+            elif op == "copy":
+                document = _add(document, path, copy.deepcopy(_get(document, operation["from"])))
+            elif op == "test":
+                if not _json_equal(_get(document, path), operation["value"]):
+                    raise PatchConflict(f"Test failed at /{'/'.join(path)}")
+        return document
+
+
+class MergePatch(StatePatch):
+    """An RFC 7396 JSON Merge Patch document."""
+
+    def __init__(self: MergePatch, patch: Any) -> None:
+        self.patch: Any = patch
+
+    def apply(self: MergePatch, document: Any) -> Any:
+        return _merge(document, self.patch)
+
+
+def diff(old: Any, new: Any, path: JsonPath = ()) -> list[dict[str, Any]]:
+    """Raw RFC 6902 operations turning old into new, for JsonPatch.parse.
+
+    Objects are compared member by member and arrays element by element, with
+    elements appended or removed at the end; any other difference replaces the value.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        operations: list[dict[str, Any]] = [
+            {"op": "remove", "path": _pointer(path + (key,))} for key in old if key not in new
+        ]
+        for key, value in new.items():
+            if key in old:
+                operations.extend(diff(old[key], value, path + (key,)))
+            else:
+                operations.append({"op": "add", "path": _pointer(path + (key,)), "value": value})
+        return operations
+    if isinstance(old, list) and isinstance(new, list):
+        operations = []
+        for index, (before, after) in enumerate(zip(old, new)):
+            operations.extend(diff(before, after, path + (str(index),)))
+        operations.extend(
+            {"op": "add", "path": _pointer(path + ("-",)), "value": value} for value in new[len(old):]
+        )
+        # Remove from the end so earlier indices stay valid.
+        operations.extend(
+            {"op": "remove", "path": _pointer(path + (str(index),))}
+            for index in reversed(range(len(new), len(old)))
+        )
+        return operations
+    # type() keeps true/1 and 1/1.0 apart, which == would not.
+    if type(old) is type(new) and old == new:
+        return []
+    return [{"op": "replace", "path": _pointer(path), "value": new}]
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """RFC 6902 equality: values of the same JSON type, numbers compared by value.
+
+    Python's == would treat true as 1 and false as 0; booleans only equal booleans.
+    """
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(value, b[key]) for key, value in a.items())
+    return type(a) is type(b) and a == b
+
+
+def _merge(target: Any, patch: Any) -> Any:
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result: dict[str, Any] = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = _merge(result.get(key), value)
+    return result
+
+
+def _pointer(path: JsonPath) -> str:
+    return "".join("/" + token.replace("~", "~0").replace("/", "~1") for token in path)
+
+
+def _index(container: list[Any], token: str, path: JsonPath, *, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise PatchConflict(f"Invalid array index at {_pointer(path)}")
+    index: int = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchConflict(f"Array index out of range at {_pointer(path)}")
+    return index
+
+
+def _get(document: Any, path: JsonPath) -> Any:
+    node: Any = document
+    for depth, token in enumerate(path):
+        if isinstance(node, dict):
+            node = node.get(token, _MISSING)
+        elif isinstance(node, list):
+            node = node[_index(node, token, path[: depth + 1], allow_end=False)]
+        else:
+            node = _MISSING
+        if node is _MISSING:
+            raise PatchConflict(f"No value at {_pointer(path)}")
+    return node
+
+
+def _add(document: Any, path: JsonPath, value: Any) -> Any:
+    if not path:
+        return value
+    parent: Any = _get(document, path[:-1])
+    token: str = path[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, token, path, allow_end=True), value)
+    else:
+        raise PatchConflict(f"Cannot add a member to a scalar at {_pointer(path[:-1])}")
+    return document
+
+
+def _remove(document: Any, path: JsonPath) -> tuple[Any, Any]:
+    if not path:
+        return None, document
+    parent: Any = _get(document, path[:-1])
+    token: str = path[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise PatchConflict(f"No value at {_pointer(path)}")
+        return document, parent.pop(token)
+    if isinstance(parent, list):
+        return document, parent.pop(_index(parent, token, path, allow_end=False))
+    raise PatchConflict(f"No value at {_pointer(path)}")
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Sequence
+
+# A path into a map state document, e.g. ("viewport", "center") for "viewport.center".
+JsonPath = tuple[str, ...]
+
+MAX_STATE_FIELDS: int = 32
+_SEGMENT: re.Pattern[str] = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+def parse_path(raw: str) -> JsonPath:
+    """Parse a dot-separated path such as "layers.0.style"; raises ValueError if malformed."""
+    path: JsonPath = tuple(raw.strip().split("."))
+    if not all(_SEGMENT.match(segment) for segment in path):
+        raise ValueError(f"Invalid state path: {raw!r}")
+    return path
+
+
+def parse_fields(raw: str) -> list[JsonPath]:
+    """Parse a comma-separated list of paths, dropping duplicates; raises ValueError if malformed."""
+    paths: list[JsonPath] = list(dict.fromkeys(parse_path(part) for part in raw.split(",") if part.strip()))
+    if not paths:
+        raise ValueError("At least one state field is required")
+    if len(paths) > MAX_STATE_FIELDS:
+        raise ValueError(f"At most {MAX_STATE_FIELDS} state fields may be requested")
+    return paths
+
+
+def extract(document: Any, path: JsonPath) -> str | None:
+    """JSON text of the sub-tree at path, or None if absent; numeric segments index arrays."""
+    node: Any = document
+    for segment in path:
+        if isinstance(node, dict) and segment in node:
+            node = node[segment]
+        elif isinstance(node, list) and segment.isdigit() and int(segment) < len(node):
+            node = node[int(segment)]
+        else:
+            return None
+    return json.dumps(node, separators=(",", ":"))
+
+
+def prune(fragments: Sequence[tuple[JsonPath, str | None]]) -> str:
+    """Assemble extracted sub-trees into one document holding only the requested paths.
+
+    Each fragment is the JSON text found at its path, or None if the path is absent
+    (absent paths are omitted). A path nested under another requested path is covered
+    by the outer one.
+    """
+    document: dict[str, Any] = {}
+    for path, fragment in sorted(fragments, key=lambda item: len(item[0])):
+        if fragment is None:
+            continue
+        node: dict[str, Any] = document
+        for segment in path[:-1]:
+            child: Any = node.setdefault(segment, {})
+            if not isinstance(child, dict):
+                break
+            node = child
+        else:
+            node.setdefault(path[-1], json.loads(fragment))
+    return json.dumps(document, separators=(",", ":"))
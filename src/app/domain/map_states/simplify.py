@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+from .geometry import GEOMETRY_TYPES
+
+# Deepest zoom level accepted for level-of-detail requests (web map tile zooms).
+MAX_ZOOM: int = 24
+# Tiles are TILE_SIZE pixels wide, so a pixel at zoom z spans 360 / (TILE_SIZE * 2**z) degrees.
+TILE_SIZE: int = 256
+
+
+def tolerance_for_zoom(zoom: int) -> float:
+    """Simplification tolerance in degrees: the width of one pixel at the given zoom."""
+    return 360.0 / (TILE_SIZE * 2**zoom)
+
+
+def douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Boolean mask of the vertices Douglas–Peucker keeps within tolerance.
+
+    Each segment's distances are computed as one vectorized operation; the recursion is
+    an explicit stack so long lines cannot exhaust Python's recursion limit. Only the
+    first two columns (x, y) are considered.
+    """
+    count: int = len(points)
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, -1]] = True
+    xy: np.ndarray = points[:, :2]
+    stack: list[tuple[int, int]] = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = xy[end] - xy[start]
+        offsets: np.ndarray = xy[start + 1 : end] - xy[start]
+        length: float = float(np.hypot(dx, dy))
+        if length == 0.0:
+            # Closed ring: measure from the shared endpoint.
+            distances: np.ndarray = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(dx * offsets[:, 1] - dy * offsets[:, 0]) / length
+        farthest: int = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split: int = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def _simplify_line(positions: list[Any], tolerance: float, min_points: int) -> list[Any]:
+    if len(positions) <= min_points:
+        return positions
+    try:
+        points: np.ndarray = np.asarray(positions, dtype=float)
+    except ValueError:
+        # Mixed 2D/3D positions: simplify on x, y only.
+        points = np.asarray([position[:2] for position in positions], dtype=float)
+    if points.ndim != 2 or points.shape[1] < 2:
+        return positions
+    simplified: list[Any] = [positions[i] for i in np.flatnonzero(douglas_peucker(points, tolerance))]
+    # A ring needs four positions; one that would collapse is kept as is.
+    return simplified if len(simplified) >= min_points else positions
+
+
+def _simplify_coordinates(kind: str, coordinates: Any, tolerance: float) -> Any:
+    if kind == "LineString":
+        return _simplify_line(coordinates, tolerance, 2)
+    if kind == "MultiLineString":
+        return [_simplify_line(line, tolerance, 2) for line in coordinates]
+    if kind == "Polygon":
+        return [_simplify_line(ring, tolerance, 4) for ring in coordinates]
+    if kind == "MultiPolygon":
+        return [[_simplify_line(ring, tolerance, 4) for ring in polygon] for polygon in coordinates]
+    return coordinates
+
+
+def simplify_document(node: Any, tolerance: float) -> Any:
+    """A copy of a parsed document with every GeoJSON line and polygon simplified.
+
+    Points are unchanged, as are geometries whose coordinates are malformed.
+    """
+    if isinstance(node, dict):
+        if node.get("type") in GEOMETRY_TYPES and "coordinates" in node:
+            try:
+                coordinates: Any = _simplify_coordinates(node["type"], node["coordinates"], tolerance)
+            except (TypeError, ValueError, IndexError):
+                coordinates = node["coordinates"]
+            return {**node, "coordinates": coordinates}
+        return {key: simplify_document(value, tolerance) for key, value in node.items()}
+    if isinstance(node, list):
+        return [simplify_document(item, tolerance) for item in node]
+    return node
+
+
+def simplify_state(state: str, tolerance: float) -> str:
+    """Simplify the geometries of a state given as JSON text."""
+    return json.dumps(simplify_document(json.loads(state), tolerance), separators=(",", ":"))
+
+
+class SimplificationCache:
+    """Least-recently-used cache of simplified states keyed by (content hash, tolerance).
+
+    A content hash identifies one version's document exactly, so entries never go stale.
+    """
+
+    def __init__(self: SimplificationCache, max_entries: int = 256) -> None:
+        self.max_entries: int = max_entries
+        self._entries: OrderedDict[tuple[str, float], str] = OrderedDict()
+
+    def get(self: SimplificationCache, digest: str, tolerance: float) -> str | None:
+        state: str | None = self._entries.get((digest, tolerance))
+        if state is not None:
+            self._entries.move_to_end((digest, tolerance))
+        return state
+
+    def put(self: SimplificationCache, digest: str, tolerance: float, state: str) -> None:
+        self._entries[(digest, tolerance)] = state
+        self._entries.move_to_end((digest, tolerance))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self: SimplificationCache) -> int:
+        return len(self._entries)
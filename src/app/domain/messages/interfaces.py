@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Sequence
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Iterable, Sequence
 
-from .models import MessageDomain
+from app.domain.pagination import KeysetCursor, RankCursor
+from .models import MessageDomain, MessageMetadata
 
 class MessageRepository(ABC):
     """Abstract base class for message repository."""
@@ -14,7 +16,12 @@ async def create(self: MessageRepository, user_id: str, content: str) -> Message
     async def get(self: MessageRepository, id: int) -> MessageDomain | None: ...
 
     @abstractmethod
-    async def list(self: MessageRepository) -> Sequence[MessageDomain]: ...
+    async def get_many(self: MessageRepository, ids: Sequence[int]) -> Sequence[MessageDomain]: ...
+
+    @abstractmethod
+    async def list(
+        self: MessageRepository, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[MessageDomain]: ...
 
     @abstractmethod
     async def update(self: MessageRepository, id: int, content: str) -> MessageDomain | None: ...
@@ -23,4 +30,43 @@ async def update(self: MessageRepository, id: int, content: str) -> MessageDomai
     async def delete(self: MessageRepository, id: int) -> bool: ...
 
     @abstractmethod
-    async def list_by_user(self: MessageRepository, user_id: str) -> Sequence[MessageDomain]: ...
+    async def list_by_user(
+        self: MessageRepository, user_id: str, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[MessageDomain]: ...
+
+    @abstractmethod
+    async def update_owned(
+        self: MessageRepository,
+        id: int,
+        content: str,
+        owner_id: str | None,
+        expected_updated_at: datetime | None = None,
+    ) -> MessageDomain | None: ...
+
+    @abstractmethod
+    async def delete_owned(self: MessageRepository, id: int, owner_id: str | None) -> MessageDomain | None: ...
+
+    @abstractmethod
+    async def exists(self: MessageRepository, id: int) -> bool: ...
+
+    @abstractmethod
+    async def get_metadata(self: MessageRepository, id: int) -> MessageMetadata | None: ...
+
+    @abstractmethod
+    def stream(
+        self: MessageRepository, user_id: str | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[MessageDomain]]: ...
+
+    @abstractmethod
+    async def bulk_create(
+        self: MessageRepository, user_id: str, contents: Iterable[str] | AsyncIterable[str]
+    ) -> list[int]: ...
+
+    @abstractmethod
+    async def search(
+        self: MessageRepository,
+        query: str,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: RankCursor | None = None,
+    ) -> Sequence[tuple[MessageDomain, float]]: ...
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
+
 from pydantic import BaseModel
+from sqlalchemy import Row
 
 from app.auth.oidc_user import OIDCUser
 
 from app.db.entities.message import Message
 
-class MessageDomain(BaseModel):
-    """Domain model for a message."""
+@dataclass(slots=True, kw_only=True)
+class MessageDomain:
+    """Domain model for a message.
+
+    A slotted dataclass: repositories build thousands of these per listing, and the
+    constructor does no validation (rows are already typed). Pydantic validation
+    happens at the API boundary, when the schemas read these attributes.
+    """
     id: int
     user_id: str
     content: str
@@ -28,3 +37,21 @@ def from_entity(cls: type[MessageDomain], db_obj: Message) -> MessageDomain:
             created_at=db_obj.created_at,
             updated_at=db_obj.updated_at,
         )
+
+    @classmethod
+    def from_row(cls: type[MessageDomain], row: Row[Any]) -> MessageDomain:
+        """Create a MessageDomain from a row of selected columns, ignoring any others."""
+        return cls(
+            id=row.id,
+            user_id=row.user_id,
+            content=row.content,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
+
+
+class MessageMetadata(BaseModel):
+    """Ownership and change metadata of a message, read without its content."""
+    id: int
+    user_id: str
+    updated_at: datetime
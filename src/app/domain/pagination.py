@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Generic, Protocol, Sequence, TypeVar
+
+from pydantic import BaseModel, ConfigDict
+
+DEFAULT_PAGE_SIZE: int = 50
+MAX_PAGE_SIZE: int = 500
+
+
+class Keyed(Protocol):
+    """Anything that can be positioned in a (created_at, id) keyset."""
+    @property
+    def id(self) -> int: ...
+
+    @property
+    def created_at(self) -> datetime: ...
+
+
+T = TypeVar("T", bound=Keyed)
+
+
+def _encode_token(values: list[Any]) -> str:
+    raw: bytes = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_token(token: str) -> list[Any]:
+    # binascii.Error and JSONDecodeError are both ValueError subclasses.
+    return json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+
+
+class KeysetCursor(BaseModel):
+    """Position of the last item of a page, ordered by (created_at DESC, id DESC)."""
+    model_config = ConfigDict(frozen=True)
+
+    created_at: datetime
+    id: int
+
+    @classmethod
+    def after(cls: type[KeysetCursor], item: Keyed) -> KeysetCursor:
+        """Build the cursor that continues after the given item."""
+        return cls(created_at=item.created_at, id=item.id)
+
+    def encode(self: KeysetCursor) -> str:
+        """Encode the cursor as an opaque URL-safe token."""
+        return _encode_token([self.created_at.isoformat(), self.id])
+
+    @classmethod
+    def decode(cls: type[KeysetCursor], token: str) -> KeysetCursor:
+        """Decode an opaque token produced by encode(); raises ValueError if malformed."""
+        try:
+            created_at, id = _decode_token(token)
+            return cls(created_at=datetime.fromisoformat(created_at), id=int(id))
+        except (ValueError, TypeError) as exc:
+            raise ValueError("Invalid pagination cursor") from exc
+
+
+class RankCursor(BaseModel):
+    """Position of the last item of a ranked page, ordered by (rank DESC, id DESC)."""
+    model_config = ConfigDict(frozen=True)
+
+    rank: float
+    id: int
+
+    def encode(self: RankCursor) -> str:
+        """Encode the cursor as an opaque URL-safe token."""
+        return _encode_token([self.rank, self.id])
+
+    @classmethod
+    def decode(cls: type[RankCursor], token: str) -> RankCursor:
+        """Decode an opaque token produced by encode(); raises ValueError if malformed."""
+        try:
+            rank, id = _decode_token(token)
+            return cls(rank=float(rank), id=int(id))
+        except (ValueError, TypeError) as exc:
+            raise ValueError("Invalid pagination cursor") from exc
+
+
+@dataclass
+class Page(Generic[T]):
+    """A page of items plus the cursor for the next page, if any."""
+    items: list[T]
+    next_cursor: KeysetCursor | RankCursor | None = None
+
+    @classmethod
+    def from_overfetch(cls: type[Page[T]], items: Sequence[T], limit: int) -> Page[T]:
+        """Build a page from a query that fetched limit + 1 rows to detect a following page."""
+        if len(items) <= limit:
+            return cls(items=list(items))
+        page: list[T] = list(items[:limit])
+        return cls(items=page, next_cursor=KeysetCursor.after(page[-1]))
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, NamedTuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheMetrics:
+    """Running counters for a cache."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self: CacheMetrics) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class _Entry(NamedTuple):
+    value: Any
+    expires_at: float
+    size: int
+
+
+class LRUCache(Generic[K, V]):
+    """A bounded least-recently-used cache with a time-to-live.
+
+    Entries are evicted oldest-use first once either max_entries or max_bytes (as
+    measured by sizeof) would be exceeded; values larger than max_bytes are never
+    stored. Expired entries are dropped when looked up.
+
+    A read that misses should capture `epoch` before loading and pass it to put():
+    any invalidation in between makes put() a no-op, so a load racing a write cannot
+    re-cache the old value.
+    """
+
+    def __init__(
+        self: LRUCache[K, V],
+        max_entries: int,
+        ttl: float,
+        max_bytes: int | None = None,
+        sizeof: Callable[[V], int] = sys.getsizeof,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries: int = max_entries
+        self.ttl: float = ttl
+        self.max_bytes: int | None = max_bytes
+        self.sizeof: Callable[[V], int] = sizeof
+        self.clock: Callable[[], float] = clock
+        self.metrics: CacheMetrics = CacheMetrics()
+        self.bytes: int = 0
+        self.epoch: int = 0
+        self._entries: OrderedDict[K, _Entry] = OrderedDict()
+
+    def __len__(self: LRUCache[K, V]) -> int:
+        return len(self._entries)
+
+    def get(self: LRUCache[K, V], key: K) -> V | None:
+        entry: _Entry | None = self._entries.get(key)
+        if entry is None:
+            self.metrics.misses += 1
+            return None
+        if entry.expires_at <= self.clock():
+            self._remove(key)
+            self.metrics.expirations += 1
+            self.metrics.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.metrics.hits += 1
+        return entry.value
+
+    def put(self: LRUCache[K, V], key: K, value: V, epoch: int | None = None, ttl: float | None = None) -> None:
+        """Store value under key for ttl seconds (the cache's ttl by default)."""
+        if epoch is not None and epoch != self.epoch:
+            return
+        size: int = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, self.clock() + (self.ttl if ttl is None else ttl), size)
+        self.bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            oldest: K = next(iter(self._entries))
+            self._remove(oldest)
+            self.metrics.evictions += 1
+
+    def invalidate(self: LRUCache[K, V], key: K) -> None:
+        self.epoch += 1
+        if key in self._entries:
+            self._remove(key)
+            self.metrics.invalidations += 1
+
+    def clear(self: LRUCache[K, V]) -> None:
+        self.epoch += 1
+        self._entries.clear()
+        self.bytes = 0
+
+    def _remove(self: LRUCache[K, V], key: K) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+
+def cache_status(cache: LRUCache[Any, Any] | None) -> dict[str, Any]:
+    """Summarize a cache's occupancy and counters for diagnostics."""
+    if cache is None:
+        return {"enabled": False}
+
+    metrics: CacheMetrics = cache.metrics
+    return {
+        "enabled": True,
+        "entries": len(cache),
+        "bytes": cache.bytes,
+        "max_entries": cache.max_entries,
+        "max_bytes": cache.max_bytes,
+        "ttl_seconds": cache.ttl,
+        "hits": metrics.hits,
+        "misses": metrics.misses,
+        "hit_rate": round(metrics.hit_rate, 4),
+        "evictions": metrics.evictions,
+        "expirations": metrics.expirations,
+        "invalidations": metrics.invalidations,
+    }
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import sys
+from copy import copy
+from functools import lru_cache
+from typing import AsyncIterator, Sequence
+
+from app.core.settings import CacheSettings, EntityCacheSettings, get_settings
+from app.domain.map_states.geometry import BoundingBox
+from app.domain.map_states.interfaces import MapStateRepository
+from app.domain.map_states.models import (
+    MapStateDomain,
+    MapStateHistoryEntry,
+    MapStateMetadata,
+    MapStateSummary,
+    MapStateVersionInfo,
+)
+from app.domain.map_states.patch import StatePatch
+from app.domain.map_states.paths import JsonPath
+from app.domain.pagination import KeysetCursor
+from app.infrastructure.cache import LRUCache
+from app.infrastructure.shared_cache import SharedCache, SharedEntityCache, get_redis
+
+# Rough per-item overhead of a MapStateDomain beyond its state text.
+MAP_STATE_OVERHEAD_BYTES: int = 512
+
+
+def map_state_size(map_state: MapStateDomain) -> int:
+    """Approximate memory held by a cached map state; dominated by the state text."""
+    return sys.getsizeof(map_state.state) + MAP_STATE_OVERHEAD_BYTES
+
+
+@lru_cache
+def get_map_state_cache() -> LRUCache[int, MapStateDomain] | None:
+    """The process-wide map state cache, or None when disabled in settings."""
+    config: EntityCacheSettings = get_settings().cache.map_states
+    if not config.enabled:
+        return None
+    return LRUCache(config.max_entries, config.ttl_seconds, config.max_bytes, map_state_size)
+
+
+@lru_cache
+def get_shared_map_state_cache() -> SharedEntityCache[MapStateDomain] | None:
+    """The shared map state cache, or None when disabled or no server is configured."""
+    config: CacheSettings = get_settings().cache
+    if not config.map_states.shared or config.redis_url is None:
+        return None
+    cache = SharedCache(get_redis(), config.key_prefix, config.map_states.ttl_seconds, config.lock_timeout_seconds)
+    return SharedEntityCache(cache, "map_state", MapStateDomain)
+
+
+def _page(limit: int | None, after: KeysetCursor | None) -> tuple[object, ...]:
+    return (limit or "all", after.encode() if after is not None else "first")
+
+
+class MapStateRepositoryDecorator(MapStateRepository):
+    """MapStateRepository that delegates every call to inner; subclasses override what they cache."""
+
+    def __init__(self: MapStateRepositoryDecorator, inner: MapStateRepository) -> None:
+        self.inner: MapStateRepository = inner
+
+    async def get(self: MapStateRepositoryDecorator, id: int) -> MapStateDomain | None:
+        return await self.inner.get(id)
+
+    async def get_many(self: MapStateRepositoryDecorator, ids: Sequence[int]) -> Sequence[MapStateDomain]:
+        return await self.inner.get_many(ids)
+
+    async def create(
+        self: MapStateRepositoryDecorator, user_id: str, name: str, state: str
+    ) -> MapStateDomain:
+        return await self.inner.create(user_id, name, state)
+
+    async def list(
+        self: MapStateRepositoryDecorator,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapStateDomain]:
+        return await self.inner.list(limit, after)
+
+    async def update(
+        self: MapStateRepositoryDecorator, id: int, name: str, state: str
+    ) -> MapStateDomain | None:
+        return await self.inner.update(id, name, state)
+
+    async def delete(self: MapStateRepositoryDecorator, id: int) -> bool:
+        return await self.inner.delete(id)
+
+    async def list_by_user(
+        self: MapStateRepositoryDecorator,
+        user_id: str,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapStateDomain]:
+        return await self.inner.list_by_user(user_id, limit, after)
+
+    async def update_owned(
+        self: MapStateRepositoryDecorator,
+        id: int,
+        name: str,
+        state: str,
+        owner_id: str | None,
+        expected_version: int | None = None,
+    ) -> MapStateDomain | None:
+        return await self.inner.update_owned(id, name, state, owner_id, expected_version)
+
+    async def delete_owned(
+        self: MapStateRepositoryDecorator, id: int, owner_id: str | None
+    ) -> MapStateDomain | None:
+        return await self.inner.delete_owned(id, owner_id)
+
+    async def patch(
+        self: MapStateRepositoryDecorator, id: int, patch: StatePatch, owner_id: str | None
+    ) -> MapStateVersionInfo | None:
+        return await self.inner.patch(id, patch, owner_id)
+
+    async def exists(self: MapStateRepositoryDecorator, id: int) -> bool:
+        return await self.inner.exists(id)
+
+    def stream(
+        self: MapStateRepositoryDecorator, user_id: str | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[MapStateDomain]]:
+        return self.inner.stream(user_id, chunk_size)
+
+    async def get_partial(
+        self: MapStateRepositoryDecorator, id: int, paths: Sequence[JsonPath]
+    ) -> MapStateDomain | None:
+        return await self.inner.get_partial(id, paths)
+
+    async def get_subtree(
+        self: MapStateRepositoryDecorator, id: int, path: JsonPath
+    ) -> MapStateDomain | None:
+        return await self.inner.get_subtree(id, path)
+
+    async def get_metadata(self: MapStateRepositoryDecorator, id: int) -> MapStateMetadata | None:
+        return await self.inner.get_metadata(id)
+
+    async def list_versions(
+        self: MapStateRepositoryDecorator, id: int, limit: int, before: int | None = None
+    ) -> Sequence[MapStateHistoryEntry]:
+        return await self.inner.list_versions(id, limit, before)
+
+    async def get_version(
+        self: MapStateRepositoryDecorator, id: int, version: int
+    ) -> MapStateDomain | None:
+        return await self.inner.get_version(id, version)
+
+    async def list_summaries(
+        self: MapStateRepositoryDecorator,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapStateSummary]:
+        return await self.inner.list_summaries(user_id, limit, after)
+
+    async def get_summary(self: MapStateRepositoryDecorator, id: int) -> MapStateSummary | None:
+        return await self.inner.get_summary(id)
+
+    async def list_within(
+        self: MapStateRepositoryDecorator,
+        bbox: BoundingBox,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapStateSummary]:
+        return await self.inner.list_within(bbox, user_id, limit, after)
+
+
+class CachingMapStateRepository(MapStateRepositoryDecorator):
+    """MapStateRepository decorator serving get() from an in-process cache.
+
+    Every write through this repository invalidates the affected map state. Writes made
+    by other processes are only seen once the entry's TTL expires.
+    """
+
+    def __init__(
+        self: CachingMapStateRepository, inner: MapStateRepository, cache: LRUCache[int, MapStateDomain]
+    ) -> None:
+        super().__init__(inner)
+        self.cache: LRUCache[int, MapStateDomain] = cache
+
+    async def get(self: CachingMapStateRepository, id: int) -> MapStateDomain | None:
+        # Callers mutate returned map states (e.g. .user, .state), so only copies leave the cache.
+        cached: MapStateDomain | None = self.cache.get(id)
+        if cached is not None:
+            return copy(cached)
+        epoch: int = self.cache.epoch
+        map_state: MapStateDomain | None = await self.inner.get(id)
+        if map_state is not None:
+            self.cache.put(id, copy(map_state), epoch)
+        return map_state
+
+    async def get_many(self: CachingMapStateRepository, ids: Sequence[int]) -> Sequence[MapStateDomain]:
+        found: list[MapStateDomain] = []
+        missing: list[int] = []
+        for id in ids:
+            cached: MapStateDomain | None = self.cache.get(id)
+            if cached is not None:
+                found.append(copy(cached))
+            else:
+                missing.append(id)
+        if missing:
+            epoch: int = self.cache.epoch
+            for map_state in await self.inner.get_many(missing):
+                self.cache.put(map_state.id, copy(map_state), epoch)
+                found.append(map_state)
+        return found
+
+    async def update(
+        self: CachingMapStateRepository, id: int, name: str, state: str
+    ) -> MapStateDomain | None:
+        try:
+            return await self.inner.update(id, name, state)
+        finally:
+            self.cache.invalidate(id)
+
+    async def delete(self: CachingMapStateRepository, id: int) -> bool:
+        try:
+            return await self.inner.delete(id)
+        finally:
+            self.cache.invalidate(id)
+
+    async def update_owned(
+        self: CachingMapStateRepository,
+        id: int,
+        name: str,
+        state: str,
+        owner_id: str | None,
+        expected_version: int | None = None,
+    ) -> MapStateDomain | None:
+        try:
+            return await self.inner.update_owned(id, name, state, owner_id, expected_version)
+        finally:
+            self.cache.invalidate(id)
+
+    async def delete_owned(
+        self: CachingMapStateRepository, id: int, owner_id: str | None
+    ) -> MapStateDomain | None:
+        try:
+            return await self.inner.delete_owned(id, owner_id)
+        finally:
+            self.cache.invalidate(id)
+
+    async def patch(
+        self: CachingMapStateRepository, id: int, patch: StatePatch, owner_id: str | None
+    ) -> MapStateVersionInfo | None:
+        try:
+            return await self.inner.patch(id, patch, owner_id)
+        finally:
+            self.cache.invalidate(id)
+
+
+class SharedCacheMapStateRepository(MapStateRepositoryDecorator):
+    """MapStateRepository decorator serving reads from the shared cache.
+
+    Covers get(), list_by_user() and per-user list_summaries(). Every write bumps the
+    versions of the map state and of its owner's listings, so all workers stop serving
+    the old data at once. Writes that bypass this repository are only seen once entries
+    expire.
+    """
+
+    def __init__(
+        self: SharedCacheMapStateRepository, inner: MapStateRepository, cache: SharedEntityCache[MapStateDomain]
+    ) -> None:
+        super().__init__(inner)
+        self.cache: SharedEntityCache[MapStateDomain] = cache
+
+    async def get(self: SharedCacheMapStateRepository, id: int) -> MapStateDomain | None:
+        return await self.cache.get(id, lambda: self.inner.get(id))
+
+    async def get_many(self: SharedCacheMapStateRepository, ids: Sequence[int]) -> Sequence[MapStateDomain]:
+        return await self.cache.get_many(ids, self.inner.get_many)
+
+    async def list_by_user(
+        self: SharedCacheMapStateRepository,
+        user_id: str,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapStateDomain]:
+        return await self.cache.list(
+            user_id, _page(limit, after), lambda: self.inner.list_by_user(user_id, limit, after)
+        )
+
+    async def list_summaries(
+        self: SharedCacheMapStateRepository,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapStateSummary]:
+        if user_id is None:
+            return await self.inner.list_summaries(user_id, limit, after)
+        return await self.cache.listing(
+            user_id, _page(limit, after), MapStateSummary, lambda: self.inner.list_summaries(user_id, limit, after)
+        )
+
+    async def create(
+        self: SharedCacheMapStateRepository, user_id: str, name: str, state: str
+    ) -> MapStateDomain:
+        map_state: MapStateDomain = await self.inner.create(user_id, name, state)
+        await self.cache.changed([], [user_id])
+        return map_state
+
+    async def update(
+        self: SharedCacheMapStateRepository, id: int, name: str, state: str
+    ) -> MapStateDomain | None:
+        map_state: MapStateDomain | None = await self.inner.update(id, name, state)
+        if map_state is not None:
+            await self.cache.changed([id], [map_state.user_id])
+        return map_state
+
+    async def delete(self: SharedCacheMapStateRepository, id: int) -> bool:
+        # The owner is gone with the row, so look it up first.
+        metadata: MapStateMetadata | None = await self.inner.get_metadata(id)
+        deleted: bool = await self.inner.delete(id)
+        if metadata is not None:
+            await self.cache.changed([id], [metadata.user_id])
+        return deleted
+
+    async def update_owned(
+        self: SharedCacheMapStateRepository,
+        id: int,
+        name: str,
+        state: str,
+        owner_id: str | None,
+        expected_version: int | None = None,
+    ) -> MapStateDomain | None:
+        map_state: MapStateDomain | None = await self.inner.update_owned(id, name, state, owner_id, expected_version)
+        if map_state is not None:
+            await self.cache.changed([id], [map_state.user_id])
+        return map_state
+
+    async def delete_owned(
+        self: SharedCacheMapStateRepository, id: int, owner_id: str | None
+    ) -> MapStateDomain | None:
+        map_state: MapStateDomain | None = await self.inner.delete_owned(id, owner_id)
+        if map_state is not None:
+            await self.cache.changed([id], [map_state.user_id])
+        return map_state
+
+    async def patch(
+        self: SharedCacheMapStateRepository, id: int, patch: StatePatch, owner_id: str | None
+    ) -> MapStateVersionInfo | None:
+        # A successful owned patch implies owner_id owns it; otherwise look the owner up.
+        owner: str | None = owner_id
+        if owner is None:
+            metadata: MapStateMetadata | None = await self.inner.get_metadata(id)
+            owner = metadata.user_id if metadata is not None else None
+        info: MapStateVersionInfo | None = await self.inner.patch(id, patch, owner_id)
+        if info is not None and owner is not None:
+            await self.cache.changed([id], [owner])
+        return info
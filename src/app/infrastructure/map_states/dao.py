@@ -1,58 +1,634 @@
 from __future__ import annotations
 
-from typing import Sequence
+import json
+from collections import Counter
+from typing import Any, AsyncIterator, Sequence
 
-from sqlalchemy import Result, Select
+from geoalchemy2 import Geometry
+from geoalchemy2 import functions as geo
+from sqlalchemy import (
+    ColumnElement,
+    Result,
+    Row,
+    Select,
+    Text,
+    bindparam,
+    case,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    table,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.db.entities.map_state import MapState
+from app.db.compression import IDENTITY, EncodedState, StateCodec, decode_state
+from app.db.entities.map_state import SPATIAL_RTREE_TABLE, MapState
+from app.db.entities.map_state_history import MapStateHistory
+from app.db.entities.map_state_payload import MapStatePayload, content_hash
+from app.db.types import JSONDocument
+from app.domain.map_states.geometry import BoundingBox, bounding_box
+from app.domain.map_states.patch import StatePatch, diff
+from app.domain.map_states.paths import JsonPath, extract
+from app.domain.pagination import KeysetCursor
+from app.infrastructure.pagination import keyset_paginate
 from app.schemas.map_states.map_states import MapStateCreate, MapStateUpdate
 
 
 class MapStateDAO:
     """Data Access Object for MapState entity."""
 
-    def __init__(self: MapStateDAO, session: AsyncSession) -> None:
+    def __init__(
+        self: MapStateDAO,
+        session: AsyncSession,
+        codec: StateCodec | None = None,
+        snapshot_interval: int = 20,
+    ) -> None:
         self.session: AsyncSession = session
+        # Decides how states are stored; rows are always readable whatever codec wrote them.
+        self.codec: StateCodec = codec or StateCodec()
+        # History keeps a full snapshot every snapshot_interval versions, bounding replay.
+        self.snapshot_interval: int = snapshot_interval
 
     async def create(
         self: MapStateDAO, user_id: str, payload: MapStateCreate
     ) -> MapState:
-        map_state = MapState(user_id=user_id, name=payload.name, state=payload.state)
-        self.session.add(map_state)
+        digest: str = await self._acquire(payload.state)
+        if not self.session.get_bind().dialect.insert_returning:
+            map_state = MapState(user_id=user_id, name=payload.name, state_hash=digest)
+            self.session.add(map_state)
+            await self.session.flush()
+            await self.session.refresh(map_state)
+            await self._record_version(map_state.id, map_state.version, payload.name, digest, payload.state, None)
+            await self.session.commit()
+            return map_state
+
+        # INSERT ... RETURNING fetches the id and server-default timestamps in one round trip.
+        stmt = (
+            insert(MapState)
+            .values(user_id=user_id, name=payload.name, state_hash=digest)
+            .returning(MapState)
+        )
+        result: Result = await self.session.execute(stmt)
+        created: MapState = result.scalar_one()
+        await self._record_version(created.id, created.version, payload.name, digest, payload.state, None)
         await self.session.commit()
-        await self.session.refresh(map_state)
-        return map_state
+        self._attach(created, digest, payload.state)
+        return created
 
     async def get(self: MapStateDAO, id: int) -> MapState | None:
         return await self.session.get(MapState, id)
 
-    async def list(self: MapStateDAO) -> Sequence[MapState]:
-        result: Result = await self.session.execute(select(MapState))
+    async def get_many(self: MapStateDAO, ids: Sequence[int]) -> Sequence[MapState]:
+        result: Result = await self.session.execute(select(MapState).where(MapState.id.in_(ids)))
         return result.scalars().all()
 
+    async def list(
+        self: MapStateDAO, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[MapState]:
+        stmt: Select = keyset_paginate(
+            select(MapState), MapState.created_at, MapState.id, limit=limit, after=after
+        )
+        result: Result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def list_summaries(
+        self: MapStateDAO,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[Row[Any]]:
+        """List map states newest first as metadata rows, never reading the state itself."""
+        stmt: Select = self._summaries()
+        if user_id is not None:
+            stmt = stmt.where(MapState.user_id == user_id)
+        result: Result = await self.session.execute(
+            keyset_paginate(stmt, MapState.created_at, MapState.id, limit=limit, after=after)
+        )
+        return result.all()
+
+    async def list_within(
+        self: MapStateDAO,
+        bbox: BoundingBox,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[Row[Any]]:
+        """Summary rows of map states whose geometries' bounding box intersects bbox, newest first.
+
+        Candidates come from the GiST index on PostgreSQL and the R-tree on SQLite; the
+        exact test on the stored box then drops the R-tree's float32 rounding slack.
+        """
+        stmt: Select = self._summaries().where(
+            MapStatePayload.bbox_min_x <= bbox.max_x,
+            MapStatePayload.bbox_max_x >= bbox.min_x,
+            MapStatePayload.bbox_min_y <= bbox.max_y,
+            MapStatePayload.bbox_max_y >= bbox.min_y,
+        )
+        if self.session.get_bind().dialect.name == "postgresql":
+            envelope = geo.ST_MakeEnvelope(bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y, 4326)
+            stmt = stmt.where(
+                literal_column("map_state_payloads.bbox", Geometry("POLYGON", srid=4326)).intersects(envelope)
+            )
+        else:
+            rtree = table(
+                SPATIAL_RTREE_TABLE, column("id"), column("min_x"), column("max_x"), column("min_y"), column("max_y")
+            )
+            stmt = stmt.join(rtree, rtree.c.id == MapState.id).where(
+                rtree.c.min_x <= bbox.max_x,
+                rtree.c.max_x >= bbox.min_x,
+                rtree.c.min_y <= bbox.max_y,
+                rtree.c.max_y >= bbox.min_y,
+            )
+        if user_id is not None:
+            stmt = stmt.where(MapState.user_id == user_id)
+        result: Result = await self.session.execute(
+            keyset_paginate(stmt, MapState.created_at, MapState.id, limit=limit, after=after)
+        )
+        return result.all()
+
+    async def get_summary(self: MapStateDAO, id: int) -> Row[Any] | None:
+        """A map state's summary row (see list_summaries), without reading the state."""
+        result: Result = await self.session.execute(self._summaries().where(MapState.id == id))
+        return result.one_or_none()
+
+    @staticmethod
+    def _summaries() -> Select:
+        return select(
+            MapState.id,
+            MapState.user_id,
+            MapState.name,
+            MapState.version,
+            MapStatePayload.size_bytes,
+            MapState.state_hash.label("content_hash"),
+            MapState.created_at,
+            MapState.updated_at,
+        ).join(MapStatePayload, MapStatePayload.hash == MapState.state_hash)
+
     async def update(
         self: MapStateDAO, id: int, payload: MapStateUpdate
     ) -> MapState | None:
+        """Update name and state; a no-op when both are unchanged."""
         map_state: MapState | None = await self.get(id)
         if map_state is None:
             return None
+        digest: str = content_hash(payload.state)
+        if digest == map_state.state_hash and payload.name == map_state.name:
+            return map_state
+        previous: str = payload.state
+        if digest != map_state.state_hash:
+            previous = map_state.document
+            await self._acquire(payload.state)
+            await self._release(map_state.state_hash)
+            map_state.state_hash = digest
         map_state.name = payload.name
-        map_state.state = payload.state
-        await self.session.commit()
+        map_state.version = MapState.version + 1
+        await self.session.flush()
         await self.session.refresh(map_state)
+        await self._record_version(map_state.id, map_state.version, payload.name, digest, payload.state, previous)
+        await self.session.commit()
         return map_state
 
     async def delete(self: MapStateDAO, id: int) -> bool:
         map_state: MapState | None = await self.get(id)
         if map_state is None:
             return False
+        await self._drop_history(MapStateHistory.map_state_id == map_state.id)
         await self.session.delete(map_state)
+        await self.session.flush()
+        await self._release(map_state.state_hash)
         await self.session.commit()
         return True
 
-    async def list_by_user(self: MapStateDAO, user_id: str) -> Sequence[MapState]:
-        stmt: Select = select(MapState).where(MapState.user_id == user_id)
+    async def list_by_user(
+        self: MapStateDAO,
+        user_id: str,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> Sequence[MapState]:
+        stmt: Select = keyset_paginate(
+            select(MapState).where(MapState.user_id == user_id),
+            MapState.created_at,
+            MapState.id,
+            limit=limit,
+            after=after,
+        )
         result: Result = await self.session.execute(stmt)
         return result.scalars().all()
+
+    async def update_owned(
+        self: MapStateDAO,
+        id: int,
+        payload: MapStateUpdate,
+        owner_id: str | None,
+        expected_version: int | None = None,
+    ) -> MapState | None:
+        """Update under a row lock, restricted to owner_id unless it is None.
+
+        With expected_version, only a row still at that version is updated. Saving an
+        unchanged name and state writes nothing; an unchanged state only touches the
+        row's metadata.
+        """
+        stmt = select(MapState.state_hash, MapState.name).where(MapState.id == id).with_for_update()
+        if owner_id is not None:
+            stmt = stmt.where(MapState.user_id == owner_id)
+        if expected_version is not None:
+            stmt = stmt.where(MapState.version == expected_version)
+        digest: str = content_hash(payload.state)
+        try:
+            current: Row[Any] | None = (await self.session.execute(stmt)).one_or_none()
+            if current is None:
+                await self.session.commit()
+                return None
+            if digest == current.state_hash and payload.name == current.name:
+                map_state: MapState | None = await self.get(id)
+                await self.session.commit()
+                return map_state
+
+            values: dict[str, Any] = {"name": payload.name, "version": MapState.version + 1}
+            previous: str = payload.state
+            if digest != current.state_hash:
+                previous = await self._document(current.state_hash)
+                await self._acquire(payload.state)
+                await self._release(current.state_hash)
+                values["state_hash"] = digest
+            result: Result = await self.session.execute(
+                update(MapState).where(MapState.id == id).values(**values).returning(MapState)
+            )
+            map_state = result.scalar_one()
+            await self._record_version(id, map_state.version, payload.name, digest, payload.state, previous)
+        except Exception:
+            await self.session.rollback()
+            raise
+        await self.session.commit()
+        self._attach(map_state, digest, payload.state)
+        return map_state
+
+    async def delete_owned(self: MapStateDAO, id: int, owner_id: str | None) -> MapState | None:
+        """Delete and return the deleted row, restricted to owner_id unless it is None."""
+        owned = select(MapState.id).where(MapState.id == id)
+        if owner_id is not None:
+            owned = owned.where(MapState.user_id == owner_id)
+        await self._drop_history(MapStateHistory.map_state_id.in_(owned))
+
+        stmt = delete(MapState).where(MapState.id == id).returning(*MapState.__table__.columns)
+        if owner_id is not None:
+            stmt = stmt.where(MapState.user_id == owner_id)
+        result: Result = await self.session.execute(stmt)
+        row = result.one_or_none()
+        if row is None:
+            await self.session.commit()
+            return None
+        document: str = await self._document(row.state_hash)
+        await self._release(row.state_hash)
+        await self.session.commit()
+        # Build a detached entity so the deleted row never lands in the identity map.
+        deleted = MapState(**row._mapping)
+        self._attach(deleted, row.state_hash, document)
+        return deleted
+
+    async def exists(self: MapStateDAO, id: int) -> bool:
+        stmt: Select = select(MapState.id).where(MapState.id == id)
+        result: Result = await self.session.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def stream(
+        self: MapStateDAO, user_id: str | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[Row[Any]]]:
+        """Stream map states in id order as chunks of plain rows via a server-side cursor."""
+        stmt = (
+            select(
+                *MapState.__table__.columns,
+                MapStatePayload.state,
+                MapStatePayload.state_codec,
+                MapStatePayload.state_blob,
+            )
+            .join(MapStatePayload, MapStatePayload.hash == MapState.state_hash)
+            .order_by(MapState.id)
+        )
+        if user_id is not None:
+            stmt = stmt.where(MapState.user_id == user_id)
+        result = await self.session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions(chunk_size):
+            yield partition
+
+    async def get_fragments(
+        self: MapStateDAO, id: int, paths: Sequence[JsonPath]
+    ) -> tuple[Row[Any], list[str | None]] | None:
+        """Fetch a map state's metadata and the JSON text at each path, extracted in SQL.
+
+        The full state is never read, except for compressed rows, which are decompressed and
+        extracted in Python. Missing paths yield None.
+        """
+        metadata = [*MapState.__table__.columns, MapStatePayload.state_codec]
+        extracts: list[ColumnElement[str]] = [self._extract(path) for path in paths]
+        compressed = case((MapStatePayload.state_codec != IDENTITY, MapStatePayload.state_blob))
+        stmt = (
+            select(*metadata, *extracts, compressed)
+            .join(MapStatePayload, MapStatePayload.hash == MapState.state_hash)
+            .where(MapState.id == id)
+        )
+        result: Result = await self.session.execute(stmt)
+        row: Row[Any] | None = result.one_or_none()
+        if row is None:
+            return None
+        if row.state_codec == IDENTITY:
+            return row, list(row[len(metadata):-1])
+        document: Any = json.loads(decode_state(None, row.state_codec, row[-1]))
+        return row, [extract(document, path) for path in paths]
+
+    def _extract(self: MapStateDAO, path: JsonPath) -> ColumnElement[str]:
+        if self.session.get_bind().dialect.name == "postgresql":
+            return MapStatePayload.state.op("#>", return_type=JSONDocument())(literal(list(path), ARRAY(Text)))
+        # SQLite's -> returns JSON text (not unquoted scalars), or NULL when absent.
+        return MapStatePayload.state.op("->", return_type=JSONDocument())(self._sqlite_path(path))
+
+    async def patch(
+        self: MapStateDAO, id: int, patch: StatePatch, owner_id: str | None
+    ) -> Row[Any] | None:
+        """Apply a patch to the state and return (id, version, updated_at), or None if not found/owned.
+
+        The patch is applied in Python under a row lock and the result stored by content
+        hash; a patch that leaves the state unchanged writes nothing. Raises PatchConflict
+        (after rolling back) if the patch does not apply.
+        """
+        stmt = (
+            select(
+                MapState.name,
+                MapState.version,
+                MapState.updated_at,
+                MapState.state_hash,
+                MapStatePayload.state,
+                MapStatePayload.state_codec,
+                MapStatePayload.state_blob,
+            )
+            .join(MapStatePayload, MapStatePayload.hash == MapState.state_hash)
+            .where(MapState.id == id)
+            .with_for_update(of=MapState)
+        )
+        if owner_id is not None:
+            stmt = stmt.where(MapState.user_id == owner_id)
+        try:
+            current: Row[Any] | None = (await self.session.execute(stmt)).one_or_none()
+            if current is None:
+                await self.session.rollback()
+                return None
+            previous: str = decode_state(current.state, current.state_codec, current.state_blob)
+            patched: str = json.dumps(patch.apply(json.loads(previous)), separators=(",", ":"))
+            row: Row[Any] = await self._set_state(id, current, previous, patched)
+        except Exception:
+            await self.session.rollback()
+            raise
+        await self.session.commit()
+        return row
+
+    async def _set_state(self: MapStateDAO, id: int, current: Row[Any], previous: str, state: str) -> Row[Any]:
+        digest: str = content_hash(state)
+        if digest == current.state_hash:
+            # Keep the same shape as UPDATE ... RETURNING.
+            return (
+                await self.session.execute(
+                    select(MapState.id, MapState.version, MapState.updated_at).where(MapState.id == id)
+                )
+            ).one()
+        await self._acquire(state)
+        await self._release(current.state_hash)
+        stmt = (
+            update(MapState)
+            .where(MapState.id == id)
+            .values(state_hash=digest, version=MapState.version + 1)
+            .returning(MapState.id, MapState.version, MapState.updated_at)
+        )
+        result: Result = await self.session.execute(stmt)
+        row: Row[Any] = result.one()
+        await self._record_version(id, row.version, current.name, digest, state, previous)
+        return row
+
+    async def _acquire(self: MapStateDAO, state: str) -> str:
+        """Take a reference to the payload holding state and return its hash.
+
+        The document is encoded (and its bounding box derived) only if no identical
+        payload exists yet; otherwise this is a single ref_count increment.
+        """
+        digest: str = content_hash(state)
+        if await self._retain(digest):
+            return digest
+
+        encoded: EncodedState = self.codec.encode(state)
+        bbox: BoundingBox | None = bounding_box(json.loads(state))
+        extent: dict[str, float] = {} if bbox is None else {
+            "bbox_min_x": bbox.min_x,
+            "bbox_min_y": bbox.min_y,
+            "bbox_max_x": bbox.max_x,
+            "bbox_max_y": bbox.max_y,
+        }
+        stmt = self._insert_payload().values(
+            hash=digest, size_bytes=len(state.encode()), ref_count=1, **extent, **encoded.columns()
+        )
+        # A concurrent writer may have stored the same document since the UPDATE above.
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MapStatePayload.hash],
+            set_={"ref_count": MapStatePayload.ref_count + 1},
+        )
+        await self.session.execute(stmt)
+        return digest
+
+    async def _retain(self: MapStateDAO, digest: str) -> bool:
+        """Add a reference to an existing payload; False if there is no payload with that hash."""
+        result: Result = await self.session.execute(
+            update(MapStatePayload)
+            .where(MapStatePayload.hash == digest)
+            .values(ref_count=MapStatePayload.ref_count + 1)
+        )
+        return bool(result.rowcount)  # type: ignore[attr-defined]
+
+    async def _release(self: MapStateDAO, digest: str, count: int = 1) -> None:
+        """Drop references to a payload, deleting the payload once nothing refers to it."""
+        await self.session.execute(
+            update(MapStatePayload)
+            .where(MapStatePayload.hash == digest)
+            .values(ref_count=MapStatePayload.ref_count - count)
+        )
+        await self.session.execute(
+            delete(MapStatePayload).where(MapStatePayload.hash == digest, MapStatePayload.ref_count <= 0)
+        )
+
+    async def _document(self: MapStateDAO, digest: str) -> str:
+        stmt = select(MapStatePayload.state, MapStatePayload.state_codec, MapStatePayload.state_blob).where(
+            MapStatePayload.hash == digest
+        )
+        return decode_state(*(await self.session.execute(stmt)).one())
+
+    async def _record_version(
+        self: MapStateDAO,
+        map_state_id: int,
+        version: int,
+        name: str,
+        digest: str,
+        state: str,
+        previous: str | None,
+    ) -> None:
+        """Append a history entry for a new version.
+
+        The first version and every snapshot_interval-th one reference the full payload;
+        the others store a JSON Patch from the previous state.
+        """
+        values: dict[str, Any]
+        if previous is None or (version - 1) % self.snapshot_interval == 0:
+            await self._retain(digest)
+            values = {"state_hash": digest}
+        else:
+            operations: list[dict[str, Any]] = [] if previous == state else diff(json.loads(previous), json.loads(state))
+            values = {"delta": json.dumps(operations, separators=(",", ":"))}
+        await self.session.execute(
+            insert(MapStateHistory).values(map_state_id=map_state_id, version=version, name=name, **values)
+        )
+
+    async def _drop_history(self: MapStateDAO, condition: ColumnElement[bool]) -> None:
+        result: Result = await self.session.execute(
+            delete(MapStateHistory).where(condition).returning(MapStateHistory.state_hash)
+        )
+        snapshots: Counter[str] = Counter(digest for digest in result.scalars().all() if digest is not None)
+        for digest, count in snapshots.items():
+            await self._release(digest, count)
+
+    def _insert_payload(self: MapStateDAO) -> postgresql.Insert | sqlite.Insert:
+        if self.session.get_bind().dialect.name == "postgresql":
+            return postgresql.insert(MapStatePayload)
+        return sqlite.insert(MapStatePayload)
+
+    @staticmethod
+    def _attach(map_state: MapState, digest: str, state: str) -> None:
+        # Statements returning map_states rows do not load the payload relationship. The
+        # caller already holds the document, so attach it instead of reading it back.
+        set_committed_value(
+            map_state,
+            "payload",
+            MapStatePayload(hash=digest, state=state, state_codec=IDENTITY, size_bytes=len(state.encode())),
+        )
+
+    @staticmethod
+    def _sqlite_path(path: JsonPath) -> str:
+        return "$" + "".join(f"[{s}]" if s.isdigit() else f'."{s}"' for s in path)
+
+    async def get_metadata(self: MapStateDAO, id: int) -> Row[Any] | None:
+        """Fetch (id, user_id, version, updated_at) without touching the payload."""
+        stmt: Select = select(MapState.id, MapState.user_id, MapState.version, MapState.updated_at).where(
+            MapState.id == id
+        )
+        result: Result = await self.session.execute(stmt)
+        return result.one_or_none()
+
+    async def list_history(
+        self: MapStateDAO, id: int, limit: int, before: int | None = None
+    ) -> Sequence[Row[Any]]:
+        """Versions of a map state, newest first, optionally only those below `before`."""
+        stmt = (
+            select(
+                MapStateHistory.version,
+                MapStateHistory.name,
+                MapStateHistory.state_hash.is_not(None).label("snapshot"),
+                MapStateHistory.created_at,
+            )
+            .where(MapStateHistory.map_state_id == id)
+            .order_by(MapStateHistory.version.desc())
+            .limit(limit)
+        )
+        if before is not None:
+            stmt = stmt.where(MapStateHistory.version < before)
+        result: Result = await self.session.execute(stmt)
+        return result.all()
+
+    async def history_chain(self: MapStateDAO, id: int, version: int) -> Sequence[Row[Any]]:
+        """The history rows needed to materialize a version, in one query.
+
+        Starts at the nearest snapshot at or before the version (with its payload) and
+        continues with each delta up to the version, so at most snapshot_interval rows.
+        """
+        base = (
+            select(func.max(MapStateHistory.version))
+            .where(
+                MapStateHistory.map_state_id == id,
+                MapStateHistory.version <= version,
+                MapStateHistory.state_hash.is_not(None),
+            )
+            .scalar_subquery()
+        )
+        stmt = (
+            select(
+                MapStateHistory.version,
+                MapStateHistory.name,
+                MapStateHistory.delta,
+                MapStateHistory.created_at.label("updated_at"),
+                MapState.user_id,
+                MapState.created_at,
+                MapStatePayload.state,
+                MapStatePayload.state_codec,
+                MapStatePayload.state_blob,
+            )
+            .join(MapState, MapState.id == MapStateHistory.map_state_id)
+            .outerjoin(MapStatePayload, MapStatePayload.hash == MapStateHistory.state_hash)
+            .where(
+                MapStateHistory.map_state_id == id,
+                MapStateHistory.version >= base,
+                MapStateHistory.version <= version,
+            )
+            .order_by(MapStateHistory.version)
+        )
+        result: Result = await self.session.execute(stmt)
+        return result.all()
+
+    async def recompress(
+        self: MapStateDAO, after_hash: str = "", batch_size: int = 500
+    ) -> tuple[str | None, int]:
+        """Re-encode the next batch of payloads (hash > after_hash) with this DAO's codec and commit.
+
+        Returns the last hash seen (None when done) and the number of payloads rewritten.
+        Payloads are immutable, so this is storage-only and never changes what readers see.
+        """
+        stmt = (
+            select(MapStatePayload.hash, MapStatePayload.state, MapStatePayload.state_codec, MapStatePayload.state_blob)
+            .where(MapStatePayload.hash > after_hash)
+            .order_by(MapStatePayload.hash)
+            .limit(batch_size)
+        )
+        rows: Sequence[Row[Any]] = (await self.session.execute(stmt)).all()
+        if not rows:
+            return None, 0
+
+        changes: list[dict[str, Any]] = []
+        for row in rows:
+            encoded: EncodedState = self.codec.encode(decode_state(row.state, row.state_codec, row.state_blob))
+            if encoded.state_codec != row.state_codec:
+                changes.append({"b_hash": row.hash, **encoded.columns()})
+
+        if changes:
+            table = MapStatePayload.__table__
+            await self.session.execute(
+                update(table)
+                .where(table.c.hash == bindparam("b_hash"))
+                .values(
+                    state=bindparam("state"),
+                    state_codec=bindparam("state_codec"),
+                    state_blob=bindparam("state_blob"),
+                ),
+                changes,
+            )
+        await self.session.commit()
+        return rows[-1].hash, len(changes)
+
+    async def sample_states(self: MapStateDAO, limit: int) -> list[str]:
+        """Return up to limit recent distinct states as JSON text, e.g. to train a compression dictionary."""
+        stmt = (
+            select(MapStatePayload.state, MapStatePayload.state_codec, MapStatePayload.state_blob)
+            .order_by(MapStatePayload.created_at.desc())
+            .limit(limit)
+        )
+        return [decode_state(*row) for row in (await self.session.execute(stmt)).all()]
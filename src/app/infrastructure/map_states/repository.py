@@ -1,10 +1,24 @@
 from __future__ import annotations
 
-from typing import Sequence
+import json
+from typing import Any, AsyncIterator, Sequence
 
+from sqlalchemy import Row
+
+from app.db.compression import decode_state
 from app.db.entities.map_state import MapState
-from app.domain.map_states.models import MapStateDomain
+from app.domain.map_states.geometry import BoundingBox
+from app.domain.map_states.models import (
+    MapStateDomain,
+    MapStateHistoryEntry,
+    MapStateMetadata,
+    MapStateSummary,
+    MapStateVersionInfo,
+)
+from app.domain.map_states.patch import JsonPatch, StatePatch
 from app.domain.map_states.interfaces import MapStateRepository
+from app.domain.map_states.paths import JsonPath, prune
+from app.domain.pagination import KeysetCursor
 from app.infrastructure.map_states.dao import MapStateDAO
 from app.schemas.map_states.map_states import MapStateCreate, MapStateUpdate
 
@@ -19,7 +33,7 @@ async def create(
         self: SqlAlchemyMapStateRepository, user_id: str, name: str, state: str
     ) -> MapStateDomain:
         db_obj: MapState = await self.dao.create(
-            user_id, MapStateCreate(name=name, state=state)
+            user_id, MapStateCreate.model_construct(name=name, state=state)
         )
         return MapStateDomain.from_entity(db_obj)
 
@@ -27,14 +41,44 @@ async def get(self: SqlAlchemyMapStateRepository, id: int) -> MapStateDomain | N
         db_obj: MapState | None = await self.dao.get(id)
         return MapStateDomain.from_entity(db_obj) if db_obj else None
 
-    async def list(self: SqlAlchemyMapStateRepository) -> list[MapStateDomain]:
-        return [MapStateDomain.from_entity(m) for m in await self.dao.list()]
+    async def get_many(self: SqlAlchemyMapStateRepository, ids: Sequence[int]) -> list[MapStateDomain]:
+        return [MapStateDomain.from_entity(m) for m in await self.dao.get_many(ids)]
+
+    async def list(
+        self: SqlAlchemyMapStateRepository,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> list[MapStateDomain]:
+        return [MapStateDomain.from_entity(m) for m in await self.dao.list(limit, after)]
+
+    async def list_summaries(
+        self: SqlAlchemyMapStateRepository,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> list[MapStateSummary]:
+        rows: Sequence[Row[Any]] = await self.dao.list_summaries(user_id, limit, after)
+        return [MapStateSummary(**row._mapping) for row in rows]
+
+    async def get_summary(self: SqlAlchemyMapStateRepository, id: int) -> MapStateSummary | None:
+        row: Row[Any] | None = await self.dao.get_summary(id)
+        return MapStateSummary(**row._mapping) if row is not None else None
+
+    async def list_within(
+        self: SqlAlchemyMapStateRepository,
+        bbox: BoundingBox,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
+    ) -> list[MapStateSummary]:
+        rows: Sequence[Row[Any]] = await self.dao.list_within(bbox, user_id, limit, after)
+        return [MapStateSummary(**row._mapping) for row in rows]
 
     async def update(
         self: SqlAlchemyMapStateRepository, id: int, name: str, state: str
     ) -> MapStateDomain | None:
         db_obj: MapState | None = await self.dao.update(
-            id, MapStateUpdate(name=name, state=state)
+            id, MapStateUpdate.model_construct(name=name, state=state)
         )
         return MapStateDomain.from_entity(db_obj) if db_obj else None
 
@@ -42,7 +86,103 @@ async def delete(self: SqlAlchemyMapStateRepository, id: int) -> bool:
         return await self.dao.delete(id)
 
     async def list_by_user(
-        self: SqlAlchemyMapStateRepository, user_id: str
+        self: SqlAlchemyMapStateRepository,
+        user_id: str,
+        limit: int | None = None,
+        after: KeysetCursor | None = None,
     ) -> list[MapStateDomain]:
-        db_objs: Sequence[MapState] = await self.dao.list_by_user(user_id)
+        db_objs: Sequence[MapState] = await self.dao.list_by_user(user_id, limit, after)
         return [MapStateDomain.from_entity(m) for m in db_objs]
+
+    async def update_owned(
+        self: SqlAlchemyMapStateRepository,
+        id: int,
+        name: str,
+        state: str,
+        owner_id: str | None,
+        expected_version: int | None = None,
+    ) -> MapStateDomain | None:
+        db_obj: MapState | None = await self.dao.update_owned(
+            id, MapStateUpdate.model_construct(name=name, state=state), owner_id, expected_version
+        )
+        return MapStateDomain.from_entity(db_obj) if db_obj else None
+
+    async def delete_owned(
+        self: SqlAlchemyMapStateRepository, id: int, owner_id: str | None
+    ) -> MapStateDomain | None:
+        db_obj: MapState | None = await self.dao.delete_owned(id, owner_id)
+        return MapStateDomain.from_entity(db_obj) if db_obj else None
+
+    async def exists(self: SqlAlchemyMapStateRepository, id: int) -> bool:
+        return await self.dao.exists(id)
+
+    async def stream(
+        self: SqlAlchemyMapStateRepository,
+        user_id: str | None = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[list[MapStateDomain]]:
+        async for rows in self.dao.stream(user_id, chunk_size):
+            yield [
+                MapStateDomain.from_row(row, decode_state(row.state, row.state_codec, row.state_blob)) for row in rows
+            ]
+
+    async def get_partial(
+        self: SqlAlchemyMapStateRepository, id: int, paths: Sequence[JsonPath]
+    ) -> MapStateDomain | None:
+        """Return the map state with `state` pruned to the requested paths."""
+        found: tuple[Row[Any], list[str | None]] | None = await self.dao.get_fragments(id, paths)
+        if found is None:
+            return None
+        row, fragments = found
+        return MapStateDomain.from_row(row, prune(list(zip(paths, fragments))))
+
+    async def get_subtree(
+        self: SqlAlchemyMapStateRepository, id: int, path: JsonPath
+    ) -> MapStateDomain | None:
+        """Return the map state with `state` replaced by the sub-tree at path (null if absent)."""
+        found: tuple[Row[Any], list[str | None]] | None = await self.dao.get_fragments(id, [path])
+        if found is None:
+            return None
+        row, (fragment,) = found
+        return MapStateDomain.from_row(row, fragment if fragment is not None else "null")
+
+    async def patch(
+        self: SqlAlchemyMapStateRepository, id: int, patch: StatePatch, owner_id: str | None
+    ) -> MapStateVersionInfo | None:
+        """Apply a patch to the state if the map state exists and is owned by owner_id (any owner when None)."""
+        row: Row[Any] | None = await self.dao.patch(id, patch, owner_id)
+        return MapStateVersionInfo(**row._mapping) if row is not None else None
+
+    async def get_metadata(self: SqlAlchemyMapStateRepository, id: int) -> MapStateMetadata | None:
+        row: Row[Any] | None = await self.dao.get_metadata(id)
+        return MapStateMetadata(**row._mapping) if row is not None else None
+
+    async def list_versions(
+        self: SqlAlchemyMapStateRepository, id: int, limit: int, before: int | None = None
+    ) -> list[MapStateHistoryEntry]:
+        return [MapStateHistoryEntry(**row._mapping) for row in await self.dao.list_history(id, limit, before)]
+
+    async def get_version(
+        self: SqlAlchemyMapStateRepository, id: int, version: int
+    ) -> MapStateDomain | None:
+        """Materialize a past version by replaying deltas onto the nearest earlier snapshot."""
+        rows: Sequence[Row[Any]] = await self.dao.history_chain(id, version)
+        if not rows or rows[-1].version != version:
+            return None
+        snapshot, *deltas = rows
+        state: str = decode_state(snapshot.state, snapshot.state_codec, snapshot.state_blob)
+        if deltas:
+            document: Any = json.loads(state)
+            for row in deltas:
+                document = JsonPatch.parse(json.loads(row.delta)).apply(document)
+            state = json.dumps(document, separators=(",", ":"))
+        last: Row[Any] = rows[-1]
+        return MapStateDomain(
+            id=id,
+            user_id=last.user_id,
+            name=last.name,
+            state=state,
+            version=version,
+            created_at=last.created_at,
+            updated_at=last.updated_at,
+        )
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import sys
+from copy import copy
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterable, AsyncIterator, Iterable, Sequence
+
+from app.core.settings import CacheSettings, EntityCacheSettings, get_settings
+from app.domain.messages.interfaces import MessageRepository
+from app.domain.messages.models import MessageDomain, MessageMetadata
+from app.domain.pagination import KeysetCursor, RankCursor
+from app.infrastructure.cache import LRUCache
+from app.infrastructure.shared_cache import SharedCache, SharedEntityCache, get_redis
+
+# Rough per-item overhead of a MessageDomain beyond its content.
+MESSAGE_OVERHEAD_BYTES: int = 512
+
+
+def message_size(message: MessageDomain) -> int:
+    """Approximate memory held by a cached message."""
+    return sys.getsizeof(message.content) + MESSAGE_OVERHEAD_BYTES
+
+
+@lru_cache
+def get_message_cache() -> LRUCache[int, MessageDomain] | None:
+    """The process-wide message cache, or None when disabled in settings."""
+    config: EntityCacheSettings = get_settings().cache.messages
+    if not config.enabled:
+        return None
+    return LRUCache(config.max_entries, config.ttl_seconds, config.max_bytes, message_size)
+
+
+@lru_cache
+def get_shared_message_cache() -> SharedEntityCache[MessageDomain] | None:
+    """The shared message cache, or None when disabled or no server is configured."""
+    config: CacheSettings = get_settings().cache
+    if not config.messages.shared or config.redis_url is None:
+        return None
+    cache = SharedCache(get_redis(), config.key_prefix, config.messages.ttl_seconds, config.lock_timeout_seconds)
+    return SharedEntityCache(cache, "message", MessageDomain)
+
+
+class MessageRepositoryDecorator(MessageRepository):
+    """MessageRepository that delegates every call to inner; subclasses override what they cache."""
+    def __init__(self: MessageRepositoryDecorator, inner: MessageRepository) -> None:
+        self.inner: MessageRepository = inner
+
+    async def get(self: MessageRepositoryDecorator, id: int) -> MessageDomain | None:
+        """Retrieve a message by ID."""
+        return await self.inner.get(id)
+
+    async def get_many(self: MessageRepositoryDecorator, ids: Sequence[int]) -> Sequence[MessageDomain]:
+        """Retrieve the messages with the given IDs, in no particular order."""
+        return await self.inner.get_many(ids)
+
+    async def create(self: MessageRepositoryDecorator, user_id: str, content: str) -> MessageDomain:
+        """Create a new message."""
+        return await self.inner.create(user_id, content)
+
+    async def list(
+        self: MessageRepositoryDecorator, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[MessageDomain]:
+        """List messages newest first."""
+        return await self.inner.list(limit, after)
+
+    async def update(self: MessageRepositoryDecorator, id: int, content: str) -> MessageDomain | None:
+        """Update a message's content by ID."""
+        return await self.inner.update(id, content)
+
+    async def delete(self: MessageRepositoryDecorator, id: int) -> bool:
+        """Delete a message by ID."""
+        return await self.inner.delete(id)
+
+    async def list_by_user(
+        self: MessageRepositoryDecorator, user_id: str, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[MessageDomain]:
+        """List messages created by a specific user, newest first."""
+        return await self.inner.list_by_user(user_id, limit, after)
+
+    async def update_owned(
+        self: MessageRepositoryDecorator,
+        id: int,
+        content: str,
+        owner_id: str | None,
+        expected_updated_at: datetime | None = None,
+    ) -> MessageDomain | None:
+        """Update a message owned by owner_id."""
+        return await self.inner.update_owned(id, content, owner_id, expected_updated_at)
+
+    async def delete_owned(
+        self: MessageRepositoryDecorator, id: int, owner_id: str | None
+    ) -> MessageDomain | None:
+        """Delete a message owned by owner_id."""
+        return await self.inner.delete_owned(id, owner_id)
+
+    async def exists(self: MessageRepositoryDecorator, id: int) -> bool:
+        """Check whether a message exists."""
+        return await self.inner.exists(id)
+
+    async def get_metadata(self: MessageRepositoryDecorator, id: int) -> MessageMetadata | None:
+        """Fetch a message's owner and modification time without its content."""
+        return await self.inner.get_metadata(id)
+
+    def stream(
+        self: MessageRepositoryDecorator, user_id: str | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[MessageDomain]]:
+        """Stream messages in chunks, optionally for a single user."""
+        return self.inner.stream(user_id, chunk_size)
+
+    async def bulk_create(
+        self: MessageRepositoryDecorator, user_id: str, contents: Iterable[str] | AsyncIterable[str]
+    ) -> list[int]:
+        """Create many messages in one transaction and return their IDs."""
+        return await self.inner.bulk_create(user_id, contents)
+
+    async def search(
+        self: MessageRepositoryDecorator,
+        query: str,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: RankCursor | None = None,
+    ) -> Sequence[tuple[MessageDomain, float]]:
+        """Full-text search over message content, best matches first."""
+        return await self.inner.search(query, user_id, limit, after)
+
+
+class CachingMessageRepository(MessageRepositoryDecorator):
+    """MessageRepository decorator serving get() from an in-process cache.
+
+    Writes through this repository invalidate the affected message. Writes made by
+    other processes are only seen once the entry's TTL expires.
+    """
+    def __init__(
+        self: CachingMessageRepository, inner: MessageRepository, cache: LRUCache[int, MessageDomain]
+    ) -> None:
+        """Wrap inner, caching its get() results in cache."""
+        super().__init__(inner)
+        self.cache: LRUCache[int, MessageDomain] = cache
+
+    async def get(self: CachingMessageRepository, id: int) -> MessageDomain | None:
+        """Retrieve a message by ID, from the cache when possible."""
+        # Callers mutate returned messages (e.g. .user), so the cache only hands out copies.
+        cached: MessageDomain | None = self.cache.get(id)
+        if cached is not None:
+            return copy(cached)
+        epoch: int = self.cache.epoch
+        message: MessageDomain | None = await self.inner.get(id)
+        if message is not None:
+            self.cache.put(id, copy(message), epoch)
+        return message
+
+    async def get_many(self: CachingMessageRepository, ids: Sequence[int]) -> Sequence[MessageDomain]:
+        """Retrieve messages by ID, loading only those not cached in one call."""
+        found: list[MessageDomain] = []
+        missing: list[int] = []
+        for id in ids:
+            cached: MessageDomain | None = self.cache.get(id)
+            if cached is not None:
+                found.append(copy(cached))
+            else:
+                missing.append(id)
+        if missing:
+            epoch: int = self.cache.epoch
+            for message in await self.inner.get_many(missing):
+                self.cache.put(message.id, copy(message), epoch)
+                found.append(message)
+        return found
+
+    async def update(self: CachingMessageRepository, id: int, content: str) -> MessageDomain | None:
+        """Update a message's content by ID and drop it from the cache."""
+        try:
+            return await self.inner.update(id, content)
+        finally:
+            self.cache.invalidate(id)
+
+    async def delete(self: CachingMessageRepository, id: int) -> bool:
+        """Delete a message by ID and drop it from the cache."""
+        try:
+            return await self.inner.delete(id)
+        finally:
+            self.cache.invalidate(id)
+
+    async def update_owned(
+        self: CachingMessageRepository,
+        id: int,
+        content: str,
+        owner_id: str | None,
+        expected_updated_at: datetime | None = None,
+    ) -> MessageDomain | None:
+        """Update a message owned by owner_id and drop it from the cache."""
+        try:
+            return await self.inner.update_owned(id, content, owner_id, expected_updated_at)
+        finally:
+            self.cache.invalidate(id)
+
+    async def delete_owned(
+        self: CachingMessageRepository, id: int, owner_id: str | None
+    ) -> MessageDomain | None:
+        """Delete a message owned by owner_id and drop it from the cache."""
+        try:
+            return await self.inner.delete_owned(id, owner_id)
+        finally:
+            self.cache.invalidate(id)
+
+
+class SharedCacheMessageRepository(MessageRepositoryDecorator):
+    """MessageRepository decorator serving get() and list_by_user() from the shared cache.
+
+    Every write bumps the versions of the message and of its owner's listings, so all
+    workers stop serving the old data at once. Writes that bypass this repository are
+    only seen once entries expire.
+    """
+    def __init__(
+        self: SharedCacheMessageRepository, inner: MessageRepository, cache: SharedEntityCache[MessageDomain]
+    ) -> None:
+        """Wrap inner, caching its reads in cache."""
+        super().__init__(inner)
+        self.cache: SharedEntityCache[MessageDomain] = cache
+
+    async def get(self: SharedCacheMessageRepository, id: int) -> MessageDomain | None:
+        """Retrieve a message by ID, from the shared cache when possible."""
+        return await self.cache.get(id, lambda: self.inner.get(id))
+
+    async def get_many(self: SharedCacheMessageRepository, ids: Sequence[int]) -> Sequence[MessageDomain]:
+        """Retrieve messages by ID with one pipelined lookup, loading only the misses in one call."""
+        return await self.cache.get_many(ids, self.inner.get_many)
+
+    async def list_by_user(
+        self: SharedCacheMessageRepository, user_id: str, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[MessageDomain]:
+        """List messages created by a specific user, from the shared cache when possible."""
+        page: tuple[object, ...] = (limit or "all", after.encode() if after is not None else "first")
+        return await self.cache.list(user_id, page, lambda: self.inner.list_by_user(user_id, limit, after))
+
+    async def create(self: SharedCacheMessageRepository, user_id: str, content: str) -> MessageDomain:
+        """Create a new message and invalidate its owner's listings."""
+        message: MessageDomain = await self.inner.create(user_id, content)
+        await self.cache.changed([], [user_id])
+        return message
+
+    async def bulk_create(
+        self: SharedCacheMessageRepository, user_id: str, contents: Iterable[str] | AsyncIterable[str]
+    ) -> list[int]:
+        """Create many messages and invalidate their owner's listings."""
+        try:
+            return await self.inner.bulk_create(user_id, contents)
+        finally:
+            await self.cache.changed([], [user_id])
+
+    async def update(self: SharedCacheMessageRepository, id: int, content: str) -> MessageDomain | None:
+        """Update a message's content by ID and invalidate it."""
+        message: MessageDomain | None = await self.inner.update(id, content)
+        if message is not None:
+            await self.cache.changed([id], [message.user_id])
+        return message
+
+    async def delete(self: SharedCacheMessageRepository, id: int) -> bool:
+        """Delete a message by ID and invalidate it."""
+        # The owner is gone with the row, so look it up first.
+        metadata: MessageMetadata | None = await self.inner.get_metadata(id)
+        deleted: bool = await self.inner.delete(id)
+        if metadata is not None:
+            await self.cache.changed([id], [metadata.user_id])
+        return deleted
+
+    async def update_owned(
+        self: SharedCacheMessageRepository,
+        id: int,
+        content: str,
+        owner_id: str | None,
+        expected_updated_at: datetime | None = None,
+    ) -> MessageDomain | None:
+        """Update a message owned by owner_id and invalidate it."""
+        message: MessageDomain | None = await self.inner.update_owned(id, content, owner_id, expected_updated_at)
+        if message is not None:
+            await self.cache.changed([id], [message.user_id])
+        return message
+
+    async def delete_owned(
+        self: SharedCacheMessageRepository, id: int, owner_id: str | None
+    ) -> MessageDomain | None:
+        """Delete a message owned by owner_id and invalidate it."""
+        message: MessageDomain | None = await self.inner.delete_owned(id, owner_id)
+        if message is not None:
+            await self.cache.changed([id], [message.user_id])
+        return message
@@ -1,12 +1,60 @@
 from __future__ import annotations
-from typing import Sequence, Tuple, Union, overload
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Sequence, Tuple, Union, overload
 
-from sqlalchemy import Result, Select
+from sqlalchemy import (
+    ColumnElement,
+    Float,
+    Result,
+    Row,
+    Select,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    table,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.db.entities.message import Message
+from app.db.entities.message import SEARCH_CONFIG, SEARCH_FTS_TABLE, Message
+from app.domain.pagination import KeysetCursor, RankCursor
+from app.infrastructure.pagination import keyset_paginate
 from app.schemas.messages.messages import MessageCreate
 
+BULK_INSERT_BATCH_SIZE: int = 1000
+COPY_THRESHOLD: int = 500
+
+
+async def _batched(items: Iterable[str] | AsyncIterable[str], size: int) -> AsyncIterator[list[str]]:
+    """Group a sync or async iterable into lists of at most `size` items."""
+    batch: list[str] = []
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    else:
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def _fts5_query(query: str) -> str:
+    """Quote each term so user input is matched literally (implicit AND) instead of as FTS5 syntax."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
 class MessageDAO:
     """Data Access Object for Message entity."""
     def __init__(self: MessageDAO, session: AsyncSession) -> None:
@@ -30,20 +78,38 @@ async def create(
         else:
             content_value = content
 
-        msg = Message(user_id=user_id, content=content_value)
-        self.session.add(msg)
+        if not self.session.get_bind().dialect.insert_returning:
+            msg = Message(user_id=user_id, content=content_value)
+            self.session.add(msg)
+            await self.session.commit()
+            await self.session.refresh(msg)
+            return msg
+
+        # INSERT ... RETURNING fetches the id and server-default timestamps in one round trip.
+        stmt = insert(Message).values(user_id=user_id, content=content_value).returning(Message)
+        result: Result[Tuple[Message]] = await self.session.execute(stmt)
+        created: Message = result.scalar_one()
         await self.session.commit()
-        await self.session.refresh(msg)
-        return msg
+        return created
 
     async def get(self: MessageDAO, id: int) -> Message | None:
         """Retrieve a message by its ID."""
         result: Message | None = await self.session.get(Message, id)
         return result
 
-    async def list(self: MessageDAO) -> Sequence[Message]:
-        """List all messages."""
-        result: Result[Tuple[Message]] = await self.session.execute(select(Message))
+    async def get_many(self: MessageDAO, ids: Sequence[int]) -> Sequence[Message]:
+        """Retrieve the messages with the given IDs in one query, in no particular order."""
+        result: Result[Tuple[Message]] = await self.session.execute(select(Message).where(Message.id.in_(ids)))
+        return result.scalars().all()
+
+    async def list(
+        self: MessageDAO, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[Message]:
+        """List messages newest first, optionally limited and continuing after a cursor."""
+        stmt: Select[Tuple[Message]] = keyset_paginate(
+            select(Message), Message.created_at, Message.id, limit=limit, after=after
+        )
+        result: Result[Tuple[Message]] = await self.session.execute(stmt)
         return result.scalars().all()
 
     async def update(self: MessageDAO, id: int, content: str) -> Message | None:
@@ -65,8 +131,176 @@ async def delete(self: MessageDAO, id: int) -> bool:
         await self.session.commit()
         return True
 
-    async def list_by_user(self: MessageDAO, user_id: str) -> Sequence[Message]:
-        """List all messages for a given user ID."""
-        stmt: Select[Tuple[Message]] = select(Message).where(Message.user_id == user_id)
+    async def list_by_user(
+        self: MessageDAO, user_id: str, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[Message]:
+        """List messages for a given user ID newest first, optionally limited and continuing after a cursor."""
+        stmt: Select[Tuple[Message]] = keyset_paginate(
+            select(Message).where(Message.user_id == user_id),
+            Message.created_at,
+            Message.id,
+            limit=limit,
+            after=after,
+        )
         result: Result[Tuple[Message]] = await self.session.execute(stmt)
         return result.scalars().all()
+
+    async def update_owned(
+        self: MessageDAO,
+        id: int,
+        content: str,
+        owner_id: str | None,
+        expected_updated_at: datetime | None = None,
+    ) -> Message | None:
+        """Update a message in one statement, restricted to owner_id unless it is None.
+
+        With expected_updated_at, only a row not modified since then is updated.
+        Returns None when no row matched, either because the message does not exist,
+        belongs to someone else or has changed.
+        """
+        stmt = update(Message).where(Message.id == id).values(content=content).returning(Message)
+        if owner_id is not None:
+            stmt = stmt.where(Message.user_id == owner_id)
+        if expected_updated_at is not None:
+            stmt = stmt.where(Message.updated_at == expected_updated_at)
+        result: Result[Tuple[Message]] = await self.session.execute(stmt)
+        msg: Message | None = result.scalar_one_or_none()
+        await self.session.commit()
+        return msg
+
+    async def delete_owned(self: MessageDAO, id: int, owner_id: str | None) -> Message | None:
+        """Delete a message in one statement and return the deleted row, restricted to owner_id unless it is None."""
+        stmt = delete(Message).where(Message.id == id).returning(*Message.__table__.columns)
+        if owner_id is not None:
+            stmt = stmt.where(Message.user_id == owner_id)
+        result: Result = await self.session.execute(stmt)
+        row = result.one_or_none()
+        await self.session.commit()
+        # Build a detached entity so the deleted row never lands in the identity map.
+        return Message(**row._mapping) if row is not None else None
+
+    async def exists(self: MessageDAO, id: int) -> bool:
+        """Check whether a message with the given ID exists."""
+        stmt: Select[Tuple[int]] = select(Message.id).where(Message.id == id)
+        result: Result[Tuple[int]] = await self.session.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def get_metadata(self: MessageDAO, id: int) -> Row[Any] | None:
+        """Fetch (id, user_id, updated_at) of a message without its content."""
+        stmt: Select = select(Message.id, Message.user_id, Message.updated_at).where(Message.id == id)
+        result: Result = await self.session.execute(stmt)
+        return result.one_or_none()
+
+    async def stream(
+        self: MessageDAO, user_id: str | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[Row[Any]]]:
+        """Stream messages in id order as chunks of plain rows using a server-side cursor.
+
+        Rows are selected as columns rather than entities so nothing accumulates in the
+        session's identity map and memory stays flat regardless of table size.
+        """
+        stmt = select(*Message.__table__.columns).order_by(Message.id)
+        if user_id is not None:
+            stmt = stmt.where(Message.user_id == user_id)
+        result = await self.session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions(chunk_size):
+            yield partition
+
+    async def bulk_create(
+        self: MessageDAO,
+        user_id: str,
+        contents: Iterable[str] | AsyncIterable[str],
+        batch_size: int = BULK_INSERT_BATCH_SIZE,
+    ) -> list[int]:
+        """Insert many messages in a single transaction and return their IDs in input order.
+
+        Batches use binary COPY on asyncpg and multi-row INSERT ... RETURNING elsewhere.
+        Any failure rolls back the whole ingestion.
+        """
+        ids: list[int] = []
+        try:
+            async for batch in _batched(contents, batch_size):
+                ids.extend(await self._insert_batch(user_id, batch))
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        return ids
+
+    async def _insert_batch(self: MessageDAO, user_id: str, batch: Sequence[str]) -> list[int]:
+        dialect = self.session.get_bind().dialect
+        if dialect.driver == "asyncpg" and len(batch) >= COPY_THRESHOLD:
+            return await self._copy_batch(user_id, batch)
+
+        rows: list[dict[str, str]] = [{"user_id": user_id, "content": content} for content in batch]
+        if dialect.name == "sqlite":
+            # SQLite has no insert sentinel to correlate RETURNING rows with parameters, so
+            # ask for them unordered; insertmanyvalues still sends multi-row INSERTs. SQLite
+            # allocates rowids in ascending order within and across those statements, so
+            # sorting the returned ids restores input order.
+            result: Result[Tuple[int]] = await self.session.execute(insert(Message).returning(Message.id), rows)
+            return sorted(result.scalars().all())
+
+        stmt = insert(Message).returning(Message.id, sort_by_parameter_order=True)
+        result = await self.session.execute(stmt, rows)
+        return list(result.scalars().all())
+
+    async def _copy_batch(self: MessageDAO, user_id: str, batch: Sequence[str]) -> list[int]:
+        # COPY cannot return generated keys, so reserve them from the sequence up front.
+        reserved: Result[Tuple[int]] = await self.session.execute(
+            text(
+                "SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :n)"
+            ),
+            {"table": Message.__tablename__, "n": len(batch)},
+        )
+        ids: list[int] = list(reserved.scalars().all())
+        connection = await self.session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(  # type: ignore[union-attr]
+            Message.__tablename__,
+            records=[(id, user_id, content) for id, content in zip(ids, batch)],
+            columns=["id", "user_id", "content"],
+        )
+        return ids
+
+    async def search(
+        self: MessageDAO,
+        query: str,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: RankCursor | None = None,
+    ) -> Sequence[tuple[Message, float]]:
+        """Full-text search over content, best matches first, with each message's rank.
+
+        Uses the GIN-indexed tsvector column on PostgreSQL and the FTS5 table on SQLite.
+        """
+        if not query.split():
+            return []
+
+        rank: ColumnElement[float]
+        stmt: Select[Tuple[Message, float]]
+        if self.session.get_bind().dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), query)
+            vector = literal_column("messages.search_vector")
+            rank = func.ts_rank_cd(vector, tsquery, type_=Float)
+            stmt = select(Message, rank).where(vector.op("@@")(tsquery))
+        else:
+            fts = table(SEARCH_FTS_TABLE, column("rowid"), column("rank", Float))
+            # FTS5's rank is bm25(), where lower is better; negate so higher ranks first.
+            rank = -fts.c.rank
+            stmt = (
+                select(Message, rank)
+                .join(fts, fts.c.rowid == Message.id)
+                .where(literal_column(SEARCH_FTS_TABLE).match(_fts5_query(query)))
+            )
+
+        if user_id is not None:
+            stmt = stmt.where(Message.user_id == user_id)
+        if after is not None:
+            stmt = stmt.where(tuple_(rank, Message.id) < tuple_(literal(after.rank, Float), literal(after.id)))
+        stmt = stmt.order_by(rank.desc(), Message.id.desc())
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        result: Result[Tuple[Message, float]] = await self.session.execute(stmt)
+        return [(message, float(score)) for message, score in result.all()]
@@ -1,9 +1,13 @@
 from __future__ import annotations
-from typing import Sequence
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Sequence
+
+from sqlalchemy import Row
 
 from app.db.entities.message import Message
-from app.domain.messages.models import MessageDomain
+from app.domain.messages.models import MessageDomain, MessageMetadata
 from app.domain.messages.interfaces import MessageRepository
+from app.domain.pagination import KeysetCursor, RankCursor
 from app.infrastructure.messages.dao import MessageDAO
 
 class SqlAlchemyMessageRepository(MessageRepository):
@@ -22,9 +26,15 @@ async def get(self: SqlAlchemyMessageRepository, id: int) -> MessageDomain | Non
         db_obj: Message | None = await self.dao.get(id)
         return MessageDomain.from_entity(db_obj) if db_obj else None
 
-    async def list(self: SqlAlchemyMessageRepository) -> list[MessageDomain]:
-        """List all messages."""
-        return [MessageDomain.from_entity(m) for m in await self.dao.list()]
+    async def get_many(self: SqlAlchemyMessageRepository, ids: Sequence[int]) -> list[MessageDomain]:
+        """Retrieve the messages with the given IDs in one query, in no particular order."""
+        return [MessageDomain.from_entity(m) for m in await self.dao.get_many(ids)]
+
+    async def list(
+        self: SqlAlchemyMessageRepository, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> list[MessageDomain]:
+        """List messages newest first."""
+        return [MessageDomain.from_entity(m) for m in await self.dao.list(limit, after)]
 
     async def update(self: SqlAlchemyMessageRepository, id: int, content: str) -> MessageDomain | None:
         """Update a message's content by ID."""
@@ -35,7 +45,60 @@ async def delete(self: SqlAlchemyMessageRepository, id: int) -> bool:
         """Delete a message by ID."""
         return await self.dao.delete(id)
 
-    async def list_by_user(self: SqlAlchemyMessageRepository, user_id: str) -> list[MessageDomain]:
-        """List all messages created by a specific user."""
-        db_objs: Sequence[Message] = await self.dao.list_by_user(user_id)
+    async def list_by_user(
+        self: SqlAlchemyMessageRepository, user_id: str, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> list[MessageDomain]:
+        """List messages created by a specific user, newest first."""
+        db_objs: Sequence[Message] = await self.dao.list_by_user(user_id, limit, after)
         return [MessageDomain.from_entity(message) for message in db_objs]
+
+    async def update_owned(
+        self: SqlAlchemyMessageRepository,
+        id: int,
+        content: str,
+        owner_id: str | None,
+        expected_updated_at: datetime | None = None,
+    ) -> MessageDomain | None:
+        """Update a message's content if it exists and is owned by owner_id (any owner when None)."""
+        db_obj: Message | None = await self.dao.update_owned(id, content, owner_id, expected_updated_at)
+        return MessageDomain.from_entity(db_obj) if db_obj else None
+
+    async def delete_owned(
+        self: SqlAlchemyMessageRepository, id: int, owner_id: str | None
+    ) -> MessageDomain | None:
+        """Delete a message if it exists and is owned by owner_id (any owner when None)."""
+        db_obj: Message | None = await self.dao.delete_owned(id, owner_id)
+        return MessageDomain.from_entity(db_obj) if db_obj else None
+
+    async def exists(self: SqlAlchemyMessageRepository, id: int) -> bool:
+        """Check whether a message exists."""
+        return await self.dao.exists(id)
+
+    async def get_metadata(self: SqlAlchemyMessageRepository, id: int) -> MessageMetadata | None:
+        """Fetch a message's owner and modification time without its content."""
+        row: Row[Any] | None = await self.dao.get_metadata(id)
+        return MessageMetadata(**row._mapping) if row is not None else None
+
+    async def stream(
+        self: SqlAlchemyMessageRepository, user_id: str | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[list[MessageDomain]]:
+        """Stream messages in chunks, optionally for a single user."""
+        async for rows in self.dao.stream(user_id, chunk_size):
+            yield [MessageDomain.from_row(row) for row in rows]
+
+    async def bulk_create(
+        self: SqlAlchemyMessageRepository, user_id: str, contents: Iterable[str] | AsyncIterable[str]
+    ) -> list[int]:
+        """Create many messages in one transaction and return their IDs."""
+        return await self.dao.bulk_create(user_id, contents)
+
+    async def search(
+        self: SqlAlchemyMessageRepository,
+        query: str,
+        user_id: str | None = None,
+        limit: int | None = None,
+        after: RankCursor | None = None,
+    ) -> list[tuple[MessageDomain, float]]:
+        """Full-text search over message content, best matches first."""
+        hits: Sequence[tuple[Message, float]] = await self.dao.search(query, user_id, limit, after)
+        return [(MessageDomain.from_entity(message), rank) for message, rank in hits]
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, TypeVar
+
+from sqlalchemy import Select, literal, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.domain.pagination import KeysetCursor
+
+S = TypeVar("S", bound=Select[Any])
+
+
+def keyset_paginate(
+    stmt: S,
+    created_at: InstrumentedAttribute[datetime],
+    id: InstrumentedAttribute[int],
+    *,
+    limit: int | None = None,
+    after: KeysetCursor | None = None,
+) -> S:
+    """Order newest first by (created_at, id) and seek past the cursor instead of using OFFSET."""
+    stmt = stmt.order_by(created_at.desc(), id.desc())
+    if after is not None:
+        # Literals take the column types so bound values match the stored representation.
+        stmt = stmt.where(
+            tuple_(created_at, id)
+            < tuple_(literal(after.created_at, created_at.type), literal(after.id, id.type))
+        )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
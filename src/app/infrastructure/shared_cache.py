@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Generic, Iterable, Sequence, TypeVar
+
+from pydantic import TypeAdapter
+from structlog import BoundLogger
+
+from app.core.logging import get_logger
+from app.core.settings import CacheSettings, get_settings
+
+try:
+    from redis import asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - optional dependency
+    aioredis = None  # type: ignore[assignment]
+    RedisError = OSError  # type: ignore[assignment,misc]
+
+log: BoundLogger = get_logger()
+
+M = TypeVar("M")
+N = TypeVar("N")
+
+# Bumped whenever the cached representation changes, so old entries are never read.
+CACHE_FORMAT_VERSION: int = 1
+
+
+@lru_cache
+def _adapter(model: Any) -> TypeAdapter[Any]:
+    """The TypeAdapter for model (a domain dataclass or pydantic model, or a list of one), built once."""
+    return TypeAdapter(model)
+
+
+@dataclass
+class SharedCacheMetrics:
+    """Running counters for a shared cache client in this process."""
+    hits: int = 0
+    misses: int = 0
+    stampede_waits: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self: SharedCacheMetrics) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _pack(version: int, payload: bytes) -> bytes:
+    return str(version).encode() + b":" + payload
+
+
+def _unpack(raw: bytes | None, version: int) -> bytes | None:
+    """The payload of a cached value, or None if it was stored under another version."""
+    if raw is None:
+        return None
+    stored, _, payload = raw.partition(b":")
+    return payload if stored == str(version).encode() else None
+
+
+def _version(raw: bytes | None) -> int:
+    return int(raw) if raw is not None else 0
+
+
+class SharedCache:
+    """A cache shared by all workers, on any server speaking the Redis protocol.
+
+    Every value is stored together with the version of the version key guarding it
+    (one per item, one per user listing). Writers bump the version instead of deleting
+    values, so a reader that loaded before a write can never publish the old value
+    under the new version; superseded values simply expire. A lookup reads the version
+    and the value in one pipelined round trip.
+
+    Redis errors are logged and treated as misses: the database stays the source of truth.
+    """
+
+    def __init__(
+        self: SharedCache,
+        redis: Any,
+        namespace: str,
+        ttl: float,
+        lock_timeout: float = 5.0,
+        poll_interval: float = 0.02,
+    ) -> None:
+        self.redis: Any = redis
+        self.namespace: str = f"{namespace}:v{CACHE_FORMAT_VERSION}"
+        self.ttl: float = ttl
+        self.lock_timeout: float = lock_timeout
+        self.poll_interval: float = poll_interval
+        self.metrics: SharedCacheMetrics = SharedCacheMetrics()
+
+    def key(self: SharedCache, *parts: object) -> str:
+        return ":".join([self.namespace, *(str(part) for part in parts)])
+
+    async def get(self: SharedCache, key: str, version_key: str) -> tuple[bytes | None, int]:
+        """A cached payload (None on a miss) and the current version it was checked against."""
+        return (await self.get_many([(key, version_key)]))[0]
+
+    async def get_many(
+        self: SharedCache, keys: Sequence[tuple[str, str]]
+    ) -> list[tuple[bytes | None, int]]:
+        """Look up many (key, version key) pairs in one pipelined round trip."""
+        if not keys:
+            return []
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, version_key in keys:
+                    pipe.get(version_key)
+                    pipe.get(key)
+                raw: list[bytes | None] = await pipe.execute()
+        except RedisError as exc:
+            self._failed("get", exc)
+            self.metrics.misses += len(keys)
+            return [(None, -1)] * len(keys)
+        found: list[tuple[bytes | None, int]] = []
+        for i in range(0, len(raw), 2):
+            version: int = _version(raw[i])
+            payload: bytes | None = _unpack(raw[i + 1], version)
+            if payload is None:
+                self.metrics.misses += 1
+            else:
+                self.metrics.hits += 1
+            found.append((payload, version))
+        return found
+
+    async def set_many(self: SharedCache, entries: Sequence[tuple[str, int, bytes]]) -> None:
+        """Store (key, version, payload) entries in one pipelined round trip."""
+        if not entries:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, version, payload in entries:
+                    if version >= 0:
+                        pipe.set(key, _pack(version, payload), px=int(self.ttl * 1000))
+                await pipe.execute()
+        except RedisError as exc:
+            self._failed("set", exc)
+
+    async def set_guarded(
+        self: SharedCache, entries: Sequence[tuple[str, str, bytes]], guard_key: str, guard_version: int
+    ) -> None:
+        """Store (key, version key, payload) entries unless guard_key has moved past guard_version.
+
+        For values loaded before their own version keys were known (items of a listing):
+        every write to them also bumps the guard, so an unchanged guard means the values
+        are current as of the versions read here.
+        """
+        if not entries or guard_version < 0:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(guard_key)
+                for _, version_key, _ in entries:
+                    pipe.get(version_key)
+                raw: list[bytes | None] = await pipe.execute()
+        except RedisError as exc:
+            self._failed("get", exc)
+            return
+        if _version(raw[0]) != guard_version:
+            return
+        await self.set_many(
+            [(key, _version(version), payload) for (key, _, payload), version in zip(entries, raw[1:])]
+        )
+
+    async def bump(self: SharedCache, *version_keys: str) -> None:
+        """Invalidate everything stored under these version keys."""
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for version_key in version_keys:
+                    pipe.incr(version_key)
+                    # Outlive the values they guard; an expired version key just reads as 0.
+                    pipe.pexpire(version_key, int(self.ttl * 10_000))
+                await pipe.execute()
+        except RedisError as exc:
+            # Other workers may serve the old value until it expires.
+            self._failed("bump", exc)
+
+    async def load(
+        self: SharedCache, key: str, version_key: str, loader: Callable[[int], Awaitable[bytes | None]]
+    ) -> bytes | None:
+        """Read-through lookup with stampede protection.
+
+        On a miss one caller (per key, across workers) takes a short lock and calls
+        loader with the version the result will be stored under; concurrent callers poll
+        for its result instead of all hitting the database, and load themselves only if
+        the lock holder takes longer than lock_timeout.
+        """
+        payload, version = await self.get(key, version_key)
+        if payload is not None:
+            return payload
+
+        lock_key: str = f"{key}:lock"
+        token: str = uuid.uuid4().hex
+        try:
+            locked: bool = bool(await self.redis.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)))
+        except RedisError as exc:
+            self._failed("lock", exc)
+            return await loader(-1)
+
+        if locked:
+            try:
+                payload = await loader(version)
+                if payload is not None:
+                    await self.set_many([(key, version, payload)])
+                return payload
+            finally:
+                await self._unlock(lock_key, token)
+
+        self.metrics.stampede_waits += 1
+        deadline: float = asyncio.get_running_loop().time() + self.lock_timeout
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                raw, holder = await self.redis.mget(version_key, key), await self.redis.exists(lock_key)
+            except RedisError as exc:
+                self._failed("poll", exc)
+                break
+            payload = _unpack(raw[1], _version(raw[0]))
+            if payload is not None or not holder:
+                break
+        return payload if payload is not None else await loader(-1)
+
+    async def _unlock(self: SharedCache, lock_key: str, token: str) -> None:
+        try:
+            # Only release our own lock; it may have expired and been taken over.
+            if await self.redis.get(lock_key) == token.encode():
+                await self.redis.delete(lock_key)
+        except RedisError as exc:
+            self._failed("unlock", exc)
+
+    def _failed(self: SharedCache, operation: str, exc: Exception) -> None:
+        self.metrics.errors += 1
+        log.warning("Shared cache operation failed", operation=operation, namespace=self.namespace, error=str(exc))
+
+
+class SharedEntityCache(Generic[M]):
+    """Shared caching of one entity type: items by id, and per-user listings.
+
+    Items are guarded by a per-item version key and listings by a per-user one; call
+    changed() after every write. A listing page stores only ids, whose items are then
+    fetched in one pipelined multi-get, so an item is cached once however many pages
+    show it. The user relation is never cached; it is attached per request.
+    """
+
+    def __init__(self: SharedEntityCache[M], cache: SharedCache, entity: str, model: type[M]) -> None:
+        self.cache: SharedCache = cache
+        self.entity: str = entity
+        self.model: type[M] = model
+
+    def item_key(self: SharedEntityCache[M], id: int) -> str:
+        return self.cache.key(self.entity, id)
+
+    def item_version_key(self: SharedEntityCache[M], id: int) -> str:
+        return self.cache.key(self.entity, id, "version")
+
+    def user_version_key(self: SharedEntityCache[M], user_id: str) -> str:
+        return self.cache.key(self.entity, "user", user_id, "version")
+
+    def dump(self: SharedEntityCache[M], item: Any) -> bytes:
+        return _adapter(type(item)).dump_json(item, exclude={"user"})
+
+    def parse(self: SharedEntityCache[M], payload: bytes) -> M:
+        return _adapter(self.model).validate_json(payload)
+
+    async def get(
+        self: SharedEntityCache[M], id: int, loader: Callable[[], Awaitable[M | None]]
+    ) -> M | None:
+        """An item by id, loading and storing it on a miss."""
+        loaded: list[M | None] = []
+
+        async def load(_: int) -> bytes | None:
+            loaded.append(await loader())
+            return self.dump(loaded[0]) if loaded[0] is not None else None
+
+        payload: bytes | None = await self.cache.load(self.item_key(id), self.item_version_key(id), load)
+        if loaded:
+            return loaded[0]
+        return self.parse(payload) if payload is not None else None
+
+    async def get_many(
+        self: SharedEntityCache[M], ids: Sequence[int], loader: Callable[[list[int]], Awaitable[Sequence[M]]]
+    ) -> list[M]:
+        """Items by id in one pipelined lookup; the misses are loaded with one call and stored.
+
+        Missing items are skipped, and the result is in no particular order.
+        """
+        found: list[tuple[bytes | None, int]] = await self.cache.get_many(
+            [(self.item_key(id), self.item_version_key(id)) for id in ids]
+        )
+        items: list[M] = [self.parse(payload) for payload, _ in found if payload is not None]
+        # Versions were read before loading, so a write racing the load leaves its result unreadable.
+        versions: dict[int, int] = {id: version for id, (payload, version) in zip(ids, found) if payload is None}
+        if versions:
+            loaded: Sequence[M] = await loader(list(versions))
+            await self.cache.set_many(
+                [(self.item_key(item.id), versions[item.id], self.dump(item)) for item in loaded if item.id in versions]
+            )
+            items.extend(loaded)
+        return items
+
+    async def list(
+        self: SharedEntityCache[M],
+        user_id: str,
+        page: Sequence[object],
+        loader: Callable[[], Awaitable[Sequence[M]]],
+    ) -> Sequence[M]:
+        """One page of a user's items, identified by page (e.g. limit and cursor)."""
+        loaded: list[Sequence[M]] = []
+        user_version_key: str = self.user_version_key(user_id)
+
+        async def load(version: int) -> bytes:
+            items: Sequence[M] = await loader()
+            loaded.append(items)
+            await self.cache.set_guarded(
+                [(self.item_key(item.id), self.item_version_key(item.id), self.dump(item)) for item in items],
+                user_version_key,
+                version,
+            )
+            return json.dumps([item.id for item in items]).encode()
+
+        key: str = self.cache.key(self.entity, "user", user_id, "page", *page)
+        payload: bytes | None = await self.cache.load(key, user_version_key, load)
+        if loaded:
+            return loaded[0]
+
+        ids: list[int] = json.loads(payload) if payload is not None else []
+        found: list[tuple[bytes | None, int]] = await self.cache.get_many(
+            [(self.item_key(id), self.item_version_key(id)) for id in ids]
+        )
+        if all(item is not None for item, _ in found):
+            return [self.parse(item) for item, _ in found if item is not None]
+        # Some items were evicted or changed since the page was stored.
+        return await loader()
+
+    async def listing(
+        self: SharedEntityCache[M],
+        user_id: str,
+        page: Sequence[object],
+        model: type[N],
+        loader: Callable[[], Awaitable[Sequence[N]]],
+    ) -> Sequence[N]:
+        """A page of a per-user projection (e.g. summaries), stored whole."""
+        loaded: list[Sequence[N]] = []
+
+        async def load(_: int) -> bytes:
+            loaded.append(await loader())
+            return b"[" + b",".join(self.dump(item) for item in loaded[0]) + b"]"
+
+        key: str = self.cache.key(self.entity, "user", user_id, "listing", model.__name__, *page)
+        payload: bytes | None = await self.cache.load(key, self.user_version_key(user_id), load)
+        if loaded:
+            return loaded[0]
+        return _adapter(list[model]).validate_json(payload) if payload is not None else []  # type: ignore[valid-type]
+
+    async def changed(self: SharedEntityCache[M], ids: Iterable[int], user_ids: Iterable[str]) -> None:
+        """Invalidate the given items and every listing of the given users."""
+        await self.cache.bump(
+            *(self.item_version_key(id) for id in ids), *(self.user_version_key(user_id) for user_id in user_ids)
+        )
+
+
+@lru_cache
+def get_redis() -> Any:
+    """The process-wide Redis client, or None when no shared cache is configured."""
+    config: CacheSettings = get_settings().cache
+    if config.redis_url is None:
+        return None
+    if aioredis is None:
+        raise RuntimeError("The shared cache requires the 'redis' package")
+    return aioredis.Redis.from_url(config.redis_url)
+
+
+def shared_cache_status(cache: SharedCache | None) -> dict[str, Any]:
+    """Summarize a shared cache client's counters for diagnostics."""
+    if cache is None:
+        return {"enabled": False}
+
+    metrics: SharedCacheMetrics = cache.metrics
+    return {
+        "enabled": True,
+        "namespace": cache.namespace,
+        "ttl_seconds": cache.ttl,
+        "hits": metrics.hits,
+        "misses": metrics.misses,
+        "hit_rate": round(metrics.hit_rate, 4),
+        "stampede_waits": metrics.stampede_waits,
+        "errors": metrics.errors,
+    }
@@ -3,10 +3,10 @@
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.utils import generate_unique_id
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi_keycloak_middleware.setup import setup_keycloak_middleware
+from fastapi_keycloak_middleware.schemas.exception_response import ExceptionResponse
 from structlog import BoundLogger
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.status import HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
@@ -14,9 +14,11 @@
 from app.api.api import router as api_router
 from app.auth.keycloak import keycloak, excluded_endpoints
 from app.auth.oidc_user import map_oidc_user
+from app.auth.token_cache import CachingKeycloakMiddleware, get_token_cache
 from app.core.settings import get_settings
 from app.core.settings import Settings
 from app.db.migrations import run_migrations_async
+from app.db.session import engine
 from app.extensions.logging_middleware import log_context_middleware
 from app.extensions.powered_by_middleware import powered_by_middleware
 from app.core.logging import get_logger
@@ -41,7 +43,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     openapi_tags=[],
     servers=[],
     dependencies=None,
-    default_response_class=JSONResponse,
+    default_response_class=ORJSONResponse,
     redirect_slashes=True,
     docs_url="/docs",
     redoc_url="/redoc",
@@ -67,13 +69,17 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     separate_input_output_schemas=True
 )
 
-# Add keycloak middleware
-setup_keycloak_middleware(
-    app=app,
+# Add keycloak middleware, reusing verified tokens until they expire.
+# (What setup_keycloak_middleware does, with the caching middleware class.)
+app.add_middleware(
+    CachingKeycloakMiddleware,
     keycloak_configuration=keycloak,
     user_mapper=map_oidc_user,
-    exclude_patterns=excluded_endpoints
+    exclude_patterns=excluded_endpoints,
+    token_cache=get_token_cache(),
 )
+app.router.responses.setdefault(401, {"description": "Unauthorized", "model": ExceptionResponse})
+app.router.responses.setdefault(403, {"description": "Forbidden", "model": ExceptionResponse})
 
 app.include_router(api_router)
 
@@ -89,7 +95,7 @@ async def startup(app: FastAPI) -> None:
 
 async def shutdown(app: FastAPI) -> None:
     log.info("🛑 Shutting down")
-    # await engine.dispose()
+    await engine.dispose()
     log.info("🛑 Shutdown complete")
 
 @app.exception_handler(StarletteHTTPException)
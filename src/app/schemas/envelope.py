@@ -0,0 +1,13 @@
+from typing import Generic, TypeVar
+
+from pydantic import BaseModel
+
+from app.auth.oidc_user import OIDCUser
+
+T = TypeVar("T")
+
+
+class ListEnvelope(BaseModel, Generic[T]):
+    """A list of items, each referencing its owner by user_id; every known owner is included once."""
+    users: dict[str, OIDCUser]
+    items: list[T]
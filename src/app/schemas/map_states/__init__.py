@@ -1,3 +1,21 @@
-from .map_states import MapStateCreate, MapStateUpdate, MapStateRead
+from .map_states import (
+    MapStateCreate,
+    MapStateUpdate,
+    MapStateListItem,
+    MapStateRead,
+    MapStateSummaryListItem,
+    MapStateSummaryRead,
+    MapStateVersion,
+    MapStateHistoryRead,
+)
 
-__all__ = ["MapStateCreate", "MapStateUpdate", "MapStateRead"]
+__all__ = [
+    "MapStateCreate",
+    "MapStateUpdate",
+    "MapStateListItem",
+    "MapStateRead",
+    "MapStateSummaryListItem",
+    "MapStateSummaryRead",
+    "MapStateVersion",
+    "MapStateHistoryRead",
+]
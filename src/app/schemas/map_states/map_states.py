@@ -1,14 +1,28 @@
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field
+from pydantic_core import from_json
 
 from app.auth.oidc_user import OIDCUser
 
 
+
+def _require_json(value: str) -> str:
+    """Reject state that is not a JSON document; the text itself is kept unchanged."""
+    from_json(value)
+    return value
+
+
+# Serialized JSON document, validated on input but passed through as text.
+JsonText = Annotated[str, AfterValidator(_require_json)]
+
+
 class MapStateBase(BaseModel):
     """Base model for map states."""
 
     name: str = Field(..., examples=["My Map"])
-    state: str = Field(..., examples=["{...}"])
+    state: JsonText = Field(..., examples=['{"layers": [], "viewport": {"zoom": 3}}'])
 
 
 class MapStateCreate(MapStateBase):
@@ -21,16 +35,86 @@ class MapStateUpdate(BaseModel):
     """Model for updating a map state."""
 
     name: str
-    state: str
+    state: JsonText
 
 
 class MapStateRead(MapStateBase):
     """Model for reading a map state."""
 
+    # Output is trusted JSON text from the database; skip re-parsing it.
+    state: str
+
     id: int
     user_id: str
+    version: int
     user: OIDCUser
     created_at: datetime
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class MapStateListItem(MapStateBase):
+    """Model for a map state in a list envelope, which carries its user once for all items."""
+
+    state: str
+
+    id: int
+    user_id: str
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MapStateSummaryRead(BaseModel):
+    """Model for a map state in listings: metadata only, without the state document."""
+
+    id: int
+    user_id: str
+    name: str
+    version: int
+    size_bytes: int
+    content_hash: str
+    user: OIDCUser
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MapStateSummaryListItem(BaseModel):
+    """Model for a map state summary in a list envelope."""
+
+    id: int
+    user_id: str
+    name: str
+    version: int
+    size_bytes: int
+    content_hash: str
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MapStateVersion(BaseModel):
+    """Model for the version metadata returned after a partial update."""
+
+    id: int
+    version: int
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MapStateHistoryRead(BaseModel):
+    """Model for one entry of a map state's version history."""
+
+    version: int
+    name: str
+    snapshot: bool
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1 +1 @@
-from .messages import MessageCreate, MessageUpdate, MessageRead
+from .messages import MessageBulkCreated, MessageCreate, MessageListItem, MessageUpdate, MessageRead
@@ -24,3 +24,17 @@ class MessageRead(MessageBase):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+class MessageListItem(MessageBase):
+    """Model for a message in a list envelope, which carries its user once for all items."""
+    id: int
+    user_id: str
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class MessageBulkCreated(BaseModel):
+    """Model for the result of a bulk message ingestion."""
+    count: int
+    ids: list[int]
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, Mapping, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class BatchLoader(Generic[K, V]):
+    """Collects single-key loads made in the same event-loop tick into one batched load.
+
+    load() only queues its key; once the tasks that are ready have run, every queued key
+    is passed to load_many at once (at most max_batch_size per call). Meant to live for
+    one request: batches run one at a time, so they can share the request's session.
+    """
+
+    def __init__(
+        self,
+        load_many: Callable[[list[K]], Awaitable[Mapping[K, V]]],
+        max_batch_size: int = 500,
+    ) -> None:
+        self.load_many: Callable[[list[K]], Awaitable[Mapping[K, V]]] = load_many
+        self.max_batch_size: int = max_batch_size
+        self.batches: int = 0
+        self._queue: dict[K, asyncio.Future[V | None]] = {}
+        self._lock: asyncio.Lock = asyncio.Lock()
+        # The event loop only keeps weak references to tasks.
+        self._running: set[asyncio.Task[None]] = set()
+
+    async def load(self, key: K) -> V | None:
+        """The value for key, or None if load_many did not return one."""
+        future: asyncio.Future[V | None] | None = self._queue.get(key)
+        if future is None:
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            if not self._queue:
+                loop.call_soon(self._dispatch)
+            future = self._queue[key] = loop.create_future()
+        return await future
+
+    def _dispatch(self) -> None:
+        queued: dict[K, asyncio.Future[V | None]] = self._queue
+        self._queue = {}
+        keys: list[K] = list(queued)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch: dict[K, asyncio.Future[V | None]] = {
+                key: queued[key] for key in keys[start : start + self.max_batch_size]
+            }
+            task: asyncio.Task[None] = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: dict[K, asyncio.Future[V | None]]) -> None:
+        try:
+            async with self._lock:
+                self.batches += 1
+                values: Mapping[K, V] = await self.load_many(list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+                    # Mark it retrieved: a caller that was cancelled meanwhile never awaits it.
+                    future.exception()
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
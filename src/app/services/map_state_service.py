@@ -1,30 +1,190 @@
-from typing import Sequence
+import asyncio
+from typing import AsyncIterator, Sequence
 
 from app.domain.map_states.interfaces import MapStateRepository
 from app.schemas.map_states import MapStateCreate, MapStateUpdate
-from app.domain.map_states.models import MapStateDomain
+from app.domain.map_states.geometry import BoundingBox
+from app.domain.map_states.models import (
+    MapStateDomain,
+    MapStateHistoryEntry,
+    MapStateMetadata,
+    MapStateSummary,
+    MapStateVersionInfo,
+)
+from app.domain.map_states.patch import StatePatch
+from app.domain.map_states.paths import JsonPath
+from app.domain.map_states.simplify import SimplificationCache, simplify_state
+from app.domain.pagination import KeysetCursor, Page
+from app.services.batch_loader import BatchLoader
+from app.services.single_flight import SingleFlight, copy_models
 
 
 class MapStateService:
     """Service layer for map state operations."""
 
-    def __init__(self, repo: MapStateRepository) -> None:
+    def __init__(
+        self,
+        repo: MapStateRepository,
+        simplified: SimplificationCache | None = None,
+        flights: SingleFlight | None = None,
+    ) -> None:
         self.repo: MapStateRepository = repo
+        # Both shared across requests by the caller; private ones otherwise.
+        self.simplified: SimplificationCache = simplified if simplified is not None else SimplificationCache()
+        self.flights: SingleFlight = flights if flights is not None else SingleFlight()
+        # Services live for one request, and so does the batching of its get() calls.
+        self.batch: BatchLoader[int, MapStateDomain] = BatchLoader(self._load_many)
 
     async def create(self, user_id: str, payload: MapStateCreate) -> MapStateDomain:
-        return await self.repo.create(user_id, payload.name, payload.state)
+        try:
+            return await self.repo.create(user_id, payload.name, payload.state)
+        finally:
+            self.flights.forget("list_by_user", user_id)
 
     async def get(self, id: int) -> MapStateDomain | None:
-        return await self.repo.get(id)
+        """Get a map state by ID, sharing the query with identical concurrent calls.
+
+        Concurrent get() calls on this service are resolved with one query.
+        """
+        return await self.flights.do(("get", id), lambda: self.batch.load(id), copy_models)
+
+    async def get_many(self, ids: Sequence[int]) -> list[MapStateDomain]:
+        """Get the map states with the given IDs in that order, skipping missing ones, with one query."""
+        found: list[MapStateDomain | None] = await asyncio.gather(*(self.get(id) for id in ids))
+        return [ms for ms in found if ms is not None]
+
+    async def _load_many(self, ids: list[int]) -> dict[int, MapStateDomain]:
+        if len(ids) == 1:
+            # A lone ID keeps the primary-key lookup.
+            ms: MapStateDomain | None = await self.repo.get(ids[0])
+            return {ms.id: ms} if ms is not None else {}
+        return {ms.id: ms for ms in await self.repo.get_many(ids)}
+
+    async def get_partial(self, id: int, paths: Sequence[JsonPath]) -> MapStateDomain | None:
+        return await self.repo.get_partial(id, paths)
+
+    async def get_simplified(self, id: int, tolerance: float) -> MapStateDomain | None:
+        """The map state with its geometries simplified to tolerance (degrees).
+
+        Cached by content hash, so a hit reads only the summary row, never the state.
+        """
+        summary: MapStateSummary | None = await self.repo.get_summary(id)
+        if summary is None:
+            return None
+        state: str | None = self.simplified.get(summary.content_hash, tolerance)
+        if state is not None:
+            return MapStateDomain(**summary.model_dump(exclude={"size_bytes", "content_hash", "user"}), state=state)
+
+        ms: MapStateDomain | None = await self.repo.get(id)
+        if ms is None:
+            return None
+        # CPU-bound on large states: run it off the event loop so other requests keep being served.
+        ms.state = await asyncio.to_thread(simplify_state, ms.state, tolerance)
+        # Versions change with every write, so a matching version means the summary's content.
+        if ms.version == summary.version:
+            self.simplified.put(summary.content_hash, tolerance, ms.state)
+        return ms
+
+    async def get_subtree(self, id: int, path: JsonPath) -> MapStateDomain | None:
+        return await self.repo.get_subtree(id, path)
 
     async def list(self) -> Sequence[MapStateDomain]:
         return await self.repo.list()
 
     async def list_by_user(self, user_id: str) -> Sequence[MapStateDomain]:
-        return await self.repo.list_by_user(user_id)
+        return await self._list_by_user(user_id)
+
+    async def list_page(
+        self, limit: int, after: KeysetCursor | None = None
+    ) -> Page[MapStateDomain]:
+        items: Sequence[MapStateDomain] = await self.repo.list(limit + 1, after)
+        return Page.from_overfetch(items, limit)
+
+    async def list_by_user_page(
+        self, user_id: str, limit: int, after: KeysetCursor | None = None
+    ) -> Page[MapStateDomain]:
+        items: Sequence[MapStateDomain] = await self._list_by_user(user_id, limit + 1, after)
+        return Page.from_overfetch(items, limit)
+
+    async def _list_by_user(
+        self, user_id: str, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[MapStateDomain]:
+        return await self.flights.do(
+            ("list_by_user", user_id, limit, after),
+            lambda: self.repo.list_by_user(user_id, limit, after),
+            copy_models,
+        )
+
+    async def list_summaries_page(
+        self, user_id: str | None, limit: int, after: KeysetCursor | None = None
+    ) -> Page[MapStateSummary]:
+        items: Sequence[MapStateSummary] = await self.repo.list_summaries(user_id, limit + 1, after)
+        return Page.from_overfetch(items, limit)
+
+    async def list_within_page(
+        self, bbox: BoundingBox, user_id: str | None, limit: int, after: KeysetCursor | None = None
+    ) -> Page[MapStateSummary]:
+        items: Sequence[MapStateSummary] = await self.repo.list_within(bbox, user_id, limit + 1, after)
+        return Page.from_overfetch(items, limit)
 
     async def update(self, id: int, payload: MapStateUpdate) -> MapStateDomain | None:
-        return await self.repo.update(id, payload.name, payload.state)
+        try:
+            return await self.repo.update(id, payload.name, payload.state)
+        finally:
+            self._forget(id)
 
     async def delete(self, id: int) -> bool:
-        return await self.repo.delete(id)
+        try:
+            return await self.repo.delete(id)
+        finally:
+            self._forget(id)
+
+    async def update_owned(
+        self,
+        id: int,
+        payload: MapStateUpdate,
+        owner_id: str | None,
+        expected_version: int | None = None,
+    ) -> MapStateDomain | None:
+        try:
+            return await self.repo.update_owned(id, payload.name, payload.state, owner_id, expected_version)
+        finally:
+            self._forget(id)
+
+    async def delete_owned(self, id: int, owner_id: str | None) -> MapStateDomain | None:
+        try:
+            return await self.repo.delete_owned(id, owner_id)
+        finally:
+            self._forget(id)
+
+    async def exists(self, id: int) -> bool:
+        return await self.repo.exists(id)
+
+    def stream(
+        self, user_id: str | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[MapStateDomain]]:
+        return self.repo.stream(user_id, chunk_size)
+
+    async def patch(
+        self, id: int, patch: StatePatch, owner_id: str | None
+    ) -> MapStateVersionInfo | None:
+        try:
+            return await self.repo.patch(id, patch, owner_id)
+        finally:
+            self._forget(id)
+
+    def _forget(self, id: int) -> None:
+        # The owner is not always known here, so every user's listings start afresh.
+        self.flights.forget("get", id)
+        self.flights.forget("list_by_user")
+
+    async def get_metadata(self, id: int) -> MapStateMetadata | None:
+        return await self.repo.get_metadata(id)
+
+    async def list_versions(
+        self, id: int, limit: int, before: int | None = None
+    ) -> Sequence[MapStateHistoryEntry]:
+        return await self.repo.list_versions(id, limit, before)
+
+    async def get_version(self, id: int, version: int) -> MapStateDomain | None:
+        return await self.repo.get_version(id, version)
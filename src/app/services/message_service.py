@@ -1,24 +1,55 @@
-from typing import Sequence
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Sequence
 
 from app.domain.messages.interfaces import MessageRepository
 from app.schemas.messages import MessageCreate, MessageUpdate
-from app.domain.messages.models import MessageDomain
+from app.domain.messages.models import MessageDomain, MessageMetadata
+from app.domain.pagination import KeysetCursor, Page, RankCursor
+from app.services.batch_loader import BatchLoader
+from app.services.single_flight import SingleFlight, copy_models
 
 
 class MessageService:
     """Service layer for message operations."""
 
-    def __init__(self, repo: MessageRepository) -> None:
-        """Initialize with a message repository."""
+    def __init__(self, repo: MessageRepository, flights: SingleFlight | None = None) -> None:
+        """Initialize with a message repository and the group coalescing concurrent reads.
+
+        flights is shared across requests by the caller; a private group otherwise.
+        """
         self.repo: MessageRepository = repo
+        self.flights: SingleFlight = flights if flights is not None else SingleFlight()
+        # Services live for one request, and so does the batching of its get() calls.
+        self.batch: BatchLoader[int, MessageDomain] = BatchLoader(self._load_many)
 
     async def create(self, user_id: str, payload: MessageCreate) -> MessageDomain:
         """Create a new message."""
-        return await self.repo.create(user_id, payload.content)
+        try:
+            return await self.repo.create(user_id, payload.content)
+        finally:
+            self.flights.forget("list_by_user", user_id)
 
     async def get(self, id: int) -> MessageDomain | None:
-        """Get a message by ID."""
-        return await self.repo.get(id)
+        """Get a message by ID, sharing the query with identical concurrent calls.
+
+        Concurrent get() calls on this service are resolved with one query.
+        """
+        return await self.flights.do(("get", id), lambda: self.batch.load(id), copy_models)
+
+    async def get_many(self, ids: Sequence[int]) -> list[MessageDomain]:
+        """Get the messages with the given IDs in that order, skipping missing ones, with one query."""
+        found: list[MessageDomain | None] = await asyncio.gather(*(self.get(id) for id in ids))
+        return [message for message in found if message is not None]
+
+    async def _load_many(self, ids: list[int]) -> dict[int, MessageDomain]:
+        if len(ids) == 1:
+            # A lone ID keeps the primary-key lookup.
+            message: MessageDomain | None = await self.repo.get(ids[0])
+            return {message.id: message} if message is not None else {}
+        return {message.id: message for message in await self.repo.get_many(ids)}
 
     async def list(self) -> Sequence[MessageDomain]:
         """List all messages."""
@@ -26,12 +57,110 @@ async def list(self) -> Sequence[MessageDomain]:
 
     async def list_by_user(self, user_id: str) -> Sequence[MessageDomain]:
         """List all messages created by a specific user."""
-        return await self.repo.list_by_user(user_id)
+        return await self._list_by_user(user_id)
+
+    async def list_page(self, limit: int, after: KeysetCursor | None = None) -> Page[MessageDomain]:
+        """List one page of messages, newest first."""
+        items: Sequence[MessageDomain] = await self.repo.list(limit + 1, after)
+        return Page.from_overfetch(items, limit)
+
+    async def list_by_user_page(
+        self, user_id: str, limit: int, after: KeysetCursor | None = None
+    ) -> Page[MessageDomain]:
+        """List one page of a user's messages, newest first."""
+        items: Sequence[MessageDomain] = await self._list_by_user(user_id, limit + 1, after)
+        return Page.from_overfetch(items, limit)
+
+    async def _list_by_user(
+        self, user_id: str, limit: int | None = None, after: KeysetCursor | None = None
+    ) -> Sequence[MessageDomain]:
+        return await self.flights.do(
+            ("list_by_user", user_id, limit, after),
+            lambda: self.repo.list_by_user(user_id, limit, after),
+            copy_models,
+        )
 
     async def update(self, id: int, payload: MessageUpdate) -> MessageDomain | None:
         """Update a message by ID."""
-        return await self.repo.update(id, payload.content)
+        try:
+            return await self.repo.update(id, payload.content)
+        finally:
+            self._forget(id)
 
     async def delete(self, id: int) -> bool:
         """Delete a message by ID."""
-        return await self.repo.delete(id)
+        try:
+            return await self.repo.delete(id)
+        finally:
+            self._forget(id)
+
+    async def update_owned(
+        self,
+        id: int,
+        payload: MessageUpdate,
+        owner_id: str | None,
+        expected_updated_at: datetime | None = None,
+    ) -> MessageDomain | None:
+        """Update a message owned by owner_id in a single statement (None skips the owner check).
+
+        With expected_updated_at, the update only applies if the message is unchanged since then.
+        """
+        try:
+            return await self.repo.update_owned(id, payload.content, owner_id, expected_updated_at)
+        finally:
+            self._forget(id)
+
+    async def delete_owned(self, id: int, owner_id: str | None) -> MessageDomain | None:
+        """Delete a message owned by owner_id in a single statement (None skips the owner check)."""
+        try:
+            return await self.repo.delete_owned(id, owner_id)
+        finally:
+            self._forget(id)
+
+    def _forget(self, id: int) -> None:
+        # The owner is not always known here, so every user's listings start afresh.
+        self.flights.forget("get", id)
+        self.flights.forget("list_by_user")
+
+    async def exists(self, id: int) -> bool:
+        """Check whether a message exists."""
+        return await self.repo.exists(id)
+
+    async def get_metadata(self, id: int) -> MessageMetadata | None:
+        """Get a message's owner and modification time without loading its content."""
+        return await self.repo.get_metadata(id)
+
+    def stream(
+        self, user_id: str | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[MessageDomain]]:
+        """Stream messages in fixed-size chunks, optionally for a single user."""
+        return self.repo.stream(user_id, chunk_size)
+
+    async def bulk_create(self, user_id: str, payloads: Sequence[MessageCreate]) -> list[int]:
+        """Create many messages in one transaction and return their IDs."""
+        try:
+            return await self.repo.bulk_create(user_id, (p.content for p in payloads))
+        finally:
+            self.flights.forget("list_by_user", user_id)
+
+    async def bulk_create_stream(self, user_id: str, payloads: AsyncIterable[MessageCreate]) -> list[int]:
+        """Create messages from an async stream of payloads in one transaction."""
+        async def contents() -> AsyncIterator[str]:
+            async for payload in payloads:
+                yield payload.content
+
+        try:
+            return await self.repo.bulk_create(user_id, contents())
+        finally:
+            self.flights.forget("list_by_user", user_id)
+
+    async def search_page(
+        self, query: str, user_id: str | None, limit: int, after: RankCursor | None = None
+    ) -> Page[MessageDomain]:
+        """Fetch one page of full-text search results, best matches first."""
+        hits: Sequence[tuple[MessageDomain, float]] = await self.repo.search(query, user_id, limit + 1, after)
+        page: Page[MessageDomain] = Page(items=[message for message, _ in hits[:limit]])
+        if len(hits) > limit:
+            last, rank = hits[limit - 1]
+            page.next_cursor = RankCursor(rank=rank, id=last.id)
+        return page
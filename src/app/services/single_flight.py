@@ -0,0 +1,108 @@
+import asyncio
+from copy import copy
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightMetrics:
+    """Running counters for a single-flight group."""
+    executed: int = 0
+    coalesced: int = 0
+
+    @property
+    def coalesced_rate(self) -> float:
+        """Fraction of calls that joined a call already in flight."""
+        calls: int = self.executed + self.coalesced
+        return self.coalesced / calls if calls else 0.0
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one execution.
+
+    The first caller for a key runs the call; callers arriving while it is in flight
+    await its outcome instead of repeating the work. Nothing is kept once the call
+    completes, so this never serves a result older than the call it joined. Writers
+    should forget() the keys they affect, so that callers arriving after a write start
+    a fresh call rather than joining one that may have read before it.
+
+    Results are shared, so callers that may mutate them should pass copy; every
+    caller but the one that ran the call then gets its own copy.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: SingleFlightMetrics = SingleFlightMetrics()
+        self._calls: dict[tuple[Hashable, ...], asyncio.Future[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: tuple[Hashable, ...],
+        call: Callable[[], Awaitable[T]],
+        copy: Callable[[T], T] | None = None,
+    ) -> T:
+        """Run call, or join the identical call already in flight under key."""
+        in_flight: asyncio.Future[T] | None = self._calls.get(key)
+        if in_flight is not None:
+            self.metrics.coalesced += 1
+            try:
+                # Shielded: a follower giving up must not cancel the call for the others.
+                result: T = await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The caller running it was cancelled, not us: run it ourselves.
+                return await self.do(key, call, copy)
+            return copy(result) if copy is not None else result
+
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.metrics.executed += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark the exception retrieved; it is raised to every follower anyway.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def forget(self, *prefix: Hashable) -> None:
+        """Let later callers of keys starting with prefix start a new call.
+
+        Callers already waiting still get the outcome of the call they joined.
+        """
+        for key in [key for key in self._calls if key[: len(prefix)] == prefix]:
+            del self._calls[key]
+
+
+def copy_models(result: Any) -> Any:
+    """Shallow copies of a domain object, or of each one in a sequence; for SingleFlight.do(copy=...)."""
+    if result is None:
+        return None
+    if isinstance(result, (list, tuple)):
+        return [copy_models(item) for item in result]
+    return copy(result)
+
+
+def single_flight_status(group: SingleFlight) -> dict[str, Any]:
+    """Summarize a single-flight group's counters for diagnostics."""
+    metrics: SingleFlightMetrics = group.metrics
+    return {
+        "in_flight": len(group),
+        "executed": metrics.executed,
+        "coalesced": metrics.coalesced,
+        "coalesced_rate": round(metrics.coalesced_rate, 4),
+    }
@@ -1,23 +1,27 @@
 from __future__ import annotations
 
+import json
+import math
 from typing import Any
 
 import pytest
 from fastapi import FastAPI
 from httpx import AsyncClient, ASGITransport, Response
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from starlette import status
 
+from app.api.envelope import ENVELOPE_MEDIA_TYPE
 from app.api.routes.map_states import router as map_states_router, get_map_state_service
 from app.auth.oidc_user import OIDCUser, map_oidc_user
+from app.db.session import get_session_factory
 from app.services.map_state_service import MapStateService
 from app.infrastructure.map_states.dao import MapStateDAO
 from app.infrastructure.map_states.repository import SqlAlchemyMapStateRepository
-from app.schemas.map_states import MapStateCreate, MapStateRead
+from app.schemas.map_states import MapStateCreate, MapStateRead, MapStateSummaryListItem
 
 
 @pytest.fixture
-def test_app(db_session: AsyncSession, test_user: OIDCUser) -> FastAPI:
+def test_app(db_session: AsyncSession, test_engine: AsyncEngine, test_user: OIDCUser) -> FastAPI:
     app = FastAPI()
 
     async def override_service() -> MapStateService:
@@ -26,6 +30,7 @@ async def override_service() -> MapStateService:
         return MapStateService(repo)
 
     app.dependency_overrides[get_map_state_service] = override_service
+    app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(test_engine, expire_on_commit=False)
     app.dependency_overrides[map_oidc_user] = lambda: test_user
     app.include_router(map_states_router)
     return app
@@ -65,7 +70,7 @@ async def test_update(self, test_app: FastAPI) -> None:
             )
             map_state_id = resp.json()["id"]
             update_resp: Response = await client.put(
-                f"/api/map-states/{map_state_id}", json={"name": "B", "state": "{1}"}
+                f"/api/map-states/{map_state_id}", json={"name": "B", "state": "{\"v\": 1}"}
             )
             assert update_resp.status_code == status.HTTP_200_OK
             assert update_resp.json()["name"] == "B"
@@ -96,3 +101,269 @@ async def test_delete(self, test_app: FastAPI) -> None:
             assert isinstance(MapStateRead.model_validate(deleted), MapStateRead)
             fetch = await client.get(f"/api/map-states/{map_state_id}")
             assert fetch.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_update_and_delete_forbidden_for_non_owner(self, test_app: FastAPI) -> None:
+        async with AsyncClient(
+            transport=ASGITransport(app=test_app), base_url="http://test"
+        ) as client:
+            resp = await client.post("/api/map-states/", json={"name": "A", "state": "{}"})
+            map_state_id = resp.json()["id"]
+
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(
+                sub="someone-else", roles=["user"]
+            )
+            update_resp: Response = await client.put(
+                f"/api/map-states/{map_state_id}", json={"name": "B", "state": "{}"}
+            )
+            assert update_resp.status_code == status.HTTP_403_FORBIDDEN
+            delete_resp: Response = await client.delete(f"/api/map-states/{map_state_id}")
+            assert delete_resp.status_code == status.HTTP_403_FORBIDDEN
+            missing_resp: Response = await client.delete("/api/map-states/999999")
+            assert missing_resp.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_export(self, test_app: FastAPI) -> None:
+        async with AsyncClient(
+            transport=ASGITransport(app=test_app), base_url="http://test"
+        ) as client:
+            await client.post("/api/map-states/", json={"name": "E", "state": "{}"})
+            resp: Response = await client.get("/api/map-states/export")
+            assert resp.status_code == status.HTTP_200_OK
+            rows = [json.loads(line) for line in resp.text.splitlines()]
+            assert rows[0]["name"] == "E"
+            assert rows[0]["state"] == "{}"
+
+    async def test_get_partial_state(self, test_app: FastAPI) -> None:
+        state = {"layers": [{"id": "roads"}], "viewport": {"zoom": 4, "center": [1, 2]}, "extra": "x" * 1000}
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            created = await client.post("/api/map-states/", json={"name": "P", "state": json.dumps(state)})
+            map_state_id: int = created.json()["id"]
+
+            subtree = await client.get(f"/api/map-states/{map_state_id}", params={"path": "viewport.center"})
+            assert subtree.status_code == status.HTTP_200_OK
+            assert json.loads(subtree.json()["state"]) == [1, 2]
+
+            pruned = await client.get(f"/api/map-states/{map_state_id}", params={"fields": "layers,viewport.zoom"})
+            assert json.loads(pruned.json()["state"]) == {"layers": [{"id": "roads"}], "viewport": {"zoom": 4}}
+            assert pruned.json()["name"] == "P"
+
+            bad_path = await client.get(f"/api/map-states/{map_state_id}", params={"path": "a..b"})
+            assert bad_path.status_code == status.HTTP_400_BAD_REQUEST
+            both = await client.get(f"/api/map-states/{map_state_id}", params={"path": "a", "fields": "b"})
+            assert both.status_code == status.HTTP_400_BAD_REQUEST
+            missing = await client.get("/api/map-states/999999", params={"fields": "layers"})
+            assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_state_must_be_json(self, test_app: FastAPI) -> None:
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            resp = await client.post("/api/map-states/", json={"name": "Bad", "state": "{not json"})
+            assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    async def test_patch_map_state(self, test_app: FastAPI) -> None:
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            created = await client.post(
+                "/api/map-states/", json={"name": "P", "state": json.dumps({"viewport": {"zoom": 1}})}
+            )
+            map_state_id: int = created.json()["id"]
+            url = f"/api/map-states/{map_state_id}"
+
+            patched = await client.patch(
+                url,
+                content=json.dumps([{"op": "replace", "path": "/viewport/zoom", "value": 5}]),
+                headers={"Content-Type": "application/json-patch+json"},
+            )
+            assert patched.status_code == status.HTTP_200_OK
+            assert patched.json()["version"] == 2
+            assert set(patched.json()) == {"id", "version", "updated_at"}
+
+            merged = await client.patch(
+                url, content='{"title": "Roads"}', headers={"Content-Type": "application/merge-patch+json"}
+            )
+            assert merged.json()["version"] == 3
+
+            fetched = await client.get(url)
+            assert json.loads(fetched.json()["state"]) == {"viewport": {"zoom": 5}, "title": "Roads"}
+            assert fetched.json()["version"] == 3
+
+            conflict = await client.patch(
+                url,
+                content=json.dumps([{"op": "remove", "path": "/nope"}]),
+                headers={"Content-Type": "application/json-patch+json"},
+            )
+            assert conflict.status_code == status.HTTP_409_CONFLICT
+
+            malformed = await client.patch(
+                url, content='{"op": "add"}', headers={"Content-Type": "application/json-patch+json"}
+            )
+            assert malformed.status_code == status.HTTP_400_BAD_REQUEST
+
+            unsupported = await client.patch(url, json=[])
+            assert unsupported.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+            missing = await client.patch(
+                "/api/map-states/999999", content="{}", headers={"Content-Type": "application/merge-patch+json"}
+            )
+            assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_version_history(self, test_app: FastAPI) -> None:
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            created = await client.post("/api/map-states/", json={"name": "H", "state": '{"zoom": 1}'})
+            map_state_id: int = created.json()["id"]
+            url = f"/api/map-states/{map_state_id}"
+            await client.put(url, json={"name": "H2", "state": '{"zoom": 2}'})
+            await client.patch(url, content='{"title": "t"}', headers={"Content-Type": "application/merge-patch+json"})
+
+            versions = await client.get(f"{url}/versions")
+            assert versions.status_code == status.HTTP_200_OK
+            assert [(v["version"], v["name"], v["snapshot"]) for v in versions.json()] == [
+                (3, "H2", False),
+                (2, "H2", False),
+                (1, "H", True),
+            ]
+
+            first = await client.get(f"{url}/versions/1")
+            assert first.status_code == status.HTTP_200_OK
+            assert first.json()["name"] == "H"
+            assert json.loads(first.json()["state"]) == {"zoom": 1}
+            second = await client.get(f"{url}/versions/2")
+            assert json.loads(second.json()["state"]) == {"zoom": 2}
+            assert (await client.get(f"{url}/versions/9")).status_code == status.HTTP_404_NOT_FOUND
+            assert (await client.get("/api/map-states/999999/versions")).status_code == status.HTTP_404_NOT_FOUND
+
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="someone-else", roles=["user"])
+            assert (await client.get(f"{url}/versions")).status_code == status.HTTP_403_FORBIDDEN
+            assert (await client.get(f"{url}/versions/1")).status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_list_views(self, test_app: FastAPI) -> None:
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            await client.post("/api/map-states/", json={"name": "S", "state": '{"layers": [1, 2, 3]}'})
+
+            summary = await client.get("/api/map-states/me")
+            assert summary.status_code == status.HTTP_200_OK
+            (item,) = summary.json()
+            assert "state" not in item
+            assert item["name"] == "S"
+            assert item["size_bytes"] == len('{"layers": [1, 2, 3]}')
+            assert len(item["content_hash"]) == 64
+
+            full = await client.get("/api/map-states/me", params={"view": "full"})
+            assert full.json()[0]["state"] == '{"layers": [1, 2, 3]}'
+            by_user = await client.get("/api/map-states/by/test-user-id", params={"view": "summary"})
+            assert by_user.json()[0]["content_hash"] == item["content_hash"]
+            bad = await client.get("/api/map-states/", params={"view": "everything"})
+            assert bad.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    async def test_conditional_get_and_if_match(self, test_app: FastAPI) -> None:
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            created = await client.post("/api/map-states/", json={"name": "C", "state": '{"zoom": 1}'})
+            map_state_id: int = created.json()["id"]
+            url = f"/api/map-states/{map_state_id}"
+
+            first = await client.get(url)
+            etag: str = first.headers["ETag"]
+            assert etag == f'"{map_state_id}-1"'
+            unchanged = await client.get(url, headers={"If-None-Match": f"W/{etag}, \"other\""})
+            assert unchanged.status_code == status.HTTP_304_NOT_MODIFIED
+            assert unchanged.content == b""
+            since = await client.get(url, headers={"If-Modified-Since": first.headers["Last-Modified"]})
+            assert since.status_code == status.HTTP_304_NOT_MODIFIED
+
+            # Partial representations are distinct variants of the same version.
+            partial = await client.get(url, params={"path": "zoom"})
+            assert partial.headers["ETag"] != etag
+            assert (await client.get(url, params={"path": "zoom"}, headers={"If-None-Match": etag})).status_code == (
+                status.HTTP_200_OK
+            )
+
+            updated = await client.put(url, json={"name": "C", "state": '{"zoom": 2}'}, headers={"If-Match": etag})
+            assert updated.status_code == status.HTTP_200_OK
+            assert updated.headers["ETag"] == f'"{map_state_id}-2"'
+            stale = await client.put(url, json={"name": "C", "state": '{"zoom": 3}'}, headers={"If-Match": etag})
+            assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+            assert json.loads((await client.get(url)).json()["state"]) == {"zoom": 2}
+            changed = await client.get(url, headers={"If-None-Match": etag})
+            assert changed.status_code == status.HTTP_200_OK
+            assert (await client.get("/api/map-states/999999", headers={"If-None-Match": etag})).status_code == (
+                status.HTTP_404_NOT_FOUND
+            )
+
+    async def test_list_within_viewport(self, test_app: FastAPI) -> None:
+        polygon = {"type": "Polygon", "coordinates": [[[10, 10], [12, 10], [12, 12], [10, 10]]]}
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            await client.post("/api/map-states/", json={"name": "Area", "state": json.dumps({"shape": polygon})})
+            await client.post("/api/map-states/", json={"name": "Plain", "state": "{}"})
+
+            hit = await client.get("/api/map-states/within", params={"bbox": "11,11,20,20"})
+            assert hit.status_code == status.HTTP_200_OK
+            assert [item["name"] for item in hit.json()] == ["Area"]
+            assert "state" not in hit.json()[0]
+            miss = await client.get("/api/map-states/within", params={"bbox": "-5,-5,0,0"})
+            assert miss.json() == []
+
+            for bad in ("1,2,3", "5,0,1,1", "a,b,c,d", "nan,0,1,1"):
+                resp = await client.get("/api/map-states/within", params={"bbox": bad})
+                assert resp.status_code == status.HTTP_400_BAD_REQUEST
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="someone-else", roles=["user"])
+            assert (await client.get("/api/map-states/within", params={"bbox": "11,11,20,20"})).json() == []
+            other = await client.get("/api/map-states/within", params={"bbox": "0,0,1,1", "user_id": "test-user-id"})
+            assert other.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_level_of_detail(self, test_app: FastAPI) -> None:
+        ring = [[10 + 0.5 * math.cos(i / 50 * math.pi), 10 + 0.5 * math.sin(i / 50 * math.pi)] for i in range(100)]
+        polygon = {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+        state = json.dumps({"area": polygon, "marker": {"type": "Point", "coordinates": [1, 2]}})
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            created = await client.post("/api/map-states/", json={"name": "LOD", "state": state})
+            url = f"/api/map-states/{created.json()['id']}"
+
+            coarse = await client.get(url, params={"zoom": 3})
+            assert coarse.status_code == status.HTTP_200_OK
+            document = json.loads(coarse.json()["state"])
+            simplified_ring = document["area"]["coordinates"][0]
+            assert 4 <= len(simplified_ring) < 101
+            assert simplified_ring[0] == simplified_ring[-1]
+            assert document["marker"] == {"type": "Point", "coordinates": [1, 2]}
+            fine = await client.get(url, params={"zoom": 20})
+            assert len(json.loads(fine.json()["state"])["area"]["coordinates"][0]) == 101
+
+            assert coarse.headers["ETag"] != (await client.get(url)).headers["ETag"]
+            revalidated = await client.get(url, params={"zoom": 3}, headers={"If-None-Match": coarse.headers["ETag"]})
+            assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+            by_tolerance = await client.get(url, params={"tolerance": 0.2})
+            assert by_tolerance.status_code == status.HTTP_200_OK
+            both = await client.get(url, params={"zoom": 3, "tolerance": 0.1})
+            assert both.status_code == status.HTTP_400_BAD_REQUEST
+            assert (await client.get(url, params={"zoom": 99})).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    async def test_batch_fetch_by_ids(self, test_app: FastAPI, query_log: list[str]) -> None:
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            first = (await client.post("/api/map-states/", json={"name": "First", "state": "{}"})).json()["id"]
+            second = (await client.post("/api/map-states/", json={"name": "Second", "state": '{"a": 1}'})).json()["id"]
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="someone-else", roles=["user"])
+            theirs = (await client.post("/api/map-states/", json={"name": "Theirs", "state": "{}"})).json()["id"]
+
+            query_log.clear()
+            own = await client.get("/api/map-states/", params={"ids": f"{second},{theirs},{first}"})
+            assert own.status_code == status.HTTP_200_OK
+            assert [ms["name"] for ms in own.json()] == ["Theirs"]
+            assert sum("FROM map_states" in statement for statement in query_log) == 1
+
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="admin", roles=["admin"])
+            everything = await client.get("/api/map-states/", params={"ids": f"{second},{theirs},{first}"})
+            assert [ms["name"] for ms in everything.json()] == ["Second", "Theirs", "First"]
+            assert everything.json()[0]["state"] == '{"a": 1}'
+            assert (await client.get("/api/map-states/", params={"ids": "x"})).status_code == 400
+
+    async def test_envelope_listings(self, test_app: FastAPI, test_user: OIDCUser) -> None:
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            for name in ("One", "Two"):
+                await client.post("/api/map-states/", json={"name": name, "state": "{}"})
+            accept: dict[str, str] = {"Accept": f"application/json;q=0.5, {ENVELOPE_MEDIA_TYPE}"}
+
+            summaries: dict[str, Any] = (await client.get("/api/map-states/me", headers=accept)).json()
+            assert summaries["users"][test_user.sub]["sub"] == test_user.sub
+            assert [set(item) for item in summaries["items"]] == [set(MapStateSummaryListItem.model_fields)] * 2
+
+            full = await client.get("/api/map-states/me", params={"view": "full"}, headers=accept)
+            assert full.headers["content-type"] == ENVELOPE_MEDIA_TYPE
+            assert [item["state"] for item in full.json()["items"]] == ["{}", "{}"]
+            assert "user" not in full.json()["items"][0]
@@ -1,22 +1,28 @@
 from __future__ import annotations
 
+import json
 from typing import Any
 
 import pytest
 from fastapi import FastAPI
 from httpx import AsyncClient, ASGITransport, Response
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from starlette import status
 
+from app.api.envelope import ENVELOPE_MEDIA_TYPE
+from app.api.ingest import MAX_NDJSON_LINE_BYTES
 from app.api.routes.messages import router as messages_router, get_message_service
 from app.auth.oidc_user import OIDCUser, map_oidc_user
+from app.auth.users import UserResolver, get_user_resolver
+from app.db.session import get_session_factory
 from app.services.message_service import MessageService
 from app.infrastructure.messages.dao import MessageDAO
 from app.infrastructure.messages.repository import SqlAlchemyMessageRepository
-from app.schemas.messages import MessageCreate, MessageRead
+from app.schemas.messages import MessageCreate, MessageListItem, MessageRead
 
 @pytest.fixture
-def test_app(db_session: AsyncSession, test_user: OIDCUser) -> FastAPI:
+def test_app(db_session: AsyncSession, test_engine: AsyncEngine, test_user: OIDCUser) -> FastAPI:
     """Create a test FastAPI app with message service and router."""
     app = FastAPI()
 
@@ -26,6 +32,7 @@ async def override_service() -> MessageService:
         return MessageService(repo)
 
     app.dependency_overrides[get_message_service] = override_service
+    app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(test_engine, expire_on_commit=False)
     app.dependency_overrides[map_oidc_user] = lambda: test_user
     app.include_router(messages_router)
     return app
@@ -99,3 +106,244 @@ async def test_delete_message(self, test_app: FastAPI) -> None:
             # Confirm it's gone
             fetch_resp: Response = await client.get(f"/api/messages/{message_id}")
             assert fetch_resp.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_update_and_delete_forbidden_for_non_owner(self, test_app: FastAPI) -> None:
+        """Should return 403 for another user's message and 404 for a missing one."""
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            create_resp: Response = await client.post("/api/messages/", json={"content": "mine"})
+            message_id: int = create_resp.json()["id"]
+
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="someone-else", roles=["user"])
+
+            update_resp: Response = await client.put(f"/api/messages/{message_id}", json={"content": "theirs"})
+            assert update_resp.status_code == status.HTTP_403_FORBIDDEN
+
+            delete_resp: Response = await client.delete(f"/api/messages/{message_id}")
+            assert delete_resp.status_code == status.HTTP_403_FORBIDDEN
+
+            missing_resp: Response = await client.put("/api/messages/999999", json={"content": "x"})
+            assert missing_resp.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_list_my_messages_paginates_with_cursor(self, test_app: FastAPI) -> None:
+        """Should return pages of messages and a cursor header until exhausted."""
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            for i in range(3):
+                await client.post("/api/messages/", json={"content": f"page {i}"})
+
+            first: Response = await client.get("/api/messages/me", params={"limit": 2})
+            assert first.status_code == status.HTTP_200_OK
+            assert [m["content"] for m in first.json()] == ["page 2", "page 1"]
+            cursor: str | None = first.headers.get("X-Next-Cursor")
+            assert cursor
+
+            second: Response = await client.get("/api/messages/me", params={"limit": 2, "cursor": cursor})
+            assert [m["content"] for m in second.json()] == ["page 0"]
+            assert "X-Next-Cursor" not in second.headers
+
+            bad: Response = await client.get("/api/messages/me", params={"cursor": "not-a-cursor"})
+            assert bad.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_export_messages_ndjson_and_csv(self, test_app: FastAPI) -> None:
+        """Should stream every message as NDJSON lines or CSV rows."""
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            for i in range(3):
+                await client.post("/api/messages/", json={"content": f"export {i}"})
+
+            ndjson_resp: Response = await client.get("/api/messages/export")
+            assert ndjson_resp.status_code == status.HTTP_200_OK
+            assert ndjson_resp.headers["content-type"].startswith("application/x-ndjson")
+            rows: list[dict[str, Any]] = [json.loads(line) for line in ndjson_resp.text.splitlines()]
+            assert [r["content"] for r in rows] == ["export 0", "export 1", "export 2"]
+
+            csv_resp: Response = await client.get("/api/messages/export", params={"format": "csv"})
+            lines: list[str] = csv_resp.text.splitlines()
+            assert lines[0] == "id,user_id,content,created_at,updated_at"
+            assert len(lines) == 4
+
+    async def test_export_returns_its_connection(self, test_app: FastAPI, test_engine: AsyncEngine) -> None:
+        """The export reads through a session of its own, closed once the body has been sent."""
+        pool_events: list[str] = []
+
+        def checkout(*args: Any) -> None:
+            pool_events.append("checkout")
+
+        def checkin(*args: Any) -> None:
+            pool_events.append("checkin")
+
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            await client.post("/api/messages/", json={"content": "exported"})
+            event.listen(test_engine.sync_engine, "checkout", checkout)
+            event.listen(test_engine.sync_engine, "checkin", checkin)
+            try:
+                resp: Response = await client.get("/api/messages/export")
+            finally:
+                event.remove(test_engine.sync_engine, "checkout", checkout)
+                event.remove(test_engine.sync_engine, "checkin", checkin)
+
+        assert [json.loads(line)["content"] for line in resp.text.splitlines()] == ["exported"]
+        assert pool_events
+        assert pool_events.count("checkout") == pool_events.count("checkin")
+
+    async def test_bulk_create_json_and_ndjson(self, test_app: FastAPI) -> None:
+        """Should ingest a JSON list or an NDJSON body and return the created IDs."""
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            json_resp: Response = await client.post(
+                "/api/messages/bulk", json=[{"content": f"json {i}"} for i in range(3)]
+            )
+            assert json_resp.status_code == status.HTTP_201_CREATED
+            assert json_resp.json()["count"] == 3
+
+            body: str = "\n".join(json.dumps({"content": f"line {i}"}) for i in range(4)) + "\n"
+            ndjson_resp: Response = await client.post(
+                "/api/messages/bulk/ndjson", content=body, headers={"Content-Type": "application/x-ndjson"}
+            )
+            assert ndjson_resp.status_code == status.HTTP_201_CREATED
+            assert len(ndjson_resp.json()["ids"]) == 4
+
+            bad_resp: Response = await client.post(
+                "/api/messages/bulk/ndjson", content='{"content": "ok"}\n{"nope": 1}\n'
+            )
+            assert bad_resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+            mine: Response = await client.get("/api/messages/me", params={"limit": 100})
+            assert len(mine.json()) == 7
+
+    async def test_bulk_ndjson_limits(self, test_app: FastAPI, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Too many records, or an overlong line, abort the NDJSON upload with a 413 and create nothing."""
+        monkeypatch.setattr("app.api.routes.messages.MAX_BULK_MESSAGES", 3)
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            too_many: str = "".join(json.dumps({"content": f"line {i}"}) + "\n" for i in range(4))
+            assert (await client.post("/api/messages/bulk/ndjson", content=too_many)).status_code == 413
+
+            too_long: str = json.dumps({"content": "x" * MAX_NDJSON_LINE_BYTES})
+            for body in (too_long + "\n", too_long):
+                assert (await client.post("/api/messages/bulk/ndjson", content=body)).status_code == 413
+
+            assert (await client.get("/api/messages/me")).json() == []
+
+    async def test_search_messages(self, test_app: FastAPI) -> None:
+        """Should return ranked matches for the current user and page through them with a cursor."""
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            for content in ("harbour lights", "harbour harbour", "city lights"):
+                await client.post("/api/messages/", json={"content": content})
+
+            first: Response = await client.get("/api/messages/search", params={"q": "harbour", "limit": 1})
+            assert first.status_code == status.HTTP_200_OK
+            assert [m["content"] for m in first.json()] == ["harbour harbour"]
+
+            cursor: str = first.headers["X-Next-Cursor"]
+            second: Response = await client.get(
+                "/api/messages/search", params={"q": "harbour", "limit": 1, "cursor": cursor}
+            )
+            assert [m["content"] for m in second.json()] == ["harbour lights"]
+            assert "X-Next-Cursor" not in second.headers
+
+            bad: Response = await client.get("/api/messages/search", params={"q": "harbour", "cursor": "!!"})
+            assert bad.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_search_other_users_messages_requires_admin(self, test_app: FastAPI) -> None:
+        """Should forbid non-admins from searching another user's messages."""
+        test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="someone-else", roles=["user"])
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            resp: Response = await client.get("/api/messages/search", params={"q": "x", "user_id": "test-user-id"})
+            assert resp.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_conditional_get_and_if_match(self, test_app: FastAPI) -> None:
+        """Should answer revalidations with 304 and reject updates against a stale ETag."""
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            created: Response = await client.post("/api/messages/", json={"content": "cached"})
+            url: str = f"/api/messages/{created.json()['id']}"
+
+            first: Response = await client.get(url)
+            etag: str = first.headers["ETag"]
+            assert etag.startswith('"') and "Last-Modified" in first.headers
+
+            unchanged: Response = await client.get(url, headers={"If-None-Match": etag})
+            assert unchanged.status_code == status.HTTP_304_NOT_MODIFIED
+            assert unchanged.content == b""
+            assert unchanged.headers["ETag"] == etag
+            since: Response = await client.get(url, headers={"If-Modified-Since": first.headers["Last-Modified"]})
+            assert since.status_code == status.HTTP_304_NOT_MODIFIED
+            other: Response = await client.get(url, headers={"If-None-Match": '"0-0"'})
+            assert other.status_code == status.HTTP_200_OK
+
+            stale: Response = await client.put(url, json={"content": "lost"}, headers={"If-Match": '"0-0"'})
+            assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+            updated: Response = await client.put(url, json={"content": "kept"}, headers={"If-Match": etag})
+            assert updated.status_code == status.HTTP_200_OK
+            assert updated.json()["content"] == "kept"
+            assert "ETag" in updated.headers
+
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="someone-else", roles=["user"])
+            denied: Response = await client.get(url, headers={"If-None-Match": etag})
+            assert denied.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_batch_fetch_by_ids(self, test_app: FastAPI, query_log: list[str]) -> None:
+        """?ids= fetches many messages with one query, keeping order and checking ownership per message."""
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            mine: list[int] = [
+                (await client.post("/api/messages/", json={"content": f"mine {i}"})).json()["id"] for i in range(3)
+            ]
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="someone-else", roles=["user"])
+            theirs: int = (await client.post("/api/messages/", json={"content": "theirs"})).json()["id"]
+            ids: str = ",".join(str(i) for i in [mine[2], 999999, mine[0], theirs, mine[2]])
+
+            query_log.clear()
+            own = await client.get("/api/messages/", params={"ids": ids})
+            assert own.status_code == status.HTTP_200_OK
+            assert [m["content"] for m in own.json()] == ["theirs"]
+            assert sum("FROM messages" in statement for statement in query_log) == 1
+
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="admin", roles=["admin"])
+            everything = await client.get("/api/messages/", params={"ids": ids})
+            assert [m["content"] for m in everything.json()] == ["mine 2", "mine 0", "theirs"]
+
+            for bad in ("1,x", ",", ",".join(str(i) for i in range(501))):
+                resp = await client.get("/api/messages/", params={"ids": bad})
+                assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_list_responses_are_serialized_once(self, test_app: FastAPI) -> None:
+        """Lists bypass response_model revalidation but keep it as their documented schema."""
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            await client.post("/api/messages/", json={"content": "listed"})
+            resp = await client.get("/api/messages/me")
+            assert resp.headers["content-type"] == "application/json"
+            assert [MessageRead.model_validate(m).content for m in resp.json()] == ["listed"]
+            assert set(resp.json()[0]) == set(MessageRead.model_fields)
+
+        schema = test_app.openapi()["paths"]["/api/messages/me"]["get"]["responses"]["200"]["content"]
+        assert schema["application/json"]["schema"]["items"]["$ref"].endswith("/MessageRead")
+
+    async def test_envelope_lists_each_user_once(self, test_app: FastAPI, test_user: OIDCUser) -> None:
+        """Accepting the envelope media type moves the user out of the items; admins get owners batch-resolved."""
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+            for i in range(3):
+                await client.post("/api/messages/", json={"content": f"mine {i}"})
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="someone-else", roles=["user"])
+            await client.post("/api/messages/", json={"content": "theirs"})
+
+            test_app.dependency_overrides[map_oidc_user] = lambda: test_user
+            resp = await client.get("/api/messages/me", headers={"Accept": ENVELOPE_MEDIA_TYPE})
+            assert resp.headers["content-type"] == ENVELOPE_MEDIA_TYPE
+            assert resp.headers["vary"] == "Accept"
+            body: dict[str, Any] = resp.json()
+            assert list(body["users"]) == [test_user.sub]
+            assert [set(item) for item in body["items"]] == [set(MessageListItem.model_fields)] * 3
+
+            resolved: list[set[str]] = []
+
+            class Directory(UserResolver):
+                async def resolve(self, user_ids: Any) -> dict[str, OIDCUser]:
+                    resolved.append(set(user_ids))
+                    return {user_id: OIDCUser(sub=user_id) for user_id in user_ids}
+
+            test_app.dependency_overrides[map_oidc_user] = lambda: OIDCUser(sub="admin", roles=["admin"])
+            test_app.dependency_overrides[get_user_resolver] = Directory
+            everything = (await client.get("/api/messages/", headers={"Accept": ENVELOPE_MEDIA_TYPE})).json()
+            assert resolved == [{test_user.sub, "someone-else"}]
+            assert set(everything["users"]) == {test_user.sub, "someone-else"}
+            assert len(everything["items"]) == 4
+
+            plain = await client.get("/api/messages/")
+            assert plain.headers["content-type"] == "application/json"
+            assert [m["user"]["sub"] for m in plain.json()] == ["admin"] * 4
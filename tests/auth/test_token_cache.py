@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import base64
+import json
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from starlette.requests import HTTPConnection, Request
+
+from app.auth.oidc_user import OIDCUser, get_user, map_oidc_user
+from app.auth.token_cache import Authentication, CachingKeycloakBackend, token_expiry
+from app.infrastructure.cache import LRUCache, cache_status
+
+
+def make_token(**claims: Any) -> str:
+    """An unsigned JWT carrying claims; the fake backend never checks signatures."""
+    def part(value: dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+
+    return f"{part({'alg': 'RS256'})}.{part(claims)}.signature"
+
+
+def bearer(token: str) -> HTTPConnection:
+    return HTTPConnection({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+class FakeBackend:
+    """Stands in for KeycloakBackend, counting the verifications it performs."""
+
+    def __init__(self: FakeBackend, introspect: bool = False) -> None:
+        self.keycloak_configuration = SimpleNamespace(
+            enable_websocket_support=True,
+            websocket_cookie_name="access_token",
+            use_introspection_endpoint=introspect,
+        )
+        self.verified: list[str] = []
+
+    async def authenticate(self: FakeBackend, conn: HTTPConnection) -> Authentication:
+        self.verified.append(conn.headers["authorization"])
+        return None, OIDCUser(sub="user-1", roles=["user"])
+
+
+@pytest.mark.anyio
+@pytest.mark.unit
+@pytest.mark.auth
+class TestTokenCache:
+    """Unit tests for reusing verified tokens."""
+
+    async def test_repeated_tokens_are_verified_once(self: TestTokenCache) -> None:
+        """The same token is verified once and yields the same user; another token is verified anew."""
+        now: list[float] = [1_000.0]
+        inner = FakeBackend()
+        cache: LRUCache[bytes, Authentication] = LRUCache(100, 300, clock=lambda: now[0])
+        backend = CachingKeycloakBackend(inner, cache, clock=lambda: now[0])  # type: ignore[arg-type]
+        token: str = make_token(sub="user-1", exp=1_010)
+
+        first = await backend.authenticate(bearer(token))
+        for _ in range(3):
+            assert await backend.authenticate(bearer(token)) is first
+        await backend.authenticate(bearer(make_token(sub="user-1", exp=1_010, jti="other")))
+        assert len(inner.verified) == 2
+        assert cache_status(cache)["hits"] == 3
+
+        now[0] = 1_011.0  # past exp
+        await backend.authenticate(bearer(token))
+        assert len(inner.verified) == 3
+
+    async def test_unbounded_or_introspected_tokens_are_not_cached(self: TestTokenCache) -> None:
+        """Tokens without exp, and every token under introspection, are verified on each call."""
+        for inner, token in ((FakeBackend(), make_token(sub="x")), (FakeBackend(True), make_token(exp=2**40))):
+            backend = CachingKeycloakBackend(inner, LRUCache(100, 300))  # type: ignore[arg-type]
+            for _ in range(2):
+                await backend.authenticate(bearer(token))
+            assert len(inner.verified) == 2
+        assert token_expiry("not-a-jwt") is None
+
+    async def test_dependency_reuses_the_middleware_user(self: TestTokenCache) -> None:
+        """map_oidc_user returns the user the middleware stored instead of validating claims again."""
+        user = OIDCUser(sub="user-1")
+        request = Request({"type": "http", "headers": [], "user": user})
+        assert await map_oidc_user(get_user(request)) is user
+
+        claims = Request({"type": "http", "headers": [], "user": {"sub": "user-2"}})
+        assert (await map_oidc_user(get_user(claims))).sub == "user-2"
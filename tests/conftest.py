@@ -1,11 +1,13 @@
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Generator
 import os
 import logging
-from typing import Literal
+from typing import Any, Literal
 import pytest
 
 from pathlib import Path
 from pytest import ExitCode, Session
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -56,6 +58,18 @@ async def db_session(test_engine: AsyncEngine) -> AsyncGenerator[AsyncSession, N
         yield session
         await session.rollback()
 
+@pytest.fixture
+def query_log(test_engine: AsyncEngine) -> Generator[list[str], None, None]:
+    """Fixture that records every SQL statement sent to the test database."""
+    statements: list[str] = []
+
+    def record(conn: Connection, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+
 @pytest.fixture
 def settings() -> Settings:
     """Fixture to provide a fresh Settings instance for each test."""
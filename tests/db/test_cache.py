@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain.map_states.models import MapStateDomain
+from app.domain.map_states.patch import MergePatch
+from app.domain.messages.models import MessageDomain
+from app.infrastructure.cache import LRUCache, cache_status
+from app.infrastructure.map_states.cached_repository import CachingMapStateRepository, map_state_size
+from app.infrastructure.map_states.dao import MapStateDAO
+from app.infrastructure.map_states.repository import SqlAlchemyMapStateRepository
+from app.infrastructure.messages.cached_repository import CachingMessageRepository, message_size
+from app.infrastructure.messages.dao import MessageDAO
+from app.infrastructure.messages.repository import SqlAlchemyMessageRepository
+
+
+class FakeClock:
+    def __init__(self: FakeClock) -> None:
+        self.now: float = 0.0
+
+    def __call__(self: FakeClock) -> float:
+        return self.now
+
+
+@pytest.mark.anyio
+@pytest.mark.unit
+@pytest.mark.db
+class TestReadThroughCache:
+    """Unit tests for the LRU cache and the caching repository decorators."""
+
+    def test_evicts_least_recently_used_by_count_and_size(self: TestReadThroughCache) -> None:
+        """Entries are evicted oldest-use first once either bound is exceeded."""
+        cache: LRUCache[str, str] = LRUCache(max_entries=3, ttl=60, max_bytes=10, sizeof=len)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.put("c", "3")
+        assert cache.get("a") == "1"
+        cache.put("d", "4")
+        assert cache.get("b") is None
+        assert cache.metrics.evictions == 1
+
+        cache.put("big", "x" * 8)
+        assert cache.get("c") is None
+        assert len(cache) == 3 and cache.bytes == 10
+        cache.put("huge", "x" * 11)
+        assert cache.get("huge") is None and cache.get("big") == "x" * 8
+
+    def test_entries_expire_and_stale_loads_are_not_cached(self: TestReadThroughCache) -> None:
+        """Entries expire after the TTL, and an invalidation voids an in-flight load."""
+        clock = FakeClock()
+        cache: LRUCache[int, str] = LRUCache(max_entries=10, ttl=5, clock=clock)
+        cache.put(1, "v1")
+        clock.now = 5.0
+        assert cache.get(1) is None
+        assert cache.metrics.expirations == 1
+
+        epoch: int = cache.epoch
+        cache.invalidate(1)
+        cache.put(1, "loaded before the write", epoch)
+        assert cache.get(1) is None
+        assert cache_status(cache)["misses"] == 2
+        assert cache_status(None) == {"enabled": False}
+
+    async def test_message_reads_are_cached_until_written(self: TestReadThroughCache, db_session: AsyncSession) -> None:
+        """Repeated gets are hits, copies are handed out, and writes invalidate."""
+        cache: LRUCache[int, MessageDomain] = LRUCache(max_entries=10, ttl=60, sizeof=message_size)
+        repo = CachingMessageRepository(SqlAlchemyMessageRepository(MessageDAO(db_session)), cache)
+        created: MessageDomain = await repo.create("u", "hello")
+
+        first = await repo.get(created.id)
+        second = await repo.get(created.id)
+        assert first is not None and second is not None and first is not second
+        assert (cache.metrics.hits, cache.metrics.misses) == (1, 1)
+
+        await repo.update_owned(created.id, "changed", "u")
+        refreshed = await repo.get(created.id)
+        assert refreshed is not None and refreshed.content == "changed"
+        assert cache.metrics.invalidations == 1
+
+        await repo.delete_owned(created.id, "u")
+        assert await repo.get(created.id) is None
+
+    async def test_map_state_patch_invalidates(self: TestReadThroughCache, db_session: AsyncSession) -> None:
+        """Patching through the decorator drops the cached map state."""
+        cache: LRUCache[int, MapStateDomain] = LRUCache(max_entries=10, ttl=60, sizeof=map_state_size)
+        repo = CachingMapStateRepository(SqlAlchemyMapStateRepository(MapStateDAO(db_session)), cache)
+        created: MapStateDomain = await repo.create("u", "Map", '{"a": 1}')
+        cached = await repo.get(created.id)
+        assert cached is not None
+        cached.state = "mutated by a caller"
+        assert (await repo.get(created.id)).state == '{"a": 1}'  # type: ignore[union-attr]
+
+        await repo.patch(created.id, MergePatch({"a": 2}), "u")
+        patched = await repo.get(created.id)
+        assert patched is not None and patched.version == 2
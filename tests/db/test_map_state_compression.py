@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.compression import IDENTITY, ZSTD, StateCodec, decode_state, train_dictionary
+from app.db.entities.map_state import MapState
+from app.db.entities.map_state_payload import MapStatePayload
+from app.domain.map_states.models import MapStateDomain
+from app.domain.map_states.patch import JsonPatch
+from app.infrastructure.map_states.dao import MapStateDAO
+from app.infrastructure.map_states.repository import SqlAlchemyMapStateRepository
+from app.schemas.map_states import MapStateCreate
+
+pytest.importorskip("zstandard")
+
+
+def big_state(seed: int = 0) -> str:
+    return json.dumps({"layers": [{"id": f"layer-{seed}-{i}", "visible": True} for i in range(200)], "zoom": seed})
+
+
+async def stored(session: AsyncSession, id: int) -> Any:
+    stmt = (
+        select(MapStatePayload.state, MapStatePayload.state_codec, MapStatePayload.state_blob)
+        .join(MapState, MapState.state_hash == MapStatePayload.hash)
+        .where(MapState.id == id)
+    )
+    return (await session.execute(stmt)).one()
+
+
+@pytest.mark.anyio
+@pytest.mark.unit
+@pytest.mark.db
+@pytest.mark.map_states
+class TestMapStateCompression:
+    """Tests for the zstd storage codec of map states."""
+
+    async def test_large_states_are_compressed_and_read_back(self, db_session: AsyncSession) -> None:
+        repo = SqlAlchemyMapStateRepository(MapStateDAO(db_session, StateCodec(threshold=1024)))
+        large: MapStateDomain = await repo.create("u", "Large", big_state())
+        small: MapStateDomain = await repo.create("u", "Small", '{"zoom": 1}')
+
+        large_row = await stored(db_session, large.id)
+        small_row = await stored(db_session, small.id)
+        assert large_row.state is None
+        assert large_row.state_codec == ZSTD
+        assert len(large_row.state_blob) < len(big_state()) // 5
+        assert small_row.state_codec == IDENTITY
+        assert small_row.state == '{"zoom": 1}'
+
+        fetched: MapStateDomain | None = await repo.get(large.id)
+        assert fetched is not None
+        assert fetched.state == big_state()
+        assert large.state == big_state()
+
+    async def test_partial_reads_and_patches_on_compressed_rows(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session, StateCodec(threshold=1024))
+        repo = SqlAlchemyMapStateRepository(dao)
+        created: MapStateDomain = await repo.create("u", "Large", big_state())
+
+        subtree: MapStateDomain | None = await repo.get_subtree(created.id, ("layers", "3", "id"))
+        assert subtree is not None
+        assert json.loads(subtree.state) == "layer-0-3"
+
+        row = await dao.patch(created.id, JsonPatch.parse([{"op": "replace", "path": "/zoom", "value": 9}]), "u")
+        assert row is not None and row.version == 2
+        assert (await stored(db_session, created.id)).state_codec == ZSTD
+        fetched: MapStateDomain | None = await repo.get(created.id)
+        assert fetched is not None
+        assert json.loads(fetched.state)["zoom"] == 9
+
+    async def test_recompress_rewrites_existing_rows_in_batches(self, db_session: AsyncSession) -> None:
+        plain = MapStateDAO(db_session)
+        ids: list[int] = [(await plain.create("u", MapStateCreate(name=f"M{i}", state=big_state(i)))).id for i in range(5)]
+        await plain.create("u", MapStateCreate(name="tiny", state="{}"))
+
+        dao = MapStateDAO(db_session, StateCodec(threshold=1024))
+        after: str | None = ""
+        rewritten: int = 0
+        batches: int = 0
+        while after is not None:
+            after, changed = await dao.recompress(after, batch_size=2)
+            rewritten += changed
+            batches += 1
+
+        assert rewritten == 5
+        assert batches == 4
+        for i, id in enumerate(ids):
+            row = await stored(db_session, id)
+            assert row.state_codec == ZSTD
+            assert decode_state(*row) == big_state(i)
+        assert (await MapStateDAO(db_session, StateCodec()).recompress("", 100))[1] == 5
+
+    def test_dictionary_codec_round_trip(self) -> None:
+        dictionary: bytes = train_dictionary([big_state(i) for i in range(50)], size=4096)
+        codec = StateCodec(threshold=0, dictionary=dictionary)
+        encoded = codec.encode(big_state(99))
+
+        assert encoded.state_codec.startswith("zstd:d")
+        assert encoded.state_blob is not None
+        assert decode_state(None, encoded.state_codec, encoded.state_blob) == big_state(99)
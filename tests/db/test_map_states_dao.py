@@ -1,14 +1,25 @@
 from __future__ import annotations
 
+import json
+
 import pytest
 from typing import Sequence
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.entities.map_state import MapState
+from app.db.entities.map_state_payload import MapStatePayload
+from app.domain.map_states.geometry import BoundingBox
+from app.domain.map_states.patch import JsonPatch, MergePatch, PatchConflict
 from app.infrastructure.map_states.dao import MapStateDAO
 from app.schemas.map_states import MapStateCreate, MapStateUpdate
 
 
+async def payload_refs(session: AsyncSession) -> dict[str, int]:
+    result = await session.execute(select(MapStatePayload.hash, MapStatePayload.ref_count))
+    return {hash: count for hash, count in result.all()}
+
+
 @pytest.mark.anyio
 @pytest.mark.unit
 @pytest.mark.map_states
@@ -22,7 +33,7 @@ async def test_create_and_fetch(self, db_session: AsyncSession) -> None:
         fetched: MapState | None = await dao.get(created.id)
         assert created.id is not None
         assert created.name == "Test"
-        assert created.state == "{}"
+        assert created.document == "{}"
         assert fetched is not None
         assert fetched.id == created.id
 
@@ -37,11 +48,11 @@ async def test_update(self, db_session: AsyncSession) -> None:
             user_id="user", payload=MapStateCreate(name="Orig", state="{}")
         )
         updated: MapState | None = await dao.update(
-            original.id, MapStateUpdate(name="New", state="{1}")
+            original.id, MapStateUpdate(name="New", state="{\"v\": 1}")
         )
         assert updated is not None
         assert updated.name == "New"
-        assert updated.state == "{1}"
+        assert updated.document == "{\"v\": 1}"
 
     async def test_delete(self, db_session: AsyncSession) -> None:
         dao = MapStateDAO(db_session)
@@ -57,3 +68,300 @@ async def test_delete_nonexistent(self, db_session: AsyncSession) -> None:
         dao = MapStateDAO(db_session)
         deleted: bool = await dao.delete(9999)
         assert deleted is False
+
+    async def test_create_returns_row_in_one_insert(
+        self, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        dao = MapStateDAO(db_session)
+        await db_session.connection()
+        query_log.clear()
+        created: MapState = await dao.create(
+            user_id="u", payload=MapStateCreate(name="One", state="{}")
+        )
+        inserts: list[str] = [q for q in query_log if q.startswith("INSERT INTO map_states ")]
+        assert len(inserts) == 1
+        assert "RETURNING" in inserts[0]
+        assert created.created_at is not None
+        assert created.updated_at is not None
+
+    async def test_identical_states_share_one_payload(
+        self, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        dao = MapStateDAO(db_session)
+        first: MapState = await dao.create("u", MapStateCreate(name="A", state='{"template": 1}'))
+        query_log.clear()
+        second: MapState = await dao.create("v", MapStateCreate(name="B", state='{"template": 1}'))
+
+        # The payload already exists: only its ref count changes.
+        assert not any(q.startswith("INSERT INTO map_state_payloads") for q in query_log)
+        assert second.state_hash == first.state_hash
+        assert second.document == '{"template": 1}'
+        # Two rows plus their version 1 history snapshots.
+        assert await payload_refs(db_session) == {first.state_hash: 4}
+
+        await dao.delete(first.id)
+        assert await payload_refs(db_session) == {first.state_hash: 2}
+        await dao.delete_owned(second.id, owner_id="v")
+        assert await payload_refs(db_session) == {}
+
+    async def test_update_with_unchanged_state_is_a_no_op(
+        self, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        dao = MapStateDAO(db_session)
+        created: MapState = await dao.create("u", MapStateCreate(name="Same", state='{"a": 1}'))
+        map_state_id: int = created.id
+        query_log.clear()
+
+        unchanged = await dao.update(map_state_id, MapStateUpdate(name="Same", state='{"a": 1}'))
+        owned = await dao.update_owned(map_state_id, MapStateUpdate(name="Same", state='{"a": 1}'), "u")
+
+        assert unchanged is not None and unchanged.version == 1
+        assert owned is not None and owned.version == 1
+        assert not [q for q in query_log if q.split()[0] in ("INSERT", "UPDATE", "DELETE")]
+
+        query_log.clear()
+        renamed = await dao.update_owned(map_state_id, MapStateUpdate(name="Renamed", state='{"a": 1}'), "u")
+
+        assert renamed is not None
+        assert renamed.version == 2
+        assert renamed.document == '{"a": 1}'
+        assert [q.split()[0] + " " + q.split()[1] for q in query_log if q.startswith("UPDATE")] == ["UPDATE map_states"]
+
+    async def test_formatting_does_not_change_the_content_hash(self, db_session: AsyncSession) -> None:
+        """Whitespace and key order are not content: reformatted documents share a payload."""
+        dao = MapStateDAO(db_session)
+        created: MapState = await dao.create(
+            "u", MapStateCreate(name="F", state='{"b": [1, 2], "a": {"y": 1, "x": true}}')
+        )
+        map_state_id: int = created.id
+        other: MapState = await dao.create("v", MapStateCreate(name="G", state='{"a":{"x":true,"y":1},"b":[1,2]}'))
+        assert other.state_hash == created.state_hash
+
+        # As PostgreSQL returns the JSONB document: a GET then PUT round trip is a no-op.
+        normalized: str = '{"a": {"x": true, "y": 1}, "b": [1, 2]}'
+        unchanged = await dao.update(map_state_id, MapStateUpdate(name="F", state=normalized))
+        assert unchanged is not None and unchanged.version == 1
+        assert await payload_refs(db_session) == {created.state_hash: 4}
+
+    async def test_update_moves_to_new_payload(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session)
+        shared: MapState = await dao.create("u", MapStateCreate(name="A", state="{}"))
+        other: MapState = await dao.create("u", MapStateCreate(name="B", state="{}"))
+        old_hash: str = shared.state_hash
+
+        updated = await dao.update_owned(other.id, MapStateUpdate(name="B", state='{"b": 2}'), "u")
+        replaced = await dao.update(shared.id, MapStateUpdate(name="A", state='{"b": 2}'))
+
+        assert updated is not None and replaced is not None
+        assert updated.state_hash == replaced.state_hash != old_hash
+        assert replaced.document == '{"b": 2}'
+        # The old payload is still referenced by both version 1 snapshots.
+        assert await payload_refs(db_session) == {old_hash: 2, replaced.state_hash: 2}
+
+    async def test_update_owned(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session)
+        ms: MapState = await dao.create(
+            user_id="owner", payload=MapStateCreate(name="Orig", state="{}")
+        )
+        payload = MapStateUpdate(name="New", state="{\"v\": 1}")
+        denied: MapState | None = await dao.update_owned(ms.id, payload, owner_id="other")
+        updated: MapState | None = await dao.update_owned(ms.id, payload, owner_id="owner")
+        assert denied is None
+        assert updated is not None
+        assert updated.name == "New"
+
+    async def test_update_owned_with_expected_version(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session)
+        ms: MapState = await dao.create(user_id="owner", payload=MapStateCreate(name="V", state="{}"))
+        map_state_id: int = ms.id
+        first = await dao.update_owned(map_state_id, MapStateUpdate(name="V", state='{"v": 2}'), "owner", 1)
+        assert first is not None and first.version == 2
+        stale = await dao.update_owned(map_state_id, MapStateUpdate(name="V", state='{"v": 3}'), "owner", 1)
+        assert stale is None
+        metadata = await dao.get_metadata(map_state_id)
+        assert metadata is not None and metadata.version == 2
+
+    async def test_delete_owned(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session)
+        ms: MapState = await dao.create(
+            user_id="owner", payload=MapStateCreate(name="Del", state="{}")
+        )
+        denied: MapState | None = await dao.delete_owned(ms.id, owner_id="other")
+        deleted: MapState | None = await dao.delete_owned(ms.id, owner_id=None)
+        assert denied is None
+        assert deleted is not None
+        assert deleted.name == "Del"
+        assert await dao.exists(ms.id) is False
+
+    async def test_get_fragments_extracts_paths_in_sql(
+        self, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        dao = MapStateDAO(db_session)
+        state = {"layers": [{"id": "roads"}, {"id": "rivers"}], "viewport": {"zoom": 4, "center": [1, 2]}, "title": "x"}
+        created: MapState = await dao.create("u", MapStateCreate(name="Big", state=json.dumps(state)))
+        query_log.clear()
+
+        found = await dao.get_fragments(
+            created.id, [("viewport", "center"), ("layers", "1", "id"), ("title",), ("missing",)]
+        )
+
+        assert found is not None
+        row, fragments = found
+        assert row.name == "Big"
+        assert "state" not in row._mapping
+        assert [json.loads(f) if f is not None else None for f in fragments] == [[1, 2], "rivers", "x", None]
+        assert len(query_log) == 1
+        assert await dao.get_fragments(created.id + 1, [("title",)]) is None
+
+    async def test_patch_stores_result_by_hash(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session)
+        state = {"viewport": {"zoom": 3}, "layers": ["a"], "title": "t"}
+        created: MapState = await dao.create("u", MapStateCreate(name="P", state=json.dumps(state)))
+        map_state_id: int = created.id
+        old_hash: str = created.state_hash
+
+        patch = JsonPatch.parse(
+            [
+                {"op": "replace", "path": "/viewport/zoom", "value": 7},
+                {"op": "add", "path": "/viewport/bearing", "value": 90},
+                {"op": "remove", "path": "/title"},
+            ]
+        )
+        row = await dao.patch(map_state_id, patch, owner_id="u")
+        same = await dao.patch(map_state_id, JsonPatch.parse([{"op": "test", "path": "/layers", "value": ["a"]}]), "u")
+
+        assert row is not None
+        assert row.version == 2
+        assert same is not None and same.version == 2
+        fetched = await dao.get(map_state_id)
+        assert fetched is not None
+        await db_session.refresh(fetched)
+        assert json.loads(fetched.document) == {"viewport": {"zoom": 7, "bearing": 90}, "layers": ["a"]}
+        assert fetched.state_hash != old_hash
+        assert await payload_refs(db_session) == {old_hash: 1, fetched.state_hash: 1}
+
+    async def test_patch_array_and_move_ops(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session)
+        created: MapState = await dao.create(
+            "u", MapStateCreate(name="P", state=json.dumps({"layers": ["a", "b"], "old": 1}))
+        )
+
+        patch = JsonPatch.parse(
+            [
+                {"op": "add", "path": "/layers/1", "value": "x"},
+                {"op": "move", "from": "/old", "path": "/new"},
+                {"op": "test", "path": "/layers", "value": ["a", "x", "b"]},
+            ]
+        )
+        row = await dao.patch(created.id, patch, owner_id=None)
+
+        assert row is not None
+        fetched = await dao.get(created.id)
+        assert fetched is not None
+        await db_session.refresh(fetched)
+        assert json.loads(fetched.document) == {"layers": ["a", "x", "b"], "new": 1}
+
+    async def test_patch_conflict_leaves_state_unchanged(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session)
+        created: MapState = await dao.create("u", MapStateCreate(name="P", state='{"a": 1}'))
+        # Rollback expires loaded instances, so keep the id.
+        map_state_id: int = created.id
+
+        with pytest.raises(PatchConflict):
+            await dao.patch(map_state_id, JsonPatch.parse([{"op": "replace", "path": "/missing", "value": 2}]), None)
+
+        fetched = await dao.get(map_state_id)
+        assert fetched is not None
+        await db_session.refresh(fetched)
+        assert fetched.document == '{"a": 1}'
+        assert fetched.version == 1
+
+    async def test_patch_test_op_compares_json_types(self) -> None:
+        document = {"flag": 1, "off": [0], "zoom": 3, "meta": {"visible": True}}
+
+        for value, path in ((True, "/flag"), ([False], "/off"), ({"visible": 1}, "/meta")):
+            with pytest.raises(PatchConflict):
+                JsonPatch.parse([{"op": "test", "path": path, "value": value}]).apply(document)
+
+        same = JsonPatch.parse(
+            [{"op": "test", "path": "/zoom", "value": 3.0}, {"op": "test", "path": "/meta", "value": {"visible": True}}]
+        )
+        assert same.apply(document) == document
+
+    async def test_merge_patch_and_ownership(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session)
+        created: MapState = await dao.create(
+            "u", MapStateCreate(name="P", state=json.dumps({"a": 1, "b": {"c": 2, "d": 3}}))
+        )
+
+        map_state_id: int = created.id
+
+        flat = await dao.patch(map_state_id, MergePatch({"a": None, "e": [1]}), owner_id="u")
+        nested = await dao.patch(map_state_id, MergePatch({"b": {"d": None}}), owner_id="u")
+        foreign = await dao.patch(map_state_id, MergePatch({"a": 5}), owner_id="someone-else")
+
+        assert flat is not None and flat.version == 2
+        assert nested is not None and nested.version == 3
+        assert foreign is None
+        fetched = await dao.get(map_state_id)
+        assert fetched is not None
+        await db_session.refresh(fetched)
+        assert json.loads(fetched.document) == {"b": {"c": 2}, "e": [1]}
+
+    async def test_history_replay_is_bounded_by_snapshot_interval(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session, snapshot_interval=4)
+        created: MapState = await dao.create("u", MapStateCreate(name="H", state='{"n": 1}'))
+        map_state_id: int = created.id
+        for n in range(2, 11):
+            await dao.patch(map_state_id, MergePatch({"n": n}), owner_id="u")
+
+        chain = await dao.history_chain(map_state_id, 7)
+        assert [row.version for row in chain] == [5, 6, 7]
+        assert chain[0].delta is None and json.loads(chain[0].state) == {"n": 5}
+        assert [json.loads(row.delta) for row in chain[1:]] == [
+            [{"op": "replace", "path": "/n", "value": 6}],
+            [{"op": "replace", "path": "/n", "value": 7}],
+        ]
+        assert [row.version for row in await dao.history_chain(map_state_id, 9)] == [9]
+
+    async def test_list_summaries_never_reads_state(
+        self, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        dao = MapStateDAO(db_session)
+        big: MapState = await dao.create("u", MapStateCreate(name="Big", state=json.dumps({"x": "é" * 1000})))
+        await dao.create("u", MapStateCreate(name="Small", state="{}"))
+        await dao.create("other", MapStateCreate(name="Other", state="{}"))
+        query_log.clear()
+
+        rows = await dao.list_summaries("u", limit=10)
+
+        assert [row.name for row in rows] == ["Small", "Big"]
+        assert rows[1].size_bytes == len(json.dumps({"x": "é" * 1000}).encode())
+        assert rows[1].content_hash == big.state_hash
+        assert len(query_log) == 1
+        assert "state," not in query_log[0] and "state_blob" not in query_log[0]
+        assert len(await dao.list_summaries(limit=10)) == 3
+
+    async def test_list_within_follows_state_geometries(self, db_session: AsyncSession) -> None:
+        def point(x: float, y: float) -> str:
+            feature = {"type": "Feature", "geometry": {"type": "Point", "coordinates": [x, y]}}
+            return json.dumps({"layers": [{"type": "FeatureCollection", "features": [feature]}]})
+
+        dao = MapStateDAO(db_session)
+        boston: MapState = await dao.create("u", MapStateCreate(name="Boston", state=point(-71.06, 42.36)))
+        boston_id: int = boston.id
+        await dao.create("u", MapStateCreate(name="Paris", state=point(2.35, 48.86)))
+        await dao.create("u", MapStateCreate(name="Empty", state="{}"))
+        await dao.create("other", MapStateCreate(name="Lowell", state=point(-71.31, 42.63)))
+        new_england = BoundingBox(-73.5, 41.0, -69.9, 47.5)
+
+        assert [row.name for row in await dao.list_within(new_england, "u")] == ["Boston"]
+        assert [row.name for row in await dao.list_within(new_england)] == ["Lowell", "Boston"]
+        # Touching the edge of the box counts as intersecting.
+        assert [row.name for row in await dao.list_within(BoundingBox(2.35, 48.86, 3.0, 49.0))] == ["Paris"]
+
+        await dao.update(boston_id, MapStateUpdate(name="Boston", state=point(-0.13, 51.51)))
+        assert await dao.list_within(new_england, "u") == []
+        assert [row.name for row in await dao.list_within(BoundingBox(-1, 51, 0, 52))] == ["Boston"]
+        await dao.delete(boston_id)
+        assert await dao.list_within(BoundingBox(-1, 51, 0, 52)) == []
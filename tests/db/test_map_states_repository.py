@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import json
+from typing import Any
+
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.domain.map_states.models import MapStateDomain
+from app.domain.map_states.models import MapStateDomain, MapStateHistoryEntry
 from app.infrastructure.map_states.dao import MapStateDAO
 from app.infrastructure.map_states.repository import SqlAlchemyMapStateRepository
 from app.schemas.map_states import MapStateCreate, MapStateUpdate
@@ -36,10 +39,10 @@ async def test_update(self, db_session: AsyncSession) -> None:
         dao = MapStateDAO(db_session)
         repo = SqlAlchemyMapStateRepository(dao)
         ms: MapStateDomain = await repo.create("u", "orig", "{}")
-        updated: MapStateDomain | None = await repo.update(ms.id, "new", "{1}")
+        updated: MapStateDomain | None = await repo.update(ms.id, "new", "{\"v\": 1}")
         assert updated is not None
         assert updated.name == "new"
-        assert updated.state == "{1}"
+        assert updated.state == "{\"v\": 1}"
 
     async def test_delete(self, db_session: AsyncSession) -> None:
         dao = MapStateDAO(db_session)
@@ -55,3 +58,31 @@ async def test_delete_nonexistent(self, db_session: AsyncSession) -> None:
         repo = SqlAlchemyMapStateRepository(dao)
         result: bool = await repo.delete(99999)
         assert result is False
+
+    async def test_versions_materialize_from_snapshots_and_deltas(self, db_session: AsyncSession) -> None:
+        repo = SqlAlchemyMapStateRepository(MapStateDAO(db_session, snapshot_interval=3))
+        states: list[Any] = [
+            {"layers": ["roads"], "viewport": {"zoom": 3}},
+            {"layers": ["roads", "rivers"], "viewport": {"zoom": 3}},
+            {"layers": ["rivers"], "viewport": {"zoom": 4, "bearing": 90}},
+            {"layers": [], "viewport": {"zoom": 4.0}, "title": "t"},
+            {"layers": [], "viewport": {"zoom": 4.0}, "title": "t"},
+            [1, {"a/b": True}],
+            {"layers": [{"id": "x", "visible": False}]},
+        ]
+        created: MapStateDomain = await repo.create("u", "v1", json.dumps(states[0]))
+        for version, state in enumerate(states[1:], start=2):
+            await repo.update(created.id, f"v{version}", json.dumps(state))
+
+        history: list[MapStateHistoryEntry] = list(await repo.list_versions(created.id, limit=100))
+        assert [h.version for h in history] == list(range(len(states), 0, -1))
+        assert [h.version for h in history if h.snapshot] == [7, 4, 1]
+        assert [h.version for h in await repo.list_versions(created.id, limit=2, before=5)] == [4, 3]
+
+        for version, state in enumerate(states, start=1):
+            materialized: MapStateDomain | None = await repo.get_version(created.id, version)
+            assert materialized is not None
+            assert json.loads(materialized.state) == state
+            assert materialized.name == f"v{version}"
+            assert materialized.version == version
+        assert await repo.get_version(created.id, len(states) + 1) is None
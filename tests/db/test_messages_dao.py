@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import pytest
-from typing import Sequence
+from typing import AsyncIterator, Sequence
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.entities.message import Message
 from app.infrastructure.messages.dao import MessageDAO
+from app.infrastructure.pagination import keyset_paginate
 from app.schemas.messages import MessageCreate
 
 @pytest.mark.anyio
@@ -85,3 +87,147 @@ async def test_delete_nonexistent_message(self: TestMessageDAO, db_session: Asyn
         # Assert
         assert deleted is False
 
+    async def test_create_uses_single_statement(
+        self: TestMessageDAO, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        """Should insert and load server defaults with one INSERT ... RETURNING."""
+        # Arrange
+        dao = MessageDAO(db_session)
+        await db_session.connection()
+        query_log.clear()
+
+        # Act
+        created: Message = await dao.create(user_id="user-rt", content="One trip")
+
+        # Assert
+        assert len(query_log) == 1
+        assert query_log[0].startswith("INSERT INTO messages")
+        assert "RETURNING" in query_log[0]
+        assert created.id is not None
+        assert created.created_at is not None
+        assert created.updated_at is not None
+
+    async def test_update_owned_single_statement(
+        self: TestMessageDAO, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        """Should update an owned message with one UPDATE ... RETURNING."""
+        # Arrange
+        dao = MessageDAO(db_session)
+        original: Message = await dao.create(user_id="owner", content="before")
+        query_log.clear()
+
+        # Act
+        updated: Message | None = await dao.update_owned(original.id, "after", owner_id="owner")
+
+        # Assert
+        assert updated is not None
+        assert updated.content == "after"
+        assert len(query_log) == 1
+        assert query_log[0].startswith("UPDATE messages")
+
+    async def test_update_owned_rejects_other_owner(self: TestMessageDAO, db_session: AsyncSession) -> None:
+        """Should leave the row untouched when the owner predicate does not match."""
+        # Arrange
+        dao = MessageDAO(db_session)
+        original: Message = await dao.create(user_id="owner", content="before")
+
+        # Act
+        denied: Message | None = await dao.update_owned(original.id, "hijacked", owner_id="intruder")
+        as_admin: Message | None = await dao.update_owned(original.id, "by admin", owner_id=None)
+
+        # Assert
+        assert denied is None
+        assert as_admin is not None
+        assert as_admin.content == "by admin"
+
+    async def test_delete_owned(self: TestMessageDAO, db_session: AsyncSession) -> None:
+        """Should delete only when the owner matches and return the deleted row."""
+        # Arrange
+        dao = MessageDAO(db_session)
+        message: Message = await dao.create(user_id="owner", content="bye")
+
+        # Act
+        denied: Message | None = await dao.delete_owned(message.id, owner_id="intruder")
+        deleted: Message | None = await dao.delete_owned(message.id, owner_id="owner")
+
+        # Assert
+        assert denied is None
+        assert deleted is not None
+        assert deleted.content == "bye"
+        assert await dao.get(message.id) is None
+        assert await dao.exists(message.id) is False
+
+    async def test_bulk_create_batches_inserts(
+        self: TestMessageDAO, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        """Should insert all rows with one multi-row INSERT per batch and return IDs in order."""
+        # Arrange
+        dao = MessageDAO(db_session)
+        contents: list[str] = [f"bulk {i}" for i in range(25)]
+
+        # Act
+        ids: list[int] = await dao.bulk_create("bulk-user", contents, batch_size=10)
+        inserts: list[str] = [q for q in query_log if q.startswith("INSERT")]
+        stored: Sequence[Message] = await dao.list_by_user("bulk-user")
+
+        # Assert
+        assert len(ids) == 25
+        assert ids == sorted(ids)
+        assert len(inserts) == 3
+        assert {m.id: m.content for m in stored} == dict(zip(ids, contents))
+
+    async def test_bulk_create_rolls_back_on_failure(self: TestMessageDAO, db_session: AsyncSession) -> None:
+        """Should leave no rows behind when the input stream fails midway."""
+        # Arrange
+        dao = MessageDAO(db_session)
+
+        async def failing() -> AsyncIterator[str]:
+            for i in range(5):
+                yield f"partial {i}"
+            raise RuntimeError("upstream broke")
+
+        # Act
+        with pytest.raises(RuntimeError):
+            await dao.bulk_create("bulk-user", failing(), batch_size=2)
+
+        # Assert
+        assert await dao.list_by_user("bulk-user") == []
+
+    async def test_list_by_user_is_an_index_scan(self: TestMessageDAO, db_session: AsyncSession) -> None:
+        """Should serve ordered per-user listings from the composite index without sorting."""
+        # Arrange
+        stmt = keyset_paginate(
+            select(Message).where(Message.user_id == "user-abc"), Message.created_at, Message.id, limit=10
+        )
+        sql: str = str(stmt.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True}))
+
+        # Act
+        plan: str = " ".join(
+            row[-1] for row in (await db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+        )
+
+        # Assert
+        assert "ix_messages_user_id_created_at_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+    async def test_search_ranks_matches_and_tracks_changes(self: TestMessageDAO, db_session: AsyncSession) -> None:
+        """Should return only matching messages, best first, and reflect updates and deletes."""
+        # Arrange
+        dao = MessageDAO(db_session)
+        strong: Message = await dao.create("searcher", "river river river crossing")
+        weak: Message = await dao.create("searcher", "a long walk past the river and over the hills today")
+        await dao.create("searcher", "nothing relevant here")
+        await dao.create("someone-else", "river")
+        changed: Message = await dao.create("searcher", "mountain pass")
+
+        # Act
+        hits: Sequence[tuple[Message, float]] = await dao.search("river", user_id="searcher")
+        await dao.update(changed.id, "river delta")
+        await dao.delete(strong.id)
+        after_changes: Sequence[tuple[Message, float]] = await dao.search("river", user_id="searcher")
+
+        # Assert
+        assert [m.id for m, _ in hits] == [strong.id, weak.id]
+        assert hits[0][1] > hits[1][1]
+        assert {m.id for m, _ in after_changes} == {weak.id, changed.id}
+        assert await dao.search('"unbalanced (quote', user_id="searcher") == []
@@ -83,3 +83,32 @@ async def test_delete_nonexistent(self: TestSqlMessageRepository, db_session: As
 
         # Assert
         assert result is False
+
+    async def test_stream_yields_fixed_size_chunks(self: TestSqlMessageRepository, db_session: AsyncSession) -> None:
+        """Should stream every message in chunks of at most chunk_size."""
+        # Arrange
+        dao = MessageDAO(db_session)
+        repo = SqlAlchemyMessageRepository(dao)
+        for i in range(5):
+            await repo.create(user_id="streamer", content=f"row {i}")
+
+        # Act
+        chunks: list[list[MessageDomain]] = [list(chunk) async for chunk in repo.stream(chunk_size=2)]
+
+        # Assert
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert [m.content for c in chunks for m in c] == [f"row {i}" for i in range(5)]
+
+    async def test_domain_objects_are_slotted(self: TestSqlMessageRepository, db_session: AsyncSession) -> None:
+        """Entities and streamed rows should both become compact, equal domain objects."""
+        # Arrange
+        dao = MessageDAO(db_session)
+        repo = SqlAlchemyMessageRepository(dao)
+        created: MessageDomain = await repo.create(user_id="slots", content="compact")
+
+        # Act
+        streamed: list[MessageDomain] = [m async for chunk in repo.stream("slots") for m in chunk]
+
+        # Assert
+        assert streamed == [created]
+        assert not hasattr(created, "__dict__")
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from pydantic import SecretStr
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.settings import DatabaseSettings
+from app.db.pool import InstrumentedAsyncQueuePool, pool_status
+from app.db.session import engine_options
+
+
+@pytest.mark.anyio
+@pytest.mark.unit
+@pytest.mark.db
+class TestConnectionPool:
+    """Unit tests for engine pool configuration and metrics."""
+
+    def test_sqlite_always_uses_null_pool(self: TestConnectionPool) -> None:
+        """SQLite keeps NullPool even when pooling is enabled."""
+        db = DatabaseSettings(backend="sqlite", name=":memory:", password=SecretStr("x"), pool_enabled=True)
+        assert engine_options(db) == {"poolclass": NullPool}
+
+    def test_postgres_uses_configured_pool(self: TestConnectionPool) -> None:
+        """PostgreSQL gets an instrumented queue pool sized from settings."""
+        db = DatabaseSettings(
+            user="u",
+            hostname="db",
+            port=5432,
+            name="universal",
+            password=SecretStr("x"),
+            pool_size=7,
+            pool_max_overflow=3,
+            pool_timeout=5,
+            pool_recycle=60,
+            pool_pre_ping=False,
+        )
+        options: dict[str, Any] = engine_options(db)
+        assert options["poolclass"] is InstrumentedAsyncQueuePool
+        assert options["pool_size"] == 7
+        assert options["max_overflow"] == 3
+        assert options["pool_timeout"] == 5
+        assert options["pool_recycle"] == 60
+        assert options["pool_pre_ping"] is False
+
+    def test_postgres_pool_can_be_disabled(self: TestConnectionPool) -> None:
+        """Setting pool_enabled=False falls back to NullPool."""
+        db = DatabaseSettings(
+            user="u", hostname="db", port=5432, name="universal", password=SecretStr("x"), pool_enabled=False
+        )
+        assert engine_options(db) == {"poolclass": NullPool}
+
+    async def test_checkout_metrics_are_recorded(self: TestConnectionPool, tmp_path: Path) -> None:
+        """Checkouts, in-use counts and wait times are exposed via pool_status."""
+        engine: AsyncEngine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=2,
+            max_overflow=0,
+        )
+        try:
+            async with engine.connect() as first, engine.connect() as second:
+                await first.execute(text("SELECT 1"))
+                await second.execute(text("SELECT 1"))
+                busy: dict[str, Any] = pool_status(engine.pool)
+
+            idle: dict[str, Any] = pool_status(engine.pool)
+        finally:
+            await engine.dispose()
+
+        assert busy["pooled"] is True
+        assert busy["checked_out"] == 2
+        assert idle["checked_out"] == 0
+        assert idle["checkouts"] == 2
+        assert idle["peak_in_use"] == 2
+        assert idle["wait_max_ms"] >= 0.0
+
+    def test_null_pool_status(self: TestConnectionPool) -> None:
+        """Unpooled engines report that they are not pooled."""
+        assert pool_status(NullPool(lambda: None)) == {"pool": "NullPool", "pooled": False}
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain.map_states.models import MapStateDomain, MapStateSummary
+from app.domain.map_states.patch import MergePatch
+from app.domain.messages.models import MessageDomain
+from app.infrastructure.map_states.cached_repository import SharedCacheMapStateRepository
+from app.infrastructure.map_states.dao import MapStateDAO
+from app.infrastructure.map_states.repository import SqlAlchemyMapStateRepository
+from app.infrastructure.messages.cached_repository import SharedCacheMessageRepository
+from app.infrastructure.messages.dao import MessageDAO
+from app.infrastructure.messages.repository import SqlAlchemyMessageRepository
+from app.infrastructure.shared_cache import SharedCache, SharedEntityCache, shared_cache_status
+
+
+def shared_cache(server: FakeServer, ttl: float = 60) -> SharedCache:
+    """A client of server, as one worker would hold."""
+    return SharedCache(FakeRedis(server=server), "test", ttl, lock_timeout=1.0, poll_interval=0.005)
+
+
+def message_repo(session: AsyncSession, server: FakeServer) -> SharedCacheMessageRepository:
+    cache = SharedEntityCache(shared_cache(server), "message", MessageDomain)
+    return SharedCacheMessageRepository(SqlAlchemyMessageRepository(MessageDAO(session)), cache)
+
+
+@pytest.mark.anyio
+@pytest.mark.unit
+@pytest.mark.db
+class TestSharedCache:
+    """Unit tests for the shared cache and its repository decorators, against an in-memory server."""
+
+    async def test_versioned_values_and_pipelined_reads(self: TestSharedCache) -> None:
+        """Values are only served under the version they were stored with."""
+        cache: SharedCache = shared_cache(FakeServer())
+        await cache.set_many([(cache.key("a"), 0, b"1"), (cache.key("b"), 0, b"2")])
+        found = await cache.get_many([(cache.key("a"), cache.key("a", "v")), (cache.key("b"), cache.key("b", "v"))])
+        assert found == [(b"1", 0), (b"2", 0)]
+
+        await cache.bump(cache.key("a", "v"))
+        assert await cache.get(cache.key("a"), cache.key("a", "v")) == (None, 1)
+        assert (cache.metrics.hits, cache.metrics.misses) == (2, 1)
+
+    async def test_concurrent_misses_load_once(self: TestSharedCache) -> None:
+        """Only one of many concurrent readers of a missing key runs the loader."""
+        server = FakeServer()
+        loads: list[int] = []
+
+        async def loader(version: int) -> bytes:
+            loads.append(version)
+            await asyncio.sleep(0.05)
+            return b"loaded"
+
+        workers: list[SharedCache] = [shared_cache(server) for _ in range(5)]
+        results = await asyncio.gather(*(worker.load("test:k", "test:k:v", loader) for worker in workers))
+        assert results == [b"loaded"] * 5
+        assert loads == [0]
+        assert sum(worker.metrics.stampede_waits for worker in workers) == 4
+
+    async def test_server_errors_fall_back_to_the_loader(self: TestSharedCache) -> None:
+        """An unreachable server is treated as a miss, not a failure."""
+        server = FakeServer()
+        server.connected = False
+        cache: SharedCache = shared_cache(server)
+
+        async def loader(version: int) -> bytes:
+            return b"from the database"
+
+        assert await cache.load("test:k", "test:k:v", loader) == b"from the database"
+        await cache.bump("test:k:v")
+        assert shared_cache_status(cache)["errors"] >= 2
+
+    async def test_hits_skip_the_database_across_workers(
+        self: TestSharedCache, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        """A message loaded by one worker is served to another without a query."""
+        server = FakeServer()
+        first, second = message_repo(db_session, server), message_repo(db_session, server)
+        created: MessageDomain = await first.create("u", "hello")
+        assert (await first.get(created.id)).content == "hello"  # type: ignore[union-attr]
+
+        query_log.clear()
+        cached = await second.get(created.id)
+        assert cached is not None and cached.content == "hello" and cached.created_at == created.created_at
+        assert query_log == []
+
+        await first.update_owned(created.id, "changed", "u")
+        assert (await second.get(created.id)).content == "changed"  # type: ignore[union-attr]
+
+    async def test_get_many_loads_only_misses(
+        self: TestSharedCache, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        """A multi-get is one pipelined lookup; only the misses are loaded, with one query."""
+        repo = message_repo(db_session, FakeServer())
+        created: list[MessageDomain] = [await repo.create("u", f"m{i}") for i in range(3)]
+        await repo.get(created[0].id)
+
+        query_log.clear()
+        found = await repo.get_many([m.id for m in created] + [999999])
+        assert sorted(m.content for m in found) == ["m0", "m1", "m2"]
+        assert len(query_log) == 1 and "IN" in query_log[0]
+
+        query_log.clear()
+        assert len(await repo.get_many([m.id for m in created])) == 3
+        assert query_log == []
+
+    async def test_user_listings_are_versioned_per_user(
+        self: TestSharedCache, db_session: AsyncSession, query_log: list[str]
+    ) -> None:
+        """Listing pages are served from the cache until a write to any of the user's messages."""
+        server = FakeServer()
+        first, second = message_repo(db_session, server), message_repo(db_session, server)
+        for content in ("one", "two"):
+            await first.create("u", content)
+        other: MessageDomain = await first.create("v", "elsewhere")
+        assert [m.content for m in await first.list_by_user("u", 10)] == ["two", "one"]
+
+        query_log.clear()
+        assert [m.content for m in await second.list_by_user("u", 10)] == ["two", "one"]
+        assert query_log == []
+
+        await second.delete_owned(other.id, "v")
+        query_log.clear()
+        await first.list_by_user("u", 10)
+        assert query_log == []
+
+        await second.create("u", "three")
+        assert [m.content for m in await first.list_by_user("u", 10)] == ["three", "two", "one"]
+
+    async def test_map_state_summaries_follow_patches(self: TestSharedCache, db_session: AsyncSession) -> None:
+        """Patching a map state invalidates it and its owner's summary listings."""
+        server = FakeServer()
+        cache = SharedEntityCache(shared_cache(server), "map_state", MapStateDomain)
+        repo = SharedCacheMapStateRepository(SqlAlchemyMapStateRepository(MapStateDAO(db_session)), cache)
+        created: MapStateDomain = await repo.create("u", "Map", '{"a": 1}')
+        assert (await repo.get(created.id)).version == 1  # type: ignore[union-attr]
+        summaries: list[MapStateSummary] = list(await repo.list_summaries("u", 10))
+        assert [s.version for s in summaries] == [1]
+
+        await repo.patch(created.id, MergePatch({"a": 2}), None)
+        assert (await repo.get(created.id)).version == 2  # type: ignore[union-attr]
+        assert [s.version for s in await repo.list_summaries("u", 10)] == [2]
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import threading
+
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Sequence
 
 from app.domain.map_states.models import MapStateDomain
+from app.domain.map_states.simplify import SimplificationCache, simplify_state
+from app.domain.pagination import Page
 from app.services.map_state_service import MapStateService
+from app.services.single_flight import SingleFlight
 from app.infrastructure.map_states.dao import MapStateDAO
 from app.infrastructure.map_states.repository import SqlAlchemyMapStateRepository
 from app.schemas.map_states import MapStateCreate, MapStateUpdate
@@ -45,7 +52,7 @@ async def test_update(self, db_session: AsyncSession) -> None:
             "u", MapStateCreate(name="old", state="{}")
         )
         updated: MapStateDomain | None = await service.update(
-            ms.id, MapStateUpdate(name="new", state="{1}")
+            ms.id, MapStateUpdate(name="new", state="{\"v\": 1}")
         )
         assert updated is not None
         assert updated.name == "new"
@@ -61,3 +68,87 @@ async def test_delete(self, db_session: AsyncSession) -> None:
         fetched: MapStateDomain | None = await service.get(ms.id)
         assert deleted is True
         assert fetched is None
+
+    async def test_list_page(self, db_session: AsyncSession) -> None:
+        dao = MapStateDAO(db_session)
+        repo = SqlAlchemyMapStateRepository(dao)
+        service = MapStateService(repo)
+        for i in range(3):
+            await service.create("u", MapStateCreate(name=f"M{i}", state="{}"))
+        first: Page[MapStateDomain] = await service.list_page(limit=2)
+        assert [m.name for m in first.items] == ["M2", "M1"]
+        assert first.next_cursor is not None
+        second: Page[MapStateDomain] = await service.list_page(
+            limit=2, after=first.next_cursor
+        )
+        assert [m.name for m in second.items] == ["M0"]
+        assert second.next_cursor is None
+
+    async def test_get_simplified_caches_per_content(self, db_session: AsyncSession) -> None:
+        # A near-straight line: every interior vertex is within 0.01 degrees of the chord.
+        line = {"type": "LineString", "coordinates": [[x / 10, 0.001 * (x % 2)] for x in range(101)]}
+        repo = SqlAlchemyMapStateRepository(MapStateDAO(db_session))
+        service = MapStateService(repo, SimplificationCache(max_entries=4))
+        ms: MapStateDomain = await service.create("u", MapStateCreate(name="Line", state=json.dumps({"route": line})))
+
+        simplified = await service.get_simplified(ms.id, 0.01)
+        assert simplified is not None
+        assert json.loads(simplified.state)["route"]["coordinates"] == [[0.0, 0.0], [10.0, 0.0]]
+        assert len(service.simplified) == 1
+
+        async def unexpected_load(id: int) -> MapStateDomain | None:
+            raise AssertionError("cache hit must not load the state")
+
+        repo.get = unexpected_load  # type: ignore[method-assign]
+        cached = await service.get_simplified(ms.id, 0.01)
+        assert cached is not None
+        assert cached.state == simplified.state
+        assert (cached.name, cached.version) == ("Line", 1)
+        assert await service.get_simplified(999999, 0.01) is None
+
+    async def test_get_simplified_runs_off_the_event_loop(
+        self, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        threads: list[int] = []
+
+        def recording_simplify(state: str, tolerance: float) -> str:
+            threads.append(threading.get_ident())
+            return simplify_state(state, tolerance)
+
+        monkeypatch.setattr("app.services.map_state_service.simplify_state", recording_simplify)
+        service = MapStateService(SqlAlchemyMapStateRepository(MapStateDAO(db_session)), SimplificationCache(4))
+        ms: MapStateDomain = await service.create("u", MapStateCreate(name="Map", state="{}"))
+
+        assert await service.get_simplified(ms.id, 0.01) is not None
+        assert threads and threads[0] != threading.get_ident()
+
+    async def test_concurrent_gets_share_one_query(self, db_session: AsyncSession) -> None:
+        repo = SqlAlchemyMapStateRepository(MapStateDAO(db_session))
+        flights = SingleFlight()
+        ms: MapStateDomain = await MapStateService(repo).create("u", MapStateCreate(name="Shared", state="{}"))
+        loads: list[int] = []
+        get = repo.get
+
+        async def slow_get(id: int) -> MapStateDomain | None:
+            loads.append(id)
+            await asyncio.sleep(0.01)
+            return await get(id)
+
+        repo.get = slow_get  # type: ignore[method-assign]
+        # One service per request, as the routes build them, sharing the process-wide group.
+        results = await asyncio.gather(*(MapStateService(repo, flights=flights).get(ms.id) for _ in range(5)))
+        assert loads == [ms.id]
+        assert (flights.metrics.executed, flights.metrics.coalesced) == (1, 4)
+        assert all(r is not None and r.name == "Shared" for r in results)
+        assert len({id(r) for r in results}) == 5  # every caller may mutate its own copy
+        assert len(flights) == 0
+
+        service = MapStateService(repo, flights=flights)
+        pending = asyncio.ensure_future(service.get(ms.id))
+        await asyncio.sleep(0)
+        await service.update(ms.id, MapStateUpdate(name="Renamed", state="{}"))
+        # A read arriving after the write must not join the one that started before it.
+        fresh = await service.get(ms.id)
+        await pending
+        assert fresh is not None and fresh.name == "Renamed"
+        assert flights.metrics.executed == 3
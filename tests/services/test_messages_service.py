@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Sequence
 
 from app.domain.messages.models import MessageDomain
+from app.domain.pagination import KeysetCursor, Page, RankCursor
 from app.services.message_service import MessageService
+from app.services.single_flight import SingleFlight
 from app.infrastructure.messages.dao import MessageDAO
 from app.infrastructure.messages.repository import SqlAlchemyMessageRepository
 from app.schemas.messages import MessageCreate, MessageUpdate
@@ -84,3 +88,84 @@ async def test_delete_message(self: TestMessageService, db_session: AsyncSession
         # Assert
         assert deleted is True
         assert fetched is None
+
+    async def test_list_page_walks_all_messages_once(self: TestMessageService, db_session: AsyncSession) -> None:
+        # Arrange
+        dao = MessageDAO(db_session)
+        repo = SqlAlchemyMessageRepository(dao)
+        service = MessageService(repo)
+        created_ids: list[int] = [(await service.create("pager", MessageCreate(content=f"Msg {i}"))).id for i in range(5)]
+        await service.create("other", MessageCreate(content="Not mine"))
+
+        # Act
+        seen: list[int] = []
+        after: KeysetCursor | None = None
+        pages: int = 0
+        while True:
+            page: Page[MessageDomain] = await service.list_by_user_page("pager", limit=2, after=after)
+            seen.extend(m.id for m in page.items)
+            pages += 1
+            if page.next_cursor is None:
+                break
+            after = page.next_cursor
+
+        # Assert
+        assert pages == 3
+        assert seen == sorted(created_ids, reverse=True)
+
+    async def test_search_page_walks_ranked_results_once(self: TestMessageService, db_session: AsyncSession) -> None:
+        # Arrange
+        dao = MessageDAO(db_session)
+        repo = SqlAlchemyMessageRepository(dao)
+        service = MessageService(repo)
+        # Two relevance levels with ties inside each, so the cursor must break ties by id.
+        contents: list[str] = ["tide tide", "tide tide", "tide and more words", "tide and more words", "tide tide"]
+        created_ids: list[int] = [(await service.create("seeker", MessageCreate(content=c))).id for c in contents]
+        await service.create("seeker", MessageCreate(content="unrelated"))
+
+        # Act
+        seen: list[int] = []
+        after: RankCursor | None = None
+        while True:
+            page: Page[MessageDomain] = await service.search_page("tide", "seeker", limit=2, after=after)
+            seen.extend(m.id for m in page.items)
+            if page.next_cursor is None:
+                break
+            assert isinstance(page.next_cursor, RankCursor)
+            after = page.next_cursor
+
+        # Assert
+        assert sorted(seen) == sorted(created_ids)
+        assert seen[:3] == [created_ids[4], created_ids[1], created_ids[0]]
+
+    async def test_concurrent_listings_share_one_query(self: TestMessageService, db_session: AsyncSession) -> None:
+        # Arrange
+        repo = SqlAlchemyMessageRepository(MessageDAO(db_session))
+        flights = SingleFlight()
+        service = MessageService(repo, flights)
+        await service.create("reader", MessageCreate(content="popular"))
+        calls: list[str] = []
+        list_by_user = repo.list_by_user
+
+        async def failing_once(
+            user_id: str, limit: int | None = None, after: KeysetCursor | None = None
+        ) -> Sequence[MessageDomain]:
+            calls.append(user_id)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise RuntimeError("database went away")
+            return await list_by_user(user_id, limit, after)
+
+        repo.list_by_user = failing_once  # type: ignore[method-assign]
+
+        # Act
+        failures = await asyncio.gather(
+            *(MessageService(repo, flights).list_by_user_page("reader", 10) for _ in range(3)), return_exceptions=True
+        )
+        pages = await asyncio.gather(*(MessageService(repo, flights).list_by_user_page("reader", 10) for _ in range(3)))
+
+        # Assert
+        assert [type(f) for f in failures] == [RuntimeError] * 3
+        assert calls == ["reader", "reader"]
+        assert [[m.content for m in page.items] for page in pages] == [["popular"]] * 3
+        assert (flights.metrics.executed, flights.metrics.coalesced) == (2, 4)